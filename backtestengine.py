@@ -1,13 +1,32 @@
 import streamlit as st
-import requests
 import numpy as np
-import datetime
-import matplotlib.pyplot as plt
+import pandas as pd
+import os
+import threading
+import time
 import plotly.graph_objects as go
 import plotly.express as px
 import plotly.io as pio
-import yfinance as yf
-import math
+
+from lpcore.catalog import STRATEGIES, COINGECKO_IDS, TOKEN_DECIMALS, TICK_SPACINGS, FEE_TIERS, PAIRS
+from lpcore.clmm import compute_L, tokens_from_L, normalize_L, V_HODL
+from lpcore.il import il_curve
+from lpcore.covariance import covariance_matrix, pair_volatility, correlation
+from lpcore.apr import calculate_clmm_apr
+from lpcore.fees import accrue_fees, iter_swap_file
+from lpcore.liquidity import LiquidityIndex
+from lpcore.atr import calculate_pair_atr
+from lpcore.backtest import run_backtest, sweep_backtest
+from lpcore.montecarlo import monte_carlo_range
+from lpcore.portfolio import portfolio_backtest
+from lpcore.store import RESOLUTIONS, load_history, pair_history
+from lpcore.rolling import RollingStats, ohlc_from_closes
+from lpcore.decimate import lttb
+from lpcore.breakeven import break_even_surface, break_even_price
+from lpcore.calibration import calibrate_pair, calibration_date, load_calibration, save_calibration, ratio_key, suggest_range
+from market_data import get_prices_usd, refresh_history
+import profiling
+from profiling import profiled, section
 
 # ===================== CONFIG PAGE =====================
 st.set_page_config(
@@ -117,66 +136,109 @@ p, span, label {
 
 
 # ---- INIT ----
+page_start = time.perf_counter()
 if "show_disclaimer" not in st.session_state:
     st.session_state.show_disclaimer = True
 
-# ---- DATA ----
-STRATEGIES = {
-    "Neutre": {"ratio": (0.5, 0.5), "objectif": "Rester dans le range", "contexte": "Incertitude (attention à l'impermanent loss vente à perte ou rachat trop cher)"},
-    "Coup de pouce": {"ratio": (0.2, 0.8), "objectif": "Range efficace", "contexte": "Faible volatilité (attention à inverser en fonction du marché)"},
-    "Mini-doux": {"ratio": (0.1, 0.9), "objectif": "Nouveau régime prix", "contexte": "Changement de tendance (attention à inverser en fonction du marché)"},
-    "Side-line Up": {"ratio": (0.95, 0.05), "objectif": "Accumulation", "contexte": "Dump"},
-    "Side-line Below": {"ratio": (0.05, 0.95), "objectif": "Attente avant pump", "contexte": "Marché haussier"},
-    "DCA-in": {"ratio": (1.0, 0.0), "objectif": "Entrée progressive", "contexte": "Accumulation de l'actif le plus volatile (Token A)"},
-    "DCA-out": {"ratio": (0.0, 1.0), "objectif": "Sortie progressive", "contexte": "Tendance haussière revente de l'actif le plus volatile (token A contre le token B)"},
-}
-
-COINGECKO_IDS = {
-    "WETH": "weth",
-    "USDC": "usd-coin",
-    "CBBTC": "coinbase-wrapped-btc",
-    "VIRTUAL": "virtual-protocol",
-    "AERO": "aerodrome-finance"
-}
-
-PAIRS = [
-    ("WETH", "USDC"),
-    ("CBBTC", "USDC"),
-    ("WETH", "CBBTC"),
-    ("VIRTUAL", "WETH"),
-    ("AERO", "WETH")
-]
-
 # ---- FONCTIONS ----
+@profiling.cache_calls("sync_market_chart")
 @st.cache_data(ttl=3600, show_spinner=False)
-def get_market_chart(asset_id):
-    try:
-        url = f"https://api.coingecko.com/api/v3/coins/{asset_id}/market_chart?vs_currency=usd&days=30&interval=daily"
-        data = requests.get(url).json()
-        prices = [p[1] for p in data.get("prices", [])]
-        prices = np.array(prices)
-        prices = prices[~np.isnan(prices)]
-        prices = prices[prices > 0]
-        return prices.tolist() if len(prices) > 0 else [1.0] * 30
-    except:
-        return [1.0] * 30
+def sync_market_chart(asset_id):
+    # Le cache sert de limiteur : au plus un téléchargement incrémental par heure
+    profiling.count("st_cache.miss.sync_market_chart")
+    return refresh_history(asset_id, "daily")
 
-def compute_volatility(prices):
-    if len(prices) < 2:
-        return 0.0
-    prices = np.array(prices)
-    returns = np.diff(prices) / prices[:-1]
-    returns = returns[~np.isnan(returns)]
-    return float(np.std(returns))
+@profiling.cache_calls("market_covariance")
+@st.cache_data(ttl=3600, show_spinner=False)
+def market_covariance(window=30):
+    # Historiques de tous les tokens alignés, covariance calculée en une passe
+    profiling.count("st_cache.miss.market_covariance")
+    histories = {}
+    for token, asset_id in COINGECKO_IDS.items():
+        try:
+            sync_market_chart(asset_id)
+        except:
+            pass
+        histories[token] = load_history(asset_id, "daily")
+    return covariance_matrix(histories, window)
+
+@profiling.cache_calls("range_calibration")
+@st.cache_data(ttl=3600, show_spinner=False)
+def range_calibration(pair):
+    # Calibration du jour écrite par calibrate.py ; calculée et enregistrée ici si le job n'est pas passé
+    profiling.count("st_cache.miss.range_calibration")
+    a, b = pair.split("/")
+    ts, prices = pair_history(COINGECKO_IDS[a], COINGECKO_IDS[b], "daily")
+    if len(ts) == 0:
+        return None
+    calibration = load_calibration(pair, calibration_date(ts))
+    if calibration is None:
+        try:
+            calibration = calibrate_pair(ts, prices)
+        except ValueError:
+            return None
+        save_calibration(pair, calibration)
+    return calibration
 
 def get_price_usd(token):
+    # Tous les tokens en un seul appel, cache partagé de 60 s
+    with section("get_price_usd"):
+        prices = get_prices_usd(COINGECKO_IDS.values())
+    if COINGECKO_IDS[token] in prices:
+        return prices[COINGECKO_IDS[token]], True
+    return 0.0, False
+
+@profiling.cache_calls("sync_hourly_chart")
+@st.cache_data(ttl=3600, show_spinner=False)
+def sync_hourly_chart(asset_id):
+    profiling.count("st_cache.miss.sync_hourly_chart")
+    return refresh_history(asset_id, "hourly")
+
+@st.cache_resource(show_spinner=False)
+def atr_engines():
+    # Un moteur ATR incrémental par actif, partagé entre les sessions
+    return {"engines": {}, "lock": threading.Lock()}
+
+def get_daily_atr(asset_id):
+    """ATR14 daily ($) à partir de l'historique horaire, seules les nouvelles bougies sont ajoutées"""
     try:
-        res = requests.get(
-            f"https://api.coingecko.com/api/v3/simple/price?ids={COINGECKO_IDS[token]}&vs_currencies=usd"
-        ).json()
-        return res[COINGECKO_IDS[token]]["usd"], True
+        sync_hourly_chart(asset_id)
     except:
-        return 0.0, False
+        pass
+    ts, prices = load_history(asset_id, "hourly")
+    day = RESOLUTIONS["daily"]
+    today = int(time.time() * 1000) // day * day
+
+    shared = atr_engines()
+    with shared["lock"]:
+        engine = shared["engines"].setdefault(asset_id, RollingStats())
+        start = 0 if engine.last_ts is None else np.searchsorted(ts, engine.last_ts + day)
+        d_ts, _, d_high, d_low, d_close = ohlc_from_closes(ts[start:], prices[start:], day)
+        done = d_ts < today
+        engine.extend(d_ts[done], d_high[done], d_low[done], d_close[done])
+        return engine.atr
+
+@profiling.cache_calls("liquidity_index")
+@st.cache_resource(max_entries=4, show_spinner=False)
+def liquidity_index(path, mtime, decimals):
+    # mtime fait partie de la clé : un snapshot modifié est relu
+    profiling.count("st_cache.miss.liquidity_index")
+    return LiquidityIndex.from_file(path, decimals)
+
+# Budget de points par courbe envoyée au navigateur (~2 points par pixel) et
+# taille de série au-delà de laquelle les traces passent en WebGL
+CHART_POINTS = 2000
+WEBGL_THRESHOLD = 10_000
+
+def chart_trace(y, x=None, **kwargs):
+    """Trace Plotly : courbes décimées (LTTB) au budget de points, WebGL pour les longues séries"""
+    y = np.asarray(y, dtype=float)
+    x = np.arange(len(y)) if x is None else np.asarray(x)
+    trace = go.Scattergl if len(y) > WEBGL_THRESHOLD else go.Scatter
+    if kwargs.get("mode") == "lines" and len(y) > CHART_POINTS:
+        keep = lttb(x, y, CHART_POINTS)
+        x, y = x[keep], y[keep]
+    return trace(x=x, y=y, **kwargs)
 
 # ---- HEADER ----
 st.markdown("""
@@ -475,16 +537,6 @@ with col1:
     with right:
         strategy_choice = st.radio("Stratégie :", list(STRATEGIES.keys()))
 
-    # --- RESET DU CACHE SI ON CHANGE DE PAIRE ---
-    if (
-        "last_pair" not in st.session_state
-        or st.session_state["last_pair"] != selected_pair
-    ):
-        for k in list(st.session_state.keys()):
-            if k.endswith("_prices_" + str(datetime.date.today())):
-                del st.session_state[k]
-        st.session_state["last_pair"] = selected_pair
-
     # --- EXTRACTION STRAT ---
     tokenA, tokenB = selected_pair.split("/")
     info = STRATEGIES[strategy_choice]
@@ -515,81 +567,22 @@ with col1:
     priceA = priceA_usd / priceB_usd
 
     # ================== VOLATILITÉ PAIRE ==================
-    keyA = f"{tokenA}_prices_{datetime.date.today()}"
-    keyB = f"{tokenB}_prices_{datetime.date.today()}"
-    if keyA not in st.session_state:
-        st.session_state[keyA] = get_market_chart(COINGECKO_IDS[tokenA])
-    if keyB not in st.session_state:
-        st.session_state[keyB] = get_market_chart(COINGECKO_IDS[tokenB])
-    pricesA = np.array(st.session_state[keyA])
-    pricesB = np.array(st.session_state[keyB])
-
-    # --- Fonction de calcul de volatilité ---
-    def compute_pair_volatility(pricesA, pricesB):
-        min_len = min(len(pricesA), len(pricesB))
-        pricesA, pricesB = pricesA[:min_len], pricesB[:min_len]
-        mask = (pricesA > 1e-8) & (pricesB > 1e-8)
-        pricesA, pricesB = pricesA[mask], pricesB[mask]
-        if len(pricesA) < 2:
-            return 0.0
-        pair_prices = pricesA / pricesB
-        returns = np.diff(pair_prices) / pair_prices[:-1]
-        returns = returns[~np.isnan(returns)]
-        return float(np.std(returns)) if len(returns) > 0 else 0.0
-
-    # --- Calcul de la volatilité selon la paire ---
-    if selected_pair == "WETH/USDC":
-        vol_30d = compute_volatility(pricesA)
-    elif selected_pair == "CBBTC/USDC":
-        vol_30d = compute_volatility(pricesA)
-    elif selected_pair == "WETH/CBBTC":
-        vol_30d = compute_pair_volatility(pricesA, pricesB) / 2
-    elif selected_pair == "VIRTUAL/WETH":
-        vol_30d = compute_pair_volatility(pricesA, pricesB) / 2
-    elif selected_pair == "AERO/WETH":
-        vol_30d = compute_pair_volatility(pricesA, pricesB) / 2
-    else:
-        vol_30d = compute_pair_volatility(pricesA, pricesB)
+    # Toutes les paires viennent de la même matrice de covariance 30 j
+    with section("market_covariance"):
+        market_cov = market_covariance()
+    vol_30d = pair_volatility(market_cov, tokenA, tokenB)
+
+    calibration = range_calibration(selected_pair)
 
-    # --- Fallback si vol = 0 ---
-    if vol_30d == 0:
-        if selected_pair == "CBBTC/USDC":
-            vol_30d = 0.12
-        elif selected_pair == "VIRTUAL/WETH":
-            vol_30d = 0.45
-        elif selected_pair == "AERO/WETH":
-            vol_30d = 0.45
+    # --- Pas de covariance récente : volatilité 30 j de l'historique de la paire ---
+    cal = calibration["ratios"].get(ratio_key((ratioA, ratioB))) if calibration else None
+    if vol_30d == 0 and cal and cal["vol"]:
+        vol_30d = cal["vol"]
 
     # ================== SUGGESTION AUTOMATIQUE ==================
-    vol_sugg = vol_30d * 100  # %
-
-    if vol_sugg < 2:
-        suggested_range = 3
-    elif vol_sugg < 4:
-        suggested_range = 7
-    elif vol_sugg < 7:
-        suggested_range = 10
-    elif vol_sugg < 10:
-        suggested_range = 16
-    else:
-        suggested_range = 20
-
-    # --- MULTIPLICATEURS SELON PAIRE ---
-    if selected_pair == "CBBTC/USDC":
-        suggested_range *= 1.3
-        vol_sugg_display = vol_sugg
-    elif selected_pair == "VIRTUAL/WETH":
-        suggested_range *= 6.2
-        vol_sugg_display = vol_sugg * 3.2
-    elif selected_pair == "AERO/WETH":
-        suggested_range *= 6.5
-        vol_sugg_display = vol_sugg * 2
-    elif selected_pair == "WETH/USDC":
-        suggested_range *= 3
-        vol_sugg_display = vol_sugg * 3
-    else:
-        suggested_range *= 3
-        vol_sugg_display = vol_sugg * 3
+    # Range qui a tenu le temps cible dans le range, au même niveau de volatilité,
+    # sur l'historique de la paire (calibrate.py)
+    suggested_range = suggest_range(cal, vol_30d) if cal else None
 
     # --- INPUT RANGE MANUEL ---
     range_pct = st.number_input(
@@ -599,6 +592,12 @@ with col1:
         value=20.0,
         key="range_pct"
     )
+    if suggested_range is not None:
+        st.caption(
+            f"Range suggéré : {min(max(suggested_range, 1.0), 200.0):.1f} % "
+            f"({cal['target'] * 100:.0f} % du temps dans le range sur {cal['horizon']} j "
+            f"à volatilité {vol_30d * 100:.2f} %/j, calibré sur l'historique de la paire)"
+        )
 
   
 
@@ -696,671 +695,1130 @@ with col2:
     )
 
 
+# ---- Entrées partagées des sections (calculées une fois par exécution complète) ----
+pool = {
+    "selected_pair": selected_pair,
+    "tokenA": tokenA,
+    "tokenB": tokenB,
+    "ratioA": ratioA,
+    "ratioB": ratioB,
+    "invert_market": invert_market,
+    "capital": capital,
+    "priceA": priceA,
+    "priceA_usd": priceA_usd,
+    "priceB_usd": priceB_usd,
+    "okA": okA,
+    "okB": okB,
+    "vol_30d": vol_30d,
+    "range_pct": range_pct,
+    "market_cov": market_cov
+}
 
-# =========================== AUTOMATION ===========================
-st.markdown("""
-<div style="background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);padding:20px;border-radius:12px;margin-top:20px;">
-    <span style="color:white;font-size:28px;font-weight:700;">REGLAGES AUTOMATION</span>
-</div>
-""", unsafe_allow_html=True)
-
-# ---- Range future / Time-buffer ----
-col_range, col_time = st.columns([2,1])
-
-# ---- Ratios pour trigger/future range ----
-ratioA_trigger, ratioB_trigger = ratioA, ratioB
-if invert_market:
-    ratioA_trigger, ratioB_trigger = ratioB_trigger, ratioA_trigger
 
-with col_range:
+def publish(key, value, needed=True):
+    """
+    Publie une sortie de section pour les sections suivantes. Si elle a changé
+    pendant la relance d'un fragment et qu'une section aval en dépend, la page
+    est relancée en entier pour que l'aval se mette à jour.
+    """
+    old = st.session_state.get(key)
+    st.session_state[key] = value
+    if needed and old is not None and old != value:
+        st.rerun()
+
+
+@st.fragment
+@profiled("sweep")
+def sweep_section(pool, pair_prices, tick_spacing, pair_decimals, costs):
+    ratioA, ratioB = pool["ratioA"], pool["ratioB"]
+    capital, priceB_usd = pool["capital"], pool["priceB_usd"]
+
+    # ---- Sweep des paramètres ----
+    with st.expander("Sweep des paramètres (range / triggers)"):
+        s1, s2, s3 = st.columns(3)
+        with s1:
+            sweep_range = st.slider("Range (%) min / max", 1.0, 200.0, (2.0, 40.0), step=1.0)
+            sweep_range_step = st.number_input("Pas range (%)", min_value=0.5, value=2.0, step=0.5)
+        with s2:
+            sweep_low = st.slider("Trigger Low (%) min / max", 0, 100, (0, 40))
+            sweep_low_step = st.number_input("Pas trigger low (%)", min_value=1, value=5, step=1)
+        with s3:
+            sweep_high = st.slider("Trigger High (%) min / max", 0, 100, (60, 100))
+            sweep_high_step = st.number_input("Pas trigger high (%)", min_value=1, value=5, step=1)
+
+        if len(pair_prices) >= 2 and st.button("Lancer le sweep", key="run_sweep"):
+            sweep = sweep_backtest(
+                pair_prices,
+                np.arange(sweep_range[0], sweep_range[1] + 1e-9, sweep_range_step),
+                np.arange(sweep_low[0], sweep_low[1] + 1, sweep_low_step),
+                np.arange(sweep_high[0], sweep_high[1] + 1, sweep_high_step),
+                ratio=(ratioA, ratioB),
+                capital=capital / priceB_usd,
+                tick_spacing=tick_spacing,
+                decimals=pair_decimals,
+                costs=costs
+            )
+            sweep_df = pd.DataFrame(sweep).sort_values("vs_hodl", ascending=False)
+            sweep_df["vs_hodl"] *= 100
+            sweep_df["time_in_range"] *= 100
+
+            st.dataframe(sweep_df, use_container_width=True, hide_index=True)
+
+            heat = sweep_df.pivot_table(
+                index="range_pct",
+                columns="trig_low",
+                values="vs_hodl",
+                aggfunc="max"
+            )
+            fig_heat = px.imshow(
+                heat,
+                aspect="auto",
+                origin="lower",
+                color_continuous_scale="RdYlGn",
+                labels=dict(x="Trigger Low (%)", y="Range (%)", color="LP vs HODL (%)")
+            )
+            fig_heat.update_layout(
+                height=420,
+                margin=dict(l=70, r=40, t=30, b=40),
+                plot_bgcolor="#173a57",
+                paper_bgcolor="#173a57",
+                font=dict(color="white")
+            )
+            st.plotly_chart(fig_heat, use_container_width=True)
+
+
+
+@st.fragment
+@profiled("monte_carlo")
+def monte_carlo_section(pool, range_percent, trig_low, trig_high):
+    ratioA, ratioB = pool["ratioA"], pool["ratioB"]
+    priceA, vol_30d, range_pct = pool["priceA"], pool["vol_30d"], pool["range_pct"]
+    capital, priceB_usd = pool["capital"], pool["priceB_usd"]
+
+    # ---- Monte Carlo : probabilité de sortie du range ----
+    with st.expander("Probabilité de sortie du range (Monte Carlo)"):
+        m1, m2, m3 = st.columns(3)
+        with m1:
+            mc_days = st.slider("Horizon (jours)", 1, 30, 7)
+        with m2:
+            mc_paths = st.select_slider("Trajectoires", [500, 1000, 2000, 5000, 10000], value=2000)
+        with m3:
+            mc_model = st.radio("Modèle", ["GBM", "Queues épaisses (Student)"])
+
+        if st.button("Lancer la simulation", key="run_mc"):
+            mc = monte_carlo_range(
+                priceA,
+                vol_30d,
+                range_pct,
+                ratio=(ratioA, ratioB),
+                range_percent=range_percent,
+                trig_low=trig_low,
+                trig_high=trig_high,
+                n_paths=mc_paths,
+                n_steps=mc_days * 288,
+                steps_per_day=288,
+                model="gbm" if mc_model == "GBM" else "student",
+                capital=capital / priceB_usd
+            )
+            q = mc["exit_days_quantiles"]
+            # Quantiles sur les trajectoires sorties : NaN si aucune n'est sortie dans l'horizon
+            median_exit = f"{q[50]:.2f} j" if np.isfinite(q[50]) else f"> {mc_days} j"
+            st.markdown(f"""
+            <div style="background-color:#27F5A9;border-left:6px solid #00754A;padding:18px 25px;border-radius:12px;margin-top:10px;color:#000;text-align:center;">
+                <div style="font-size:17px;font-weight:600;display:flex;justify-content:center;gap:35px;flex-wrap:wrap;">
+                    <span style="color:#000;">Sortie sous {mc_days} j : {mc['p_exit'] * 100:.1f}%</span>
+                    <span style="color:#000;">Sortie médiane : {median_exit}</span>
+                    <span style="color:#000;">Rebalances moyens : {mc['mean_rebalances']:.1f}</span>
+                    <span style="color:#000;">LP vs HODL médian : {mc['vs_hodl_quantiles'][50] * 100:.2f}%</span>
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+
+            exits = mc["time_to_exit"]
+            # Histogramme calculé côté serveur : 60 barres envoyées, pas une valeur par trajectoire
+            counts, edges = np.histogram(exits[exits < mc_days * 288] / 288, bins=60)
+            fig_mc = go.Figure(go.Bar(
+                x=(edges[:-1] + edges[1:]) / 2,
+                y=counts,
+                width=np.diff(edges)
+            ))
+            fig_mc.update_layout(
+                xaxis=dict(title="Jours avant sortie du range"),
+                height=300,
+                margin=dict(l=70, r=40, t=30, b=40),
+                plot_bgcolor="#173a57",
+                paper_bgcolor="#173a57",
+                font=dict(color="white"),
+                showlegend=False
+            )
+            st.plotly_chart(fig_mc, use_container_width=True)
+
+
+@profiled("backtest")
+def backtest_section(pool, range_percent, trig_low, trig_high):
+    tokenA, tokenB = pool["tokenA"], pool["tokenB"]
+    ratioA, ratioB = pool["ratioA"], pool["ratioB"]
+    capital, priceB_usd, range_pct = pool["capital"], pool["priceB_usd"], pool["range_pct"]
+
+    # =========================== BACKTEST HISTORIQUE ===========================
     st.markdown("""
-    <div style="
-        background-color:#FFA700;
-        border-left:6px solid #754C00;
-        padding:15px 20px;
-        border-radius:8px;
-        margin-top:25px;
-        margin-bottom:15px;
-    ">
-        <h3>Range future</h3>
+    <div style="background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);padding:20px;border-radius:12px;margin-top:20px;">
+        <span style="color:white;font-size:28px;font-weight:700;">BACKTEST HISTORIQUE</span>
     </div>
     """, unsafe_allow_html=True)
 
-    # Slider pour range total
-    range_percent = st.slider("Range total (%)", 1.0, 90.0, 20.0, step=0.5)
-    low_offset_pct = -range_percent * 20 / 100
-    high_offset_pct = range_percent * 80 / 100
-    final_low = priceA * (1 + low_offset_pct/100)
-    final_high = priceA * (1 + high_offset_pct/100)
-    st.write(f"Range : {final_low:.6f} – {final_high:.6f}")
+    # ---- Historique complet de la paire (token A en token B, timestamps communs) ----
+    with section("backtest.history"):
+        _, pair_prices = pair_history(COINGECKO_IDS[tokenA], COINGECKO_IDS[tokenB], "daily")
+    pair_decimals = (TOKEN_DECIMALS[tokenA], TOKEN_DECIMALS[tokenB])
+    tick_spacing = None
+    costs = None
+
+    if len(pair_prices) >= 2:
+        c1, c2, c3, c4 = st.columns(4)
+        with c1:
+            tick_spacing = st.selectbox(
+                "Tick spacing du pool",
+                TICK_SPACINGS,
+                format_func=lambda t: "Continu (sans ticks)" if t is None else str(t),
+                help="Aligne les bornes de chaque range sur les ticks utilisables du pool, comme on-chain."
+            )
+        with c2:
+            fee_tier = st.selectbox("Fee tier du swap", FEE_TIERS, index=1, format_func=lambda t: f"{t / 1e4:g} %")
+        with c3:
+            gas_usd = st.number_input("Gas par rebalance ($)", min_value=0.0, value=0.5, step=0.1)
+        with c4:
+            depth_usd = st.number_input(
+                "Profondeur du pool ($)",
+                min_value=0.0,
+                value=0.0,
+                step=100_000.0,
+                help="TVL d'une pool v2 équivalente autour du prix (0 = sans impact de prix)."
+            )
+
+        # Coûts en token B ; profondeur D ($) -> liquidité active L = D / (2 sqrt(P)) en token B
+        depth = depth_usd / priceB_usd
+        costs = {
+            "fee_tier": fee_tier,
+            "gas": gas_usd / priceB_usd,
+            "pool_liquidity": (lambda P: depth / (2 * np.sqrt(P))) if depth > 0 else None
+        }
+
+        with section("backtest.run"):
+            bt = run_backtest(
+                pair_prices,
+                range_pct,
+                ratio=(ratioA, ratioB),
+                range_percent=range_percent,
+                trig_low=trig_low,
+                trig_high=trig_high,
+                capital=capital / priceB_usd,
+                tick_spacing=tick_spacing,
+                decimals=pair_decimals,
+                costs=costs
+            )
+
+        fig_bt = go.Figure()
+        fig_bt.add_trace(chart_trace(
+            bt["value"],
+            mode="lines",
+            name="Valeur LP",
+            line=dict(color="#1de9b6", width=3)
+        ))
+        fig_bt.add_trace(chart_trace(
+            bt["hodl"],
+            mode="lines",
+            name="Valeur HODL",
+            line=dict(color="#FFA700", width=2, dash="dot")
+        ))
+        fig_bt.add_trace(chart_trace(
+            bt["value"][bt["rebalance_idx"]],
+            x=bt["rebalance_idx"],
+            mode="markers",
+            name="Rebalance",
+            marker=dict(color="red", size=9)
+        ))
+        fig_bt.update_layout(
+            height=340,
+            margin=dict(l=70, r=40, t=30, b=40),
+            plot_bgcolor="#173a57",
+            paper_bgcolor="#173a57",
+            font=dict(color="white"),
+            yaxis=dict(title=f"Valeur ({tokenB})", gridcolor="rgba(255,255,255,0.1)"),
+            xaxis=dict(title="Bougie", gridcolor="rgba(255,255,255,0.1)")
+        )
+        with section("backtest.chart"):
+            st.plotly_chart(fig_bt, use_container_width=True)
+
+        st.markdown(f"""
+        <div style="background-color:#27F5A9;border-left:6px solid #00754A;padding:18px 25px;border-radius:12px;margin-top:10px;color:#000;text-align:center;">
+            <div style="font-size:17px;font-weight:600;display:flex;justify-content:center;gap:35px;flex-wrap:wrap;">
+                <span style="color:#000;">Valeur LP : {bt['final_value']:,.4f} {tokenB}</span>
+                <span style="color:#000;">Valeur HODL : {bt['final_hodl']:,.4f} {tokenB}</span>
+                <span style="color:#000;">IL : {bt['final_il'] * 100:.2f}%</span>
+                <span style="color:#000;">Rebalances : {bt['n_rebalances']}</span>
+                <span style="color:#000;">Coûts de swap : {bt['total_cost']:,.4f} {tokenB}</span>
+                <span style="color:#000;">Hors range : {(1 - bt['time_in_range']) * 100:.1f}%</span>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.info("Historique de prix insuffisant pour lancer le backtest.")
+
+
+    sweep_section(pool, pair_prices, tick_spacing, pair_decimals, costs)
+    monte_carlo_section(pool, range_percent, trig_low, trig_high)
+
+
+# Durées de time-buffer comparées (minutes)
+BUFFER_MINUTES = [0, 6, 12, 18, 30, 48, 60, 120, 240, 480]
+
+@st.fragment
+@profiled("time_buffer")
+def time_buffer_section(pool, range_percent, trig_low, trig_high):
+    """Rebalances et résultat de la stratégie pour chaque durée de time-buffer"""
+    tokenA, tokenB = pool["tokenA"], pool["tokenB"]
+
+    with st.expander("Simulation du time-buffer"):
+        # Historique minute du store s'il existe, sinon horaire (buffer arrondi à la bougie)
+        resolution = "minute"
+        _, prices = pair_history(COINGECKO_IDS[tokenA], COINGECKO_IDS[tokenB], "minute")
+        if len(prices) < 2:
+            resolution = "hourly"
+            for token in (tokenA, tokenB):
+                try:
+                    sync_hourly_chart(COINGECKO_IDS[token])
+                except:
+                    pass
+            _, prices = pair_history(COINGECKO_IDS[tokenA], COINGECKO_IDS[tokenB], "hourly")
+        if len(prices) < 2:
+            st.info("Historique de prix insuffisant pour simuler le time-buffer.")
+            return
+
+        step = RESOLUTIONS[resolution] // 60_000
+        candles = np.unique(np.maximum(-(-np.array(BUFFER_MINUTES) // step), 1))
+        st.caption(f"{len(prices):,} bougies {resolution}, un buffer = N bougies consécutives au-delà du trigger")
+
+        with section("time_buffer.sweep"):
+            res = sweep_backtest(
+                prices,
+                [pool["range_pct"]],
+                [trig_low],
+                [trig_high],
+                range_percents=[range_percent],
+                ratio=(pool["ratioA"], pool["ratioB"]),
+                capital=pool["capital"] / pool["priceB_usd"],
+                buffers=candles
+            )
+        st.dataframe(pd.DataFrame({
+            "Buffer (min)": res["buffer"] * step,
+            "Rebalances": res["n_rebalances"],
+            "LP vs HODL (%)": res["vs_hodl"] * 100,
+            f"Valeur finale ({tokenB})": res["final_value"],
+            "Temps dans le range (%)": res["time_in_range"] * 100
+        }), use_container_width=True, hide_index=True)
+
+
+# =========================== AUTOMATION ===========================
+@st.fragment
+@profiled("automation")
+def automation_section(pool):
+    """Réglages automation + backtest : un trigger ne relance que cette section"""
+    priceA, vol_30d = pool["priceA"], pool["vol_30d"]
+    ratioA, ratioB, invert_market = pool["ratioA"], pool["ratioB"], pool["invert_market"]
 
-with col_time:
     st.markdown("""
-    <div style="
-        background-color:#FFA700;
-        border-left:6px solid #754C00;
-        padding:15px 20px;
-        border-radius:8px;
-        margin-top:25px;
-        margin-bottom:15px;
-    ">
-        <h3>Time-buffer</h3>
+    <div style="background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);padding:20px;border-radius:12px;margin-top:20px;">
+        <span style="color:white;font-size:28px;font-weight:700;">REGLAGES AUTOMATION</span>
     </div>
     """, unsafe_allow_html=True)
 
-    vola = vol_30d * 100
-    if vola < 2:
-        recomand = "6 à 12 minutes"
-    elif vola < 5:
-        recomand = "18 à 48 minutes"
-    else:
-        recomand = "60 minutes et plus"
-    st.write(f"Recommandation avec la volatilité actuelle : {recomand}")
+    # ---- Range future / Time-buffer ----
+    col_range, col_time = st.columns([2,1])
 
-# ---- Trigger d’anticipation / Rebalance avancée ----
-col_trigger, col_rebalance = st.columns(2)
+    # ---- Ratios pour trigger/future range ----
+    ratioA_trigger, ratioB_trigger = ratioA, ratioB
+    if invert_market:
+        ratioA_trigger, ratioB_trigger = ratioB_trigger, ratioA_trigger
 
-with col_trigger:
-    st.markdown("""
-    <div style="
-        background-color:#FFA700;
-        border-left:6px solid #754C00;
-        padding:15px 20px;
-        border-radius:8px;
-        margin-top:25px;
-        margin-bottom:15px;
-    ">
-        <h3>Trigger d’anticipation (RATIO)</h3>
-    </div>
-    """, unsafe_allow_html=True)
+    with col_range:
+        st.markdown("""
+        <div style="
+            background-color:#FFA700;
+            border-left:6px solid #754C00;
+            padding:15px 20px;
+            border-radius:8px;
+            margin-top:25px;
+            margin-bottom:15px;
+        ">
+            <h3>Range future</h3>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # Slider pour range total
+        range_percent = st.slider("Range total (%)", 1.0, 90.0, 20.0, step=0.5)
+        low_offset_pct = -range_percent * 20 / 100
+        high_offset_pct = range_percent * 80 / 100
+        final_low = priceA * (1 + low_offset_pct/100)
+        final_high = priceA * (1 + high_offset_pct/100)
+        st.write(f"Range : {final_low:.6f} – {final_high:.6f}")
+
+    with col_time:
+        st.markdown("""
+        <div style="
+            background-color:#FFA700;
+            border-left:6px solid #754C00;
+            padding:15px 20px;
+            border-radius:8px;
+            margin-top:25px;
+            margin-bottom:15px;
+        ">
+            <h3>Time-buffer</h3>
+        </div>
+        """, unsafe_allow_html=True)
 
-    t1, t2 = st.columns(2)
-    with t1:
-        trig_low = st.slider("Trigger Low (%)", 0, 100, 10)
-    with t2:
-        trig_high = st.slider("Trigger High (%)", 0, 100, 90)
+        vola = vol_30d * 100
+        if vola < 2:
+            recomand = "6 à 12 minutes"
+        elif vola < 5:
+            recomand = "18 à 48 minutes"
+        else:
+            recomand = "60 minutes et plus"
+        st.write(f"Recommandation avec la volatilité actuelle : {recomand}")
 
-    rw = final_high - final_low
-    trigger_low_price = final_low + (trig_low/100)*rw
-    trigger_high_price = final_low + (trig_high/100)*rw
-    st.write(f"Trigger Low : {trigger_low_price:.6f}")
-    st.write(f"Trigger High : {trigger_high_price:.6f}")
+    # ---- Trigger d’anticipation / Rebalance avancée ----
+    col_trigger, col_rebalance = st.columns(2)
 
-with col_rebalance:
+    with col_trigger:
+        st.markdown("""
+        <div style="
+            background-color:#FFA700;
+            border-left:6px solid #754C00;
+            padding:15px 20px;
+            border-radius:8px;
+            margin-top:25px;
+            margin-bottom:15px;
+        ">
+            <h3>Trigger d’anticipation (RATIO)</h3>
+        </div>
+        """, unsafe_allow_html=True)
+
+        t1, t2 = st.columns(2)
+        with t1:
+            trig_low = st.slider("Trigger Low (%)", 0, 100, 10)
+        with t2:
+            trig_high = st.slider("Trigger High (%)", 0, 100, 90)
+
+        rw = final_high - final_low
+        trigger_low_price = final_low + (trig_low/100)*rw
+        trigger_high_price = final_low + (trig_high/100)*rw
+        st.write(f"Trigger Low : {trigger_low_price:.6f}")
+        st.write(f"Trigger High : {trigger_high_price:.6f}")
+
+    with col_rebalance:
+        st.markdown("""
+        <div style="
+            background-color:#FFA700;
+            border-left:6px solid #754C00;
+            padding:15px 20px;
+            border-radius:8px;
+            margin-top:25px;
+            margin-bottom:15px;
+        ">
+            <h3>Rebalance avancée (futur range)</h3>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # ---- Calcul du range fixe pour rebalance (toujours basé sur les ratios d’origine) ----
+        off_low_pct  = -ratioA * range_percent
+        off_high_pct =  ratioB * range_percent
+
+        bear_low  = priceA * (1 + off_low_pct / 100)
+        bear_high = priceA * (1 + off_high_pct / 100)
+        bull_low  = priceA * (1 - off_high_pct / 100)
+        bull_high = priceA * (1 - off_low_pct / 100)
+
+        col_b1, col_b2 = st.columns(2)
+        with col_b1:
+            st.markdown("**Marché Haussier (Pump/RANGE HIGH)**")
+            st.write(f"Range Low : {bull_low:.6f} ({-off_high_pct:.0f}%)")
+            st.write(f"Range High : {bull_high:.6f} (+{off_low_pct:.0f}%)")
+
+        with col_b2:
+            st.markdown("**Marché Baissier (Dump/RANGE LOW)**")
+            st.write(f"Range Low : {bear_low:.6f} ({off_low_pct:.0f}%)")
+            st.write(f"Range High : {bear_high:.6f} (+{off_high_pct:.0f}%)")
+
+    time_buffer_section(pool, range_percent, trig_low, trig_high)
+    backtest_section(pool, range_percent, trig_low, trig_high)
+
+automation_section(pool)
+
+
+# =========================== PORTEFEUILLE ===========================
+@st.fragment
+@profiled("portfolio")
+def portfolio_section():
+    with st.expander("Backtest portefeuille (plusieurs LP simultanées)"):
+        default = pd.DataFrame({
+            "Paire": [f"{a}/{b}" for a, b in PAIRS],
+            "Active": [True] * len(PAIRS),
+            "Capital ($)": [1000.0] * len(PAIRS),
+            "Stratégie": ["Neutre"] * len(PAIRS),
+            "Range (%)": [10.0] * len(PAIRS),
+            "Trigger Low (%)": [0.0] * len(PAIRS),
+            "Trigger High (%)": [100.0] * len(PAIRS),
+            "Tick spacing": [None] * len(PAIRS)
+        })
+        table = st.data_editor(
+            default,
+            hide_index=True,
+            use_container_width=True,
+            disabled=["Paire"],
+            column_config={
+                "Stratégie": st.column_config.SelectboxColumn(options=list(STRATEGIES)),
+                "Tick spacing": st.column_config.SelectboxColumn(options=TICK_SPACINGS[1:])
+            },
+            key="portfolio_positions"
+        )
+        table = table[table["Active"] & (table["Capital ($)"] > 0)]
+
+        if table.empty or not st.button("Lancer le backtest portefeuille", key="run_portfolio"):
+            return
+
+        histories = {}
+        for token, asset_id in COINGECKO_IDS.items():
+            try:
+                sync_market_chart(asset_id)
+            except:
+                pass
+            histories[token] = load_history(asset_id, "daily")
+
+        positions = []
+        for row in table.itertuples(index=False):
+            a, b = row[0].split("/")
+            positions.append({
+                "pair": row[0],
+                "capital": row[2],
+                "ratio": STRATEGIES[row[3]]["ratio"],
+                "range_pct": row[4],
+                "trig_low": row[5],
+                "trig_high": row[6],
+                "tick_spacing": int(row[7]) if pd.notna(row[7]) else None,
+                "decimals": (TOKEN_DECIMALS[a], TOKEN_DECIMALS[b])
+            })
+        try:
+            pf = portfolio_backtest(histories, positions)
+        except ValueError as e:
+            st.warning(f"Backtest portefeuille impossible : {e}")
+            return
+
+        dates = pd.to_datetime(pf["timestamps"], unit="ms")
+        fig_pf = go.Figure()
+        fig_pf.add_trace(chart_trace(pf["value"], x=dates, mode="lines", name="Portefeuille LP",
+                                     line=dict(color="#1de9b6", width=3)))
+        fig_pf.add_trace(chart_trace(pf["hodl"], x=dates, mode="lines", name="HODL",
+                                     line=dict(color="#FFA700", width=2, dash="dash")))
+        fig_pf.add_trace(chart_trace(pf["drawdown"] * 100, x=dates, mode="lines", name="Drawdown (%)",
+                                     line=dict(color="#ff6b6b", width=1), yaxis="y2"))
+        fig_pf.update_layout(
+            height=380,
+            margin=dict(l=70, r=70, t=30, b=40),
+            plot_bgcolor="#173a57",
+            paper_bgcolor="#173a57",
+            font=dict(color="white"),
+            yaxis=dict(title="Valeur ($)", gridcolor="rgba(255,255,255,0.1)"),
+            yaxis2=dict(title="Drawdown (%)", overlaying="y", side="right", showgrid=False)
+        )
+        with section("portfolio.chart"):
+            st.plotly_chart(fig_pf, use_container_width=True)
+
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Valeur finale", f"{pf['final_value']:,.2f} $")
+        m2.metric("LP vs HODL", f"{pf['vs_hodl'] * 100:.2f} %")
+        m3.metric("Drawdown max", f"{pf['max_drawdown'] * 100:.2f} %")
+        m4.metric("Capital en range", f"{pf['avg_capital_use'] * 100:.1f} %")
+
+        res = pf["positions"]
+        st.dataframe(pd.DataFrame({
+            "Paire": res["pair"],
+            "Valeur finale ($)": res["final_value"],
+            "Rebalances": res["n_rebalances"],
+            "Temps dans le range (%)": res["time_in_range"] * 100
+        }), use_container_width=True, hide_index=True)
+
+portfolio_section()
+
+
+# =========================== IMPERMANENT LOSS ===========================
+@st.fragment
+@profiled("il")
+def il_section():
+    # --- Interface IL ---
     st.markdown("""
-    <div style="
-        background-color:#FFA700;
-        border-left:6px solid #754C00;
-        padding:15px 20px;
-        border-radius:8px;
-        margin-top:25px;
-        margin-bottom:15px;
-    ">
-        <h3>Rebalance avancée (futur range)</h3>
+    <div style="background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);padding:20px;border-radius:12px;margin-top:20px;">
+        <span style="color:white;font-size:28px;font-weight:700;">IMPERMANENT LOSS</span>
     </div>
     """, unsafe_allow_html=True)
 
-    # ---- Calcul du range fixe pour rebalance (toujours basé sur les ratios d’origine) ----
-    off_low_pct  = -ratioA * range_percent
-    off_high_pct =  ratioB * range_percent
+    # --- Inputs compacts ---
+    st.write("")
+    row1_col1, row1_col2, row1_col3 = st.columns([1,1,1])
+
+    with row1_col1:
+        st.markdown("<span style='color:blue;font-weight:600;'>P_deposit</span>", unsafe_allow_html=True)
+        # Clé de session : la section ATR lit le prix de dépôt sans relancer la page
+        P_deposit = st.number_input(
+            "P_deposit",
+            value=3000.0,
+            format="%.6f",
+            step=0.001,
+            key="il_deposit",
+            label_visibility="collapsed"
+        )
 
-    bear_low  = priceA * (1 + off_low_pct / 100)
-    bear_high = priceA * (1 + off_high_pct / 100)
-    bull_low  = priceA * (1 - off_high_pct / 100)
-    bull_high = priceA * (1 - off_low_pct / 100)
+    with row1_col2:
+        st.markdown("<span style='color:purple;font-weight:600;'>P_now</span>", unsafe_allow_html=True)
+        P_now = st.number_input(
+            "P_now",
+            value=3000.0,
+            format="%.6f",
+            step=0.001,
+            label_visibility="collapsed"
+        )
 
-    col_b1, col_b2 = st.columns(2)
-    with col_b1:
-        st.markdown("**Marché Haussier (Pump/RANGE HIGH)**")
-        st.write(f"Range Low : {bull_low:.6f} ({-off_high_pct:.0f}%)")
-        st.write(f"Range High : {bull_high:.6f} (+{off_low_pct:.0f}%)")
-    
-    with col_b2:
-        st.markdown("**Marché Baissier (Dump/RANGE LOW)**")
-        st.write(f"Range Low : {bear_low:.6f} ({off_low_pct:.0f}%)")
-        st.write(f"Range High : {bear_high:.6f} (+{off_high_pct:.0f}%)")
-
- 
-
-# --- Fonctions de calcul ---
-def compute_L(P, P_l, P_u, V):
-    sqrtP = np.sqrt(P)
-    sqrtPl = np.sqrt(P_l)
-    sqrtPu = np.sqrt(P_u)
-    A = (1 / sqrtP - 1 / sqrtPu)
-    B = (sqrtP - sqrtPl)
-    return V / (P * A + B)
-
-def tokens_from_L(L, P, P_l, P_u):
-    sqrtP = np.sqrt(P)
-    sqrtPl = np.sqrt(P_l)
-    sqrtPu = np.sqrt(P_u)
-    x = L * (1 / sqrtP - 1 / sqrtPu)
-    y = L * (sqrtP - sqrtPl)
-    return x, y
-
-def normalize_L(L, x0, y0, P, V):
-    factor = V / (x0 * P + y0)
-    return L * factor, x0 * factor, y0 * factor
-
-def x_of_P(P, L, P_upper):
-    P_arr = np.asarray(P, float)
-    sqrtP = np.sqrt(P_arr)
-    x = L * (1 / sqrtP - 1 / np.sqrt(P_upper))
-    if isinstance(x, np.ndarray):
-        return np.where(x < 0, 0, x)
-    return max(x, 0.0)
-
-def y_of_P(P, L, P_lower):
-    P_arr = np.asarray(P, float)
-    sqrtP = np.sqrt(P_arr)
-    y = L * (sqrtP - np.sqrt(P_lower))
-    if isinstance(y, np.ndarray):
-        return np.where(y < 0, 0, y)
-    return max(y, 0.0)
-
-def V_LP(P, L, P_lower, P_upper):
-    P_arr = np.asarray(P, float)
-    return x_of_P(P_arr, L, P_upper) * P_arr + y_of_P(P_arr, L, P_lower)
-
-def V_HODL(P, x0, y0):
-    return x0 * P + y0
-
-# --- Interface IL ---
-st.markdown("""
-<div style="background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);padding:20px;border-radius:12px;margin-top:20px;">
-    <span style="color:white;font-size:28px;font-weight:700;">IMPERMANENT LOSS</span>
-</div>
-""", unsafe_allow_html=True)
+    with row1_col3:
+        st.markdown("<span style='color:black;font-weight:600;'>Valeur deposit (USD)</span>", unsafe_allow_html=True)
+        v_deposit = st.number_input(
+            "Valeur deposit (USD)",
+            value=500.0,
+            format="%.6f",
+            step=0.01,
+            label_visibility="collapsed"
+        )
 
-# --- Inputs compacts ---
-st.write("")
-row1_col1, row1_col2, row1_col3 = st.columns([1,1,1])
-
-with row1_col1:
-    st.markdown("<span style='color:blue;font-weight:600;'>P_deposit</span>", unsafe_allow_html=True)
-    P_deposit = st.number_input(
-        "P_deposit",
-        value=3000.0,
-        format="%.6f",
-        step=0.001,
-        label_visibility="collapsed"
-    )
+    row2_col1, row2_col2 = st.columns([1,1])
 
-with row1_col2:
-    st.markdown("<span style='color:purple;font-weight:600;'>P_now</span>", unsafe_allow_html=True)
-    P_now = st.number_input(
-        "P_now",
-        value=3000.0,
-        format="%.6f",
-        step=0.001,
-        label_visibility="collapsed"
-    )
+    with row2_col1:
+        st.markdown("<span style='color:green;font-weight:600;'>P_lower</span>", unsafe_allow_html=True)
+        P_lower = st.number_input(
+            "P_lower",
+            value=2800.0,
+            format="%.6f",
+            step=0.001,
+            label_visibility="collapsed"
+        )
 
-with row1_col3:
-    st.markdown("<span style='color:black;font-weight:600;'>Valeur deposit (USD)</span>", unsafe_allow_html=True)
-    v_deposit = st.number_input(
-        "Valeur deposit (USD)",
-        value=500.0,
-        format="%.6f",
-        step=0.01,
-        label_visibility="collapsed"
-    )
+    with row2_col2:
+        st.markdown("<span style='color:green;font-weight:600;'>P_upper</span>", unsafe_allow_html=True)
+        P_upper = st.number_input(
+            "P_upper",
+            value=3500.0,
+            format="%.6f",
+            step=0.001,
+            label_visibility="collapsed"
+        )
 
-row2_col1, row2_col2 = st.columns([1,1])
+    # --- Calcul de L et normalisation ---
+    L_raw = compute_L(P_deposit, P_lower, P_upper, v_deposit)
+    x0_raw, y0_raw = tokens_from_L(L_raw, P_deposit, P_lower, P_upper)
+    L, x0, y0 = normalize_L(L_raw, x0_raw, y0_raw, P_deposit, v_deposit)
+
+    # --- Grille prix (IL exact, fonction de P / P_deposit et du range) ---
+    prices = np.linspace(P_lower*0.8, P_upper*1.3, 400)
+    range_norm = (P_lower / P_deposit, P_upper / P_deposit)
+    with section("il.grid"):
+        IL_curve = il_curve(prices / P_deposit, *range_norm) * 100
+
+    # --- Graphique IL(%) ---
+    fig = go.Figure()
+
+    # Ligne IL
+    fig.add_trace(go.Scatter(
+        x=prices,
+        y=IL_curve,
+        mode="lines",
+        name="IL(%)",
+        line=dict(color="red", width=3)
+    ))
 
-with row2_col1:
-    st.markdown("<span style='color:green;font-weight:600;'>P_lower</span>", unsafe_allow_html=True)
-    P_lower = st.number_input(
-        "P_lower",
-        value=2800.0,
-        format="%.6f",
-        step=0.001,
-        label_visibility="collapsed"
+    # Vlines et annotations
+    fig.add_vline(
+        x=P_lower,
+        line=dict(color="green", width=2, dash="dot"),
+        name="Range Low"
     )
-
-with row2_col2:
-    st.markdown("<span style='color:green;font-weight:600;'>P_upper</span>", unsafe_allow_html=True)
-    P_upper = st.number_input(
-        "P_upper",
-        value=3500.0,
-        format="%.6f",
-        step=0.001,
-        label_visibility="collapsed"
+    fig.add_annotation(
+        x=P_lower,
+        y=max(IL_curve),
+        text="Low",
+        showarrow=False,
+        font=dict(color="green", size=12),
+        yshift=10
     )
 
-# --- Calcul de L et normalisation ---
-L_raw = compute_L(P_deposit, P_lower, P_upper, v_deposit)
-x0_raw, y0_raw = tokens_from_L(L_raw, P_deposit, P_lower, P_upper)
-L, x0, y0 = normalize_L(L_raw, x0_raw, y0_raw, P_deposit, v_deposit)
-
-# --- Grille prix ---
-prices = np.linspace(P_lower*0.8, P_upper*1.3, 400)
-LP_values = V_LP(prices, L, P_lower, P_upper)
-HODL_values = V_HODL(prices, x0, y0)
-IL_curve = (LP_values / HODL_values - 1) * 100
-
-# --- Graphique IL(%) ---
-fig = go.Figure()
-
-# Ligne IL
-fig.add_trace(go.Scatter(
-    x=prices,
-    y=IL_curve,
-    mode="lines",
-    name="IL(%)",
-    line=dict(color="red", width=3)
-))
-
-# Vlines et annotations
-fig.add_vline(
-    x=P_lower,
-    line=dict(color="green", width=2, dash="dot"),
-    name="Range Low"
-)
-fig.add_annotation(
-    x=P_lower,
-    y=max(IL_curve),
-    text="Low",
-    showarrow=False,
-    font=dict(color="green", size=12),
-    yshift=10
-)
-
-fig.add_vline(
-    x=P_upper,
-    line=dict(color="green", width=2, dash="dot"),
-    name="Range High"
-)
-fig.add_annotation(
-    x=P_upper,
-    y=max(IL_curve),
-    text="High",
-    showarrow=False,
-    font=dict(color="green", size=12),
-    yshift=10
-)
-
-fig.add_vline(
-    x=P_deposit,
-    line=dict(color="blue", width=2, dash="dash"),
-    name="Price Deposit"
-)
-fig.add_annotation(
-    x=P_deposit,
-    y=min(IL_curve),
-    text="Deposit",
-    showarrow=False,
-    font=dict(color="blue", size=12),
-    yshift=-10
-)
-
-fig.add_vline(
-    x=P_now,
-    line=dict(color="purple", width=2),
-    name="Price Now"
-)
-fig.add_annotation(
-    x=P_now,
-    y=min(IL_curve),
-    text="Now",
-    showarrow=False,
-    font=dict(color="purple", size=12),
-    yshift=-10
-)
+    fig.add_vline(
+        x=P_upper,
+        line=dict(color="green", width=2, dash="dot"),
+        name="Range High"
+    )
+    fig.add_annotation(
+        x=P_upper,
+        y=max(IL_curve),
+        text="High",
+        showarrow=False,
+        font=dict(color="green", size=12),
+        yshift=10
+    )
 
-# Axes
-fig.update_xaxes(
-    range=[min(prices), max(prices)],
-    title="Prix",
-    title_font=dict(color="white", size=14),
-    tickfont=dict(color="white", size=12),
-    gridcolor="rgba(255,255,255,0.1)"
-)
-fig.update_yaxes(
-    tickformat=".2f",
-    automargin=True,
-    title="IL (%)",
-    title_font=dict(color="white", size=14),
-    tickfont=dict(color="white", size=12),
-    gridcolor="rgba(255,255,255,0.1)"
-)
+    fig.add_vline(
+        x=P_deposit,
+        line=dict(color="blue", width=2, dash="dash"),
+        name="Price Deposit"
+    )
+    fig.add_annotation(
+        x=P_deposit,
+        y=min(IL_curve),
+        text="Deposit",
+        showarrow=False,
+        font=dict(color="blue", size=12),
+        yshift=-10
+    )
 
-# Layout
-fig.update_layout(
-    height=380,
-    title=dict(
-        text="Impermanent Loss (%)",
-        font=dict(color="white", size=16)
-    ),
-    margin=dict(l=70, r=40, t=50, b=40),
-    plot_bgcolor="#173a57",
-    paper_bgcolor="#173a57",
-    font=dict(color="white")
-)
+    fig.add_vline(
+        x=P_now,
+        line=dict(color="purple", width=2),
+        name="Price Now"
+    )
+    fig.add_annotation(
+        x=P_now,
+        y=min(IL_curve),
+        text="Now",
+        showarrow=False,
+        font=dict(color="purple", size=12),
+        yshift=-10
+    )
 
-st.plotly_chart(fig, use_container_width=True)
+    # Axes
+    fig.update_xaxes(
+        range=[min(prices), max(prices)],
+        title="Prix",
+        title_font=dict(color="white", size=14),
+        tickfont=dict(color="white", size=12),
+        gridcolor="rgba(255,255,255,0.1)"
+    )
+    fig.update_yaxes(
+        tickformat=".2f",
+        automargin=True,
+        title="IL (%)",
+        title_font=dict(color="white", size=14),
+        tickfont=dict(color="white", size=12),
+        gridcolor="rgba(255,255,255,0.1)"
+    )
 
-# --- Valeurs actuelles et L au dépôt ---
-IL_now = (V_LP(P_now, L, P_lower, P_upper) / V_HODL(P_now, x0, y0) - 1) * 100
-LP_now = V_LP(P_now, L, P_lower, P_upper)
-HODL_now = V_HODL(P_now, x0, y0)
+    # Layout
+    fig.update_layout(
+        height=380,
+        title=dict(
+            text="Impermanent Loss (%)",
+            font=dict(color="white", size=16)
+        ),
+        margin=dict(l=70, r=40, t=50, b=40),
+        plot_bgcolor="#173a57",
+        paper_bgcolor="#173a57",
+        font=dict(color="white")
+    )
 
-html_block = f"""
-<div style="background-color:#27F5A9;border-left:6px solid #00754A;padding:18px 25px;border-radius:12px;margin-top:20px;color:#000;text-align:center;">
-    <h3 style="margin:0 0 10px 0;color:#000;">Simulation IL</h3>
-    <div style="font-size:18px;font-weight:600;display:flex;justify-content:center;gap:35px;flex-wrap:wrap;">
-        <span style="color:#000;">IL maintenant : {IL_now:.2f}%</span>
-        <span style="color:#000;">Valeur LP : ${LP_now:,.2f}</span>
-        <span style="color:#000;">Valeur HODL : ${HODL_now:,.2f}</span>
+    with section("il.chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    # --- Valeurs actuelles et L au dépôt ---
+    IL_now = il_curve(P_now / P_deposit, *range_norm) * 100
+    HODL_now = V_HODL(P_now, x0, y0)
+    LP_now = HODL_now * (1 + IL_now / 100)
+
+    html_block = f"""
+    <div style="background-color:#27F5A9;border-left:6px solid #00754A;padding:18px 25px;border-radius:12px;margin-top:20px;color:#000;text-align:center;">
+        <h3 style="margin:0 0 10px 0;color:#000;">Simulation IL</h3>
+        <div style="font-size:18px;font-weight:600;display:flex;justify-content:center;gap:35px;flex-wrap:wrap;">
+            <span style="color:#000;">IL maintenant : {IL_now:.2f}%</span>
+            <span style="color:#000;">Valeur LP : ${LP_now:,.2f}</span>
+            <span style="color:#000;">Valeur HODL : ${HODL_now:,.2f}</span>
+        </div>
     </div>
-</div>
-"""
-
-st.markdown(html_block, unsafe_allow_html=True)
-
-
-# ======================
-# APR
-# ======================
-
-
-def calculate_clmm_apr(
-    fees_usd_period: float,
-    active_liquidity_usd_avg: float,
-    period_days: int
-) -> float:
-    """
-    Calcule un APR annualisé basé uniquement sur la liquidité active.
     """
+    st.markdown(html_block, unsafe_allow_html=True)
 
-    if active_liquidity_usd_avg <= 0 or period_days <= 0:
-        return 0.0
-
-    return (
-        fees_usd_period
-        / active_liquidity_usd_avg
-        * (365 / period_days)
-        * 100
+    # Sortie lue par la section APR (fichier de swaps)
+    publish(
+        "il_position",
+        (P_lower, P_upper, float(L)),
+        needed=st.session_state.get("fees_source", "Saisie manuelle") != "Saisie manuelle"
     )
 
+il_section()
+
 
 # ======================
-# Interface
+# APR
 # ======================
 
 st.set_page_config(layout="wide")
 
-st.markdown("""
-<div style="
-    background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);
-    padding:20px;
-    border-radius:12px;
-    margin-top:20px;
-    margin-bottom:18px;
-">
-    <span style="color:white;font-size:28px;font-weight:700;">
-        CALCULATRICE APR
-    </span>
-</div>
-""", unsafe_allow_html=True)
-
-# Intro overlay
-st.markdown("""
-<div style="
-    background: linear-gradient(135deg, #141a3a 0%, #1f2a5c 100%);
-    padding:14px 18px;
-    border-radius:10px;
-    margin-bottom:24px;
-    color:#d8dbff;
-    font-size:14px;
-">
-APR estimé à partir de <b>l'historique des fees</b> et de la
-<b>liquidité active</b> d'une pool de liquidité concentrée.
-</div>
-""", unsafe_allow_html=True)
-
-st.header("Paramètres d'entrée")
+@st.fragment
+@profiled("apr")
+def apr_section(pool):
+    tokenA, tokenB = pool["tokenA"], pool["tokenB"]
+    P_lower, P_upper, L = st.session_state["il_position"]
 
-fees_usd_period = st.number_input(
-    "Total des fees générées sur la période (USD)",
-    min_value=0.0,
-    value=100.0,
-    step=1000.0
-)
-
-active_liquidity_usd_avg = st.number_input(
-    "Liquidité active moyenne sur la période (USD)",
-    min_value=0.0,
-    value=1000.0,
-    step=10000.0
-)
-
-period_days = st.number_input(
-    "Durée de la période (en jours)",
-    min_value=1,
-    value=30,
-    step=1
-)
-
-# ======================
-# Calcul
-# ======================
-
-apr = calculate_clmm_apr(
-    fees_usd_period,
-    active_liquidity_usd_avg,
-    period_days
-)
-
-# Résultat overlay
-st.markdown("""
-<div style="
-    background: linear-gradient(135deg, #0f3d2e 0%, #1c6b4f 100%);
-    padding:18px;
-    border-radius:12px;
-    margin-top:24px;
-">
-    <div style="color:#c9ffe8;font-size:14px;margin-bottom:6px;">
-        APR annualisé estimé
-    </div>
-    <div style="color:white;font-size:36px;font-weight:700;">
-        {apr_value} %
+    st.markdown("""
+    <div style="
+        background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);
+        padding:20px;
+        border-radius:12px;
+        margin-top:20px;
+        margin-bottom:18px;
+    ">
+        <span style="color:white;font-size:28px;font-weight:700;">
+            CALCULATRICE APR
+        </span>
     </div>
-</div>
-""".format(apr_value=f"{apr:.2f}"), unsafe_allow_html=True)
-
-
-
-# ======================= ATR RANGE BACKTEST =======================
-st.markdown("""
-<div style="
-    background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);
-    padding:20px;
-    border-radius:12px;
-    margin-top:20px;
-    margin-bottom:20px;
-">
-    <span style="color:white;font-size:28px;font-weight:700;">
-        ATR PAIRE VOLATILE STABLE
-    </span>
-</div>
-""", unsafe_allow_html=True)
-
-col_atr1, col_atr2, col_atr3 = st.columns([1,1,1])
+    """, unsafe_allow_html=True)
 
-with col_atr1:
-    atr_usd = st.number_input(
-        "ATR 14 ($)",
-        value=100.0,
-        min_value=0.01,
-        step=1.0,
-        help="Valeur ATR 14 ($) en daily (indicateur)"
-    )
+    # Intro overlay
+    st.markdown("""
+    <div style="
+        background: linear-gradient(135deg, #141a3a 0%, #1f2a5c 100%);
+        padding:14px 18px;
+        border-radius:10px;
+        margin-bottom:24px;
+        color:#d8dbff;
+        font-size:14px;
+    ">
+    APR estimé à partir de <b>l'historique des fees</b> et de la
+    <b>liquidité active</b> d'une pool de liquidité concentrée.
+    </div>
+    """, unsafe_allow_html=True)
 
-with col_atr2:
-    atr_mult = st.slider(
-        "Multiplicateur ATR",
-        0.5, 10.0, 3.0,
-        step=0.25,
-        help="Largeur du range = ATR × multiplicateur"
-    )
+    st.header("Paramètres d'entrée")
 
-with col_atr3:
-    asym_mode = st.selectbox(
-        "Stratégie de range",
-        ["Stratégie neutre", "Coup de pouce bull", "Coup de pouce bear", "Custom"]
+    fees_source = st.radio(
+        "Source des fees",
+        ["Saisie manuelle", "Fichier de swaps (CSV / Parquet)"],
+        horizontal=True,
+        key="fees_source"
     )
 
-# ---- Prix de référence ATR (manuel) ----
-asset_price = st.number_input(
-    "Prix de l'actif utilisé pour l'ATR ($)",
-    min_value=0.0001,
-    value=float(P_deposit),
-    step=1.0,
-    help="Prix réel de l'actif pour convertir l'ATR $ en %"
-)
-
-# ---- Conversion ATR $ → % (basée sur le prix de l'actif) ----
-atr_pct = (atr_usd / asset_price) * 100
-
-# ---- Calcul du range total ----
-range_total_pct = atr_pct * atr_mult
+    if fees_source == "Saisie manuelle":
+        fees_usd_period = st.number_input(
+            "Total des fees générées sur la période (USD)",
+            min_value=0.0,
+            value=100.0,
+            step=1000.0
+        )
 
-# ---- Gestion asymétrie ----
-if asym_mode == "Stratégie neutre":
-    low_weight, high_weight = 0.5, 0.5
-elif asym_mode == "Coup de pouce bull":
-    low_weight, high_weight = 0.2, 0.8
-elif asym_mode == "Coup de pouce bear":
-    low_weight, high_weight = 0.8, 0.2
-else:
-    cw1, cw2 = st.columns(2)
-    with cw1:
-        low_weight = st.slider("Poids bas (%)", 0, 100, 40) / 100
-    with cw2:
-        high_weight = 1 - low_weight
-
-# ---- Calcul prix bas / haut (en $) ----
-atr_low = P_deposit * (1 - range_total_pct * low_weight / 100)
-atr_high = P_deposit * (1 + range_total_pct * high_weight / 100)
-
-# ---- Conversion du range en % (affichage) ----
-low_pct_display = (atr_low / P_deposit - 1) * 100
-high_pct_display = (atr_high / P_deposit - 1) * 100
-
-# ---- Affichage ATR ----
-st.markdown(f"""
-<div style="
-    background-color:#27F5A9;
-    border-left:6px solid #00754A;
-    padding:18px 25px;
-    border-radius:12px;
-    margin-top:15px;
-    color:#000;
-    text-align:center;
-">
+        active_liquidity_usd_avg = st.number_input(
+            "Liquidité active moyenne sur la période (USD)",
+            min_value=0.0,
+            value=1000.0,
+            step=10000.0
+        )
 
-<h4 style="margin:0 0 10px 0;">Range basé sur ATR</h4>
+        period_days = st.number_input(
+            "Durée de la période (en jours)",
+            min_value=1,
+            value=30,
+            step=1
+        )
+    else:
+        # Position de la section IMPERMANENT LOSS (P_lower, P_upper, L)
+        swaps_path = st.text_input(
+            "Chemin du fichier de swaps",
+            help="Colonnes : timestamp, price, volume, fee_tier, liquidity (optionnelle)"
+        )
+        positions_path = st.text_input(
+            "Snapshot des positions de la pool (optionnel)",
+            help="CSV / Parquet : tick_lower, tick_upper, liquidity. La liquidité active est alors calculée au prix de chaque swap."
+        )
+        pool_liquidity = None
+        if positions_path:
+            try:
+                pool_liquidity = liquidity_index(
+                    positions_path,
+                    os.path.getmtime(positions_path),
+                    (TOKEN_DECIMALS[tokenA], TOKEN_DECIMALS[tokenB])
+                )
+                st.write(f"{pool_liquidity.n_positions:,} positions chargées")
+            except (OSError, KeyError, ValueError) as e:
+                st.error(f"Lecture du snapshot impossible : {e}")
+        if pool_liquidity is None:
+            pool_liquidity = st.number_input(
+                "Liquidité active de la pool (si absente du fichier)",
+                min_value=0.0,
+                value=float(L) * 1000,
+                help="Même unité que la liquidité L de la position"
+            )
+
+        fees_usd_period, active_liquidity_usd_avg, period_days = 0.0, 0.0, 0
+        if swaps_path:
+            try:
+                swaps = accrue_fees(
+                    iter_swap_file(swaps_path),
+                    P_lower,
+                    P_upper,
+                    L,
+                    pool_liquidity=pool_liquidity
+                )
+                fees_usd_period = swaps["fees"]
+                active_liquidity_usd_avg = swaps["active_value_avg"]
+                period_days = swaps["period_days"]
+                st.write(f"Liquidité active moyenne de la pool (pondérée par le temps) : {swaps['pool_liquidity_avg']:,.0f}")
+                st.write(
+                    f"{swaps['n_swaps']:,} swaps, dont {swaps['n_in_range']:,} dans le range | "
+                    f"Fees : {fees_usd_period:,.2f} $ | Valeur active moyenne : {active_liquidity_usd_avg:,.2f} $ | "
+                    f"Période : {period_days:.1f} j | Temps dans le range : {swaps['time_in_range'] * 100:.1f}%"
+                )
+            except (OSError, KeyError, ValueError) as e:
+                st.error(f"Lecture du fichier de swaps impossible : {e}")
+
+    # ======================
+    # Calcul
+    # ======================
+
+    apr = calculate_clmm_apr(
+        fees_usd_period,
+        active_liquidity_usd_avg,
+        period_days
+    )
 
-<div style="font-size:16px;font-weight:600;line-height:1.6em;">
-ATR 14 : {atr_usd:.2f}$ | ATR (%) : {atr_pct:.2f}% | Multiplicateur : x{atr_mult:.2f}<br>
-Prix actif ATR : {asset_price:.2f}$<br>
-Range total : {range_total_pct:.2f}%<br>
-<span style='color:#ff9f1c;'>ATR Low : {atr_low:.2f}$ | ATR High : {atr_high:.2f}$</span><br>
-Low : {low_pct_display:.2f}% | High : +{high_pct_display:.2f}%
-</div>
-</div>
-""", unsafe_allow_html=True)
+    # Résultat overlay
+    st.markdown("""
+    <div style="
+        background: linear-gradient(135deg, #0f3d2e 0%, #1c6b4f 100%);
+        padding:18px;
+        border-radius:12px;
+        margin-top:24px;
+    ">
+        <div style="color:#c9ffe8;font-size:14px;margin-bottom:6px;">
+            APR annualisé estimé
+        </div>
+        <div style="color:white;font-size:36px;font-weight:700;">
+            {apr_value} %
+        </div>
+    </div>
+    """.format(apr_value=f"{apr:.2f}"), unsafe_allow_html=True)
 
+apr_section(pool)
 
 
-# ----------------- Définition de la fonction ATR Expert -----------------
-def calculate_pair_atr(price_x, atr_x, price_y, atr_y, multiplier=1):
-    """Calcule le range ATR d'une paire X/Y avec multiplicateur"""
-    pair_price = price_x / price_y
-    delta_x = atr_x / price_y
-    delta_y = (price_x / (price_y ** 2)) * atr_y
+# ======================= ATR RANGE BACKTEST =======================
+@st.fragment
+@profiled("atr")
+def atr_section(pool):
+    tokenA, priceA_usd, okA = pool["tokenA"], pool["priceA_usd"], pool["okA"]
+    P_deposit = st.session_state["il_deposit"]
+    st.markdown("""
+    <div style="
+        background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);
+        padding:20px;
+        border-radius:12px;
+        margin-top:20px;
+        margin-bottom:20px;
+    ">
+        <span style="color:white;font-size:28px;font-weight:700;">
+            ATR PAIRE VOLATILE STABLE
+        </span>
+    </div>
+    """, unsafe_allow_html=True)
 
-    atr_pair_raw = math.sqrt(delta_x ** 2 + delta_y ** 2)
-    atr_pair = atr_pair_raw * multiplier
+    col_atr1, col_atr2, col_atr3 = st.columns([1,1,1])
 
-    low = pair_price - atr_pair
-    high = pair_price + atr_pair
-    range_pct = (atr_pair / pair_price) * 100
+    with col_atr1:
+        atr_auto = get_daily_atr(COINGECKO_IDS[tokenA])
+        atr_usd = st.number_input(
+            "ATR 14 ($)",
+            value=max(float(atr_auto), 0.01) if np.isfinite(atr_auto) else 100.0,
+            min_value=0.01,
+            step=1.0,
+            help="Valeur ATR 14 ($) en daily (indicateur)"
+        )
 
-    return {
-        "pair_price": pair_price,
-        "atr_pair": atr_pair,
-        "low": low,
-        "high": high,
-        "range_pct": range_pct
-    }
+    with col_atr2:
+        atr_mult = st.slider(
+            "Multiplicateur ATR",
+            0.5, 10.0, 3.0,
+            step=0.25,
+            help="Largeur du range = ATR × multiplicateur"
+        )
 
-# ---------------- Interface ATR EXPERT ----------------
-st.markdown("""
-<div style="
-    background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);
-    padding:20px;
-    border-radius:12px;
-    margin-top:20px;
-    margin-bottom:20px;
-">
-    <span style="color:white;font-size:28px;font-weight:700;">
-        ATR PAIRE DOUBLE VOLATILE
-    </span>
-</div>
-""", unsafe_allow_html=True)
+    with col_atr3:
+        asym_mode = st.selectbox(
+            "Stratégie de range",
+            ["Stratégie neutre", "Coup de pouce bull", "Coup de pouce bear", "Custom"]
+        )
 
-col1, col2, col3, col4 = st.columns(4)
+    # ---- Prix de référence ATR (manuel) ----
+    asset_price = st.number_input(
+        "Prix de l'actif utilisé pour l'ATR ($)",
+        min_value=0.0001,
+        value=float(priceA_usd) if okA else float(P_deposit),
+        step=1.0,
+        help="Prix réel de l'actif pour convertir l'ATR $ en %"
+    )
 
-with col1:
-    price_x = st.number_input("Prix actuel actif X", value=3111.0, key="price_x_pair_expert")
-with col2:
-    atr_x = st.number_input("ATR daily X", value=174.0, key="atr_x_pair_expert")
-with col3:
-    price_y = st.number_input("Prix actuel actif Y", value=90113.0, key="price_y_pair_expert")
-with col4:
-    atr_y = st.number_input("ATR daily Y", value=3282.0, key="atr_y_pair_expert")
-
-# Multiplicateur ATR avec pas de 0,5
-atr_multiplier = st.slider(
-    "Multiplicateur ATR",
-    min_value=1.0,
-    max_value=6.0,
-    value=1.0,
-    step=0.5
-)
+    # ---- Conversion ATR $ → % (basée sur le prix de l'actif) ----
+    atr_pct = (atr_usd / asset_price) * 100
 
-if st.button("Calculer ATR et RANGE", key="calc_atr_pair_expert"):
-    result = calculate_pair_atr(
-        price_x,
-        atr_x,
-        price_y,
-        atr_y,
-        atr_multiplier
-    )
+    # ---- Calcul du range total ----
+    range_total_pct = atr_pct * atr_mult
 
+    # ---- Gestion asymétrie ----
+    if asym_mode == "Stratégie neutre":
+        low_weight, high_weight = 0.5, 0.5
+    elif asym_mode == "Coup de pouce bull":
+        low_weight, high_weight = 0.2, 0.8
+    elif asym_mode == "Coup de pouce bear":
+        low_weight, high_weight = 0.8, 0.2
+    else:
+        cw1, cw2 = st.columns(2)
+        with cw1:
+            low_weight = st.slider("Poids bas (%)", 0, 100, 40) / 100
+        with cw2:
+            high_weight = 1 - low_weight
+
+    # ---- Calcul prix bas / haut (en $) ----
+    # P_deposit est relu dans la session à chaque exécution de ce fragment
+    st.caption(f"Range centré sur le P_deposit de la section IL ({P_deposit:,.2f})")
+    atr_low = P_deposit * (1 - range_total_pct * low_weight / 100)
+    atr_high = P_deposit * (1 + range_total_pct * high_weight / 100)
+
+    # ---- Conversion du range en % (affichage) ----
+    low_pct_display = (atr_low / P_deposit - 1) * 100
+    high_pct_display = (atr_high / P_deposit - 1) * 100
+
+    # ---- Affichage ATR ----
     st.markdown(f"""
     <div style="
-        background-color:#FFD700;
-        border-left:6px solid #FF8C00;
+        background-color:#27F5A9;
+        border-left:6px solid #00754A;
         padding:18px 25px;
         border-radius:12px;
         margin-top:15px;
         color:#000;
         text-align:center;
     ">
-    <h4 style="margin:0 0 10px 0;">ATR Paire Volatile</h4>
+
+    <h4 style="margin:0 0 10px 0;">Range basé sur ATR</h4>
+
     <div style="font-size:16px;font-weight:600;line-height:1.6em;">
-    Prix de la paire X/Y : {result['pair_price']:.6f}<br>
-    ATR de la paire (x{atr_multiplier}) : {result['atr_pair']:.6f}<br>
-    Low / High : {result['low']:.6f} / {result['high']:.6f}<br>
-    Range % : ±{result['range_pct']:.2f}%
+    ATR 14 : {atr_usd:.2f}$ | ATR (%) : {atr_pct:.2f}% | Multiplicateur : x{atr_mult:.2f}<br>
+    Prix actif ATR : {asset_price:.2f}$<br>
+    Range total : {range_total_pct:.2f}%<br>
+    <span style='color:#ff9f1c;'>ATR Low : {atr_low:.2f}$ | ATR High : {atr_high:.2f}$</span><br>
+    Low : {low_pct_display:.2f}% | High : +{high_pct_display:.2f}%
+    </div>
     </div>
+    """, unsafe_allow_html=True)
+
+atr_section(pool)
+
+
+# ---------------- Interface ATR EXPERT ----------------
+@st.fragment
+@profiled("atr_expert")
+def atr_expert_section(pool):
+    tokenA, tokenB, selected_pair = pool["tokenA"], pool["tokenB"], pool["selected_pair"]
+    priceA_usd, priceB_usd = pool["priceA_usd"], pool["priceB_usd"]
+    okA, okB, market_cov = pool["okA"], pool["okB"], pool["market_cov"]
+    st.markdown("""
+    <div style="
+        background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);
+        padding:20px;
+        border-radius:12px;
+        margin-top:20px;
+        margin-bottom:20px;
+    ">
+        <span style="color:white;font-size:28px;font-weight:700;">
+            ATR PAIRE DOUBLE VOLATILE
+        </span>
     </div>
     """, unsafe_allow_html=True)
 
+    col1, col2, col3, col4 = st.columns(4)
+
+    # ---- ATR daily calculés depuis l'historique (X = token A, Y = token B) ----
+    atr_x_auto = get_daily_atr(COINGECKO_IDS[tokenA])
+    atr_y_auto = get_daily_atr(COINGECKO_IDS[tokenB])
+
+    with col1:
+        price_x = st.number_input(
+            "Prix actuel actif X",
+            value=float(priceA_usd) if okA else 3111.0,
+            key=f"price_x_pair_expert_{selected_pair}"
+        )
+    with col2:
+        atr_x = st.number_input(
+            "ATR daily X",
+            value=float(atr_x_auto) if np.isfinite(atr_x_auto) else 174.0,
+            key=f"atr_x_pair_expert_{selected_pair}"
+        )
+    with col3:
+        price_y = st.number_input(
+            "Prix actuel actif Y",
+            value=float(priceB_usd) if okB else 90113.0,
+            key=f"price_y_pair_expert_{selected_pair}"
+        )
+    with col4:
+        atr_y = st.number_input(
+            "ATR daily Y",
+            value=float(atr_y_auto) if np.isfinite(atr_y_auto) else 3282.0,
+            key=f"atr_y_pair_expert_{selected_pair}"
+        )
+
+    # Multiplicateur ATR avec pas de 0,5
+    atr_multiplier = st.slider(
+        "Multiplicateur ATR",
+        min_value=1.0,
+        max_value=6.0,
+        value=1.0,
+        step=0.5
+    )
+
+    if st.button("Calculer ATR et RANGE", key="calc_atr_pair_expert"):
+        # Corrélation X/Y tirée de la matrice de covariance 30 j
+        rho_xy = correlation(market_cov, tokenA, tokenB)
+        result = calculate_pair_atr(
+            price_x,
+            atr_x,
+            price_y,
+            atr_y,
+            atr_multiplier,
+            rho=rho_xy
+        )
+
+        st.markdown(f"""
+        <div style="
+            background-color:#FFD700;
+            border-left:6px solid #FF8C00;
+            padding:18px 25px;
+            border-radius:12px;
+            margin-top:15px;
+            color:#000;
+            text-align:center;
+        ">
+        <h4 style="margin:0 0 10px 0;">ATR Paire Volatile</h4>
+        <div style="font-size:16px;font-weight:600;line-height:1.6em;">
+        Prix de la paire X/Y : {result['pair_price']:.6f}<br>
+        ATR de la paire (x{atr_multiplier}) : {result['atr_pair']:.6f}<br>
+        Low / High : {result['low']:.6f} / {result['high']:.6f}<br>
+        Range % : ±{result['range_pct']:.2f}%<br>
+        Corrélation {tokenA}/{tokenB} (30 j) : {rho_xy:.2f}
+        </div>
+        </div>
+        """, unsafe_allow_html=True)
+
+atr_expert_section(pool)
+
 
 # --- GUIDE COMPLET ---
 st.markdown("""
@@ -1608,140 +2066,269 @@ components.iframe(
 
 st.set_page_config(layout="wide")
 
-# --- Header ---
-st.markdown("""
-<div style="
-    background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);
-    padding:20px;
-    border-radius:12px;
-    margin-top:20px;
-    margin-bottom:20px;
-">
-    <span style="color:white;font-size:28px;font-weight:700;">
-        CALCULATRICE BREAK-EVEN LP
-    </span>
-</div>
-""", unsafe_allow_html=True)
-
-# --- Type de paire ---
-pair_type = st.selectbox(
-    "Type de paire",
-    ["Volatile / Stable", "Double Volatile"]
-)
-
-st.divider()
+@st.fragment
+@profiled("break_even")
+def break_even_section():
 
-# --- Colonnes ---
-col1, col2, col3 = st.columns(3)
+    # --- Header ---
+    st.markdown("""
+    <div style="
+        background: linear-gradient(135deg, #0a0f1f 0%, #1e2761 40%, #4b1c7d 100%);
+        padding:20px;
+        border-radius:12px;
+        margin-top:20px;
+        margin-bottom:20px;
+    ">
+        <span style="color:white;font-size:28px;font-weight:700;">
+            CALCULATRICE BREAK-EVEN LP
+        </span>
+    </div>
+    """, unsafe_allow_html=True)
 
-with col1:
-    st.subheader("METRICS")
-    capital = st.number_input(
-        "Capital engagé ($)",
-        value=6400.0,
-        step=0.01,
-        format="%.2f"
-    )
-    fees = st.number_input(
-        "Fees accumulés ($)",
-        value=140.0,
-        step=0.01,
-        format="%.2f"
+    # --- Type de paire ---
+    pair_type = st.selectbox(
+        "Type de paire",
+        ["Volatile / Stable", "Double Volatile"]
     )
 
-with col2:
-    st.subheader("Token A")
-    qty_a = st.number_input(
-        "Quantité",
-        value=1.5,
-        step=0.0001,
-        format="%.6f"
-    )
-    price_a = st.number_input(
-        "Prix actuel ($)",
-        value=2950.0,
-        step=0.01,
-        format="%.2f"
-    )
+    st.divider()
+
+    # --- Colonnes ---
+    col1, col2, col3 = st.columns(3)
 
-with col3:
-    if pair_type == "Volatile / Stable":
-        st.subheader("Token B (Stable)")
-        stable_amount = st.number_input(
-            "Montant ($)",
-            value=1500.0,
+    with col1:
+        st.subheader("METRICS")
+        capital = st.number_input(
+            "Capital engagé ($)",
+            value=6400.0,
+            step=0.01,
+            format="%.2f"
+        )
+        fees = st.number_input(
+            "Fees accumulés ($)",
+            value=140.0,
             step=0.01,
             format="%.2f"
         )
 
-        value = qty_a * price_a + stable_amount
-        effective_b = stable_amount + fees
-
-    else:
-        st.subheader("Token B (Volatile)")
-        qty_b = st.number_input(
+    with col2:
+        st.subheader("Token A")
+        qty_a = st.number_input(
             "Quantité",
-            value=0.5,
+            value=1.5,
             step=0.0001,
             format="%.6f"
         )
-        price_b = st.number_input(
+        price_a = st.number_input(
             "Prix actuel ($)",
-            value=2000.0,
+            value=2950.0,
             step=0.01,
             format="%.2f"
         )
 
-        value = qty_a * price_a + qty_b * price_b
-        effective_b = qty_b * price_b + fees
-
-st.divider()
-
-# ======================= CALCULS =======================
-
-pnl = value - capital
-pnl_to_be = capital - value
-pnl_pct = (value / capital - 1) * 100
-
-break_even_a = (capital - effective_b) / qty_a
+    with col3:
+        if pair_type == "Volatile / Stable":
+            st.subheader("Token B (Stable)")
+            stable_amount = st.number_input(
+                "Montant ($)",
+                value=1500.0,
+                step=0.01,
+                format="%.2f"
+            )
 
-break_even_b = None
-if pair_type == "Double Volatile":
-    break_even_b = (capital - (qty_a * price_a) - fees) / qty_b
+            value = qty_a * price_a + stable_amount
+            effective_b = stable_amount + fees
 
-bg_color = "#FF6B6B" if pnl < 0 else "#2EF2A2"
-
-# ======================= OVERLAY =======================
+        else:
+            st.subheader("Token B (Volatile)")
+            qty_b = st.number_input(
+                "Quantité",
+                value=0.5,
+                step=0.0001,
+                format="%.6f"
+            )
+            price_b = st.number_input(
+                "Prix actuel ($)",
+                value=2000.0,
+                step=0.01,
+                format="%.2f"
+            )
+
+            value = qty_a * price_a + qty_b * price_b
+            effective_b = qty_b * price_b + fees
+
+    if pair_type == "Double Volatile":
+        r1, r2, r3 = st.columns(3)
+        range_low = r1.number_input("Range bas (A/B, 0 = quantités figées)", value=0.0, min_value=0.0, format="%.6f")
+        range_high = r2.number_input("Range haut (A/B)", value=0.0, min_value=0.0, format="%.6f")
+        span = r3.slider("Amplitude de la carte (± %)", 10, 90, 50, step=5) / 100
+        ranged = 0 < range_low < range_high
+        low, high = (range_low, range_high) if ranged else (np.nan, np.nan)
+
+    st.divider()
+
+    # ======================= CALCULS =======================
+
+    pnl = value - capital
+    pnl_to_be = capital - value
+    pnl_pct = (value / capital - 1) * 100
+
+    break_even_a = (capital - effective_b) / qty_a
+
+    break_even_b = None
+    if pair_type == "Double Volatile":
+        break_even_b = (capital - (qty_a * price_a) - fees) / qty_b
+        if ranged:
+            # La composition suit la courbe CLMM : break-even lu sur une coupe de la surface
+            line = np.geomspace(0.01, 100, 4001)
+            break_even_a = break_even_price(
+                price_a * line, break_even_surface(price_a * line, [price_b], qty_a, qty_b, price_a, price_b,
+                                                   capital, fees, low, high)[0, 0]
+            )
+            break_even_b = break_even_price(
+                price_b * line, break_even_surface([price_a], price_b * line, qty_a, qty_b, price_a, price_b,
+                                                   capital, fees, low, high)[0, :, 0]
+            )
+    fmt_be = lambda p: "—" if p is None else f"{p:.2f} $"
+
+    bg_color = "#FF6B6B" if pnl < 0 else "#2EF2A2"
+
+    # ======================= OVERLAY =======================
+
+    if pair_type == "Double Volatile":
+        overlay_html = f"""
+        <div style="background:{bg_color};padding:40px;border-radius:18px;text-align:center;margin-top:30px;color:#000;">
+            <h3>Résultat Break-Even LP</h3>
+            <p style="font-size:18px;">
+                Valeur actuelle : <b>{value:.2f} $</b><br><br>
+                P&L actuelle : <b>{pnl:.2f} $</b> ({pnl_pct:.2f} %)<br>
+                P&L restante pour BE : <b>{pnl_to_be:.2f} $</b><br><br>
+                Break-even Token A : <b>{fmt_be(break_even_a)}</b><br>
+                Break-even Token B : <b>{fmt_be(break_even_b)}</b>
+            </p>
+            <p style="font-size:13px;margin-top:15px;">
+                Break-even conditionnel : dépend du prix de l’autre actif
+            </p>
+        </div>
+        """
+    else:
+        overlay_html = f"""
+        <div style="background:{bg_color};padding:40px;border-radius:18px;text-align:center;margin-top:30px;color:#000;">
+            <h3>Résultat Break-Even LP</h3>
+            <p style="font-size:18px;">
+                Valeur actuelle : <b>{value:.2f} $</b>&nbsp;&nbsp;|&nbsp;&nbsp;
+                P&L : <b>{pnl:.2f} $</b>&nbsp;&nbsp;({pnl_pct:.2f} %)&nbsp;&nbsp;|&nbsp;&nbsp;
+                Break-even Token A : <b>{fmt_be(break_even_a)}</b>
+            </p>
+            <p style="font-size:13px;margin-top:15px;">
+                Break-even valide tant que la position reste dans le range
+            </p>
+        </div>
+        """
+
+    st.markdown(overlay_html, unsafe_allow_html=True)
+
+    if pair_type == "Double Volatile":
+        break_even_map(capital, fees, qty_a, qty_b, price_a, price_b, low, high, span)
+
+
+def break_even_map(capital, fees, qty_a, qty_b, price_a, price_b, low, high, span):
+    """Carte P&L (prix A, prix B) de la position et des autres positions de la paire, ligne de break-even"""
+    st.subheader("Carte break-even (prix A, prix B)")
+    book = st.data_editor(
+        pd.DataFrame({
+            "Capital ($)": pd.Series(dtype=float),
+            "Fees ($)": pd.Series(dtype=float),
+            "Quantité A": pd.Series(dtype=float),
+            "Quantité B": pd.Series(dtype=float),
+            "Range bas (A/B)": pd.Series(dtype=float),
+            "Range haut (A/B)": pd.Series(dtype=float)
+        }),
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        key="break_even_book"
+    )
+    book = book[book["Capital ($)"].fillna(0) > 0].fillna(0)
+    book_low = book["Range bas (A/B)"].to_numpy(dtype=float)
+    book_high = book["Range haut (A/B)"].to_numpy(dtype=float)
+    book_ranged = (book_low > 0) & (book_high > book_low)
+
+    # Une ligne par position : la position saisie puis celles du tableau (mêmes prix actuels)
+    lows = np.concatenate([[low], np.where(book_ranged, book_low, np.nan)])
+    highs = np.concatenate([[high], np.where(book_ranged, book_high, np.nan)])
+    grid_a = np.linspace(price_a * (1 - span), price_a * (1 + span), 200)
+    grid_b = np.linspace(price_b * (1 - span), price_b * (1 + span), 200)
+    with section("break_even.surface"):
+        surface = break_even_surface(
+            grid_a, grid_b,
+            np.concatenate([[qty_a], book["Quantité A"]]),
+            np.concatenate([[qty_b], book["Quantité B"]]),
+            price_a, price_b,
+            np.concatenate([[capital], book["Capital ($)"]]),
+            np.concatenate([[fees], book["Fees ($)"]]),
+            lows, highs
+        )
+    total = surface.sum(axis=0)
+    zero = dict(start=0, end=0, size=1, coloring="lines", showlabels=False)
 
-if pair_type == "Double Volatile":
-    overlay_html = f"""
-    <div style="background:{bg_color};padding:40px;border-radius:18px;text-align:center;margin-top:30px;color:#000;">
-        <h3>Résultat Break-Even LP</h3>
-        <p style="font-size:18px;">
-            Valeur actuelle : <b>{value:.2f} $</b><br><br>
-            P&L actuelle : <b>{pnl:.2f} $</b> ({pnl_pct:.2f} %)<br>
-            P&L restante pour BE : <b>{pnl_to_be:.2f} $</b><br><br>
-            Break-even Token A : <b>{break_even_a:.2f} $</b><br>
-            Break-even Token B : <b>{break_even_b:.2f} $</b>
-        </p>
-        <p style="font-size:13px;margin-top:15px;">
-            Break-even conditionnel : dépend du prix de l’autre actif
-        </p>
-    </div>
-    """
-else:
-    overlay_html = f"""
-    <div style="background:{bg_color};padding:40px;border-radius:18px;text-align:center;margin-top:30px;color:#000;">
-        <h3>Résultat Break-Even LP</h3>
-        <p style="font-size:18px;">
-            Valeur actuelle : <b>{value:.2f} $</b>&nbsp;&nbsp;|&nbsp;&nbsp;
-            P&L : <b>{pnl:.2f} $</b>&nbsp;&nbsp;({pnl_pct:.2f} %)&nbsp;&nbsp;|&nbsp;&nbsp;
-            Break-even Token A : <b>{break_even_a:.2f} $</b>
-        </p>
-        <p style="font-size:13px;margin-top:15px;">
-            Break-even valide tant que la position reste dans le range
-        </p>
-    </div>
-    """
+    fig_be = go.Figure()
+    fig_be.add_trace(go.Contour(
+        x=grid_a, y=grid_b, z=total, colorscale="RdYlGn", zmid=0, ncontours=25,
+        line=dict(width=0), colorbar=dict(title="P&L ($)"), name="P&L"
+    ))
+    if len(surface) > 1:
+        for k, z in enumerate(surface):
+            fig_be.add_trace(go.Contour(
+                x=grid_a, y=grid_b, z=z, contours=zero, showscale=False, hoverinfo="skip",
+                line=dict(color="rgba(255,255,255,0.5)", width=1, dash="dot"),
+                name=f"BE position {k + 1}"
+            ))
+    fig_be.add_trace(go.Contour(
+        x=grid_a, y=grid_b, z=total, contours=zero, showscale=False, hoverinfo="skip",
+        line=dict(color="white", width=3), name="Break-even"
+    ))
+    fig_be.add_trace(go.Scatter(
+        x=[price_a], y=[price_b], mode="markers", name="Prix actuels",
+        marker=dict(color="#1de9b6", size=12, symbol="x")
+    ))
+    fig_be.update_layout(
+        height=520,
+        margin=dict(l=70, r=40, t=30, b=50),
+        plot_bgcolor="#173a57",
+        paper_bgcolor="#173a57",
+        font=dict(color="white"),
+        xaxis=dict(title="Prix Token A ($)"),
+        yaxis=dict(title="Prix Token B ($)"),
+        showlegend=False
+    )
+    with section("break_even.chart"):
+        st.plotly_chart(fig_be, use_container_width=True)
+    st.caption(
+        "Zone verte : valeur + fees au-dessus du capital. Ligne blanche : break-even du total ; "
+        "pointillés : break-even de chaque position. Avec un range, la composition suit la courbe CLMM "
+        "(quantités figées hors range), sinon les quantités restent fixes."
+    )
 
-st.markdown(overlay_html, unsafe_allow_html=True)
+break_even_section()
+
+
+# ======================= DIAGNOSTICS (LP_PROFILE=1, ?diag=1) =======================
+profiling.record("page", time.perf_counter() - page_start)
+profiling.flush_counters()
+
+if profiling.ENABLED and st.query_params.get("diag") == "1":
+    with st.expander("Diagnostics", expanded=True):
+        st.caption(f"Mesures de ce processus (5000 derniers événements), aussi écrites dans {profiling.METRICS_FILE}")
+        st.markdown("**Sections**")
+        st.dataframe(pd.DataFrame(profiling.summary("section")), use_container_width=True, hide_index=True)
+        st.markdown("**Appels HTTP**")
+        st.dataframe(pd.DataFrame(profiling.summary("http")), use_container_width=True, hide_index=True)
+        st.markdown("**Caches Streamlit**")
+        st.dataframe(pd.DataFrame(profiling.cache_hit_rates()), use_container_width=True, hide_index=True)
+        st.markdown("**Compteurs de cache**")
+        st.dataframe(
+            pd.DataFrame(sorted(profiling.counters().items()), columns=["name", "count"]),
+            use_container_width=True,
+            hide_index=True
+        )
@@ -0,0 +1,216 @@
+"""
+Backtests en lot sans navigateur : stratégies x paires x ranges x triggers.
+
+    python batch.py scenarios/nightly.json --out results/nightly.parquet
+    python batch.py scenarios/nightly.json --workers 8 --resolution hourly
+
+Le fichier de scénarios (JSON) contient une grille ou une liste de grilles :
+
+    {
+        "strategies": "all",                          # ou ["Neutre", "Coup de pouce"]
+        "pairs": "all",                               # ou ["WETH/USDC"]
+        "range_pcts": {"start": 2, "stop": 40, "step": 2},
+        "range_percents": null,                       # null = même range après rebalance
+        "trig_lows": [0, 10, 20],
+        "trig_highs": [80, 90, 100],
+        "buffers": [1, 15, 60],                       # time-buffer en bougies consécutives
+        "capital": 1000,                              # en token B
+        "tick_spacing": null,
+        "costs": {"fee_tier": 500, "gas": 0.5}        # coûts de swap des rebalances (token B), optionnel
+    }
+
+Les scénarios sont répartis sur un pool de processus. Chaque worker lit les
+historiques dans le store local (fichiers mappés en mémoire, partagés par le
+cache du système) : aucun tableau de prix n'est sérialisé vers les workers.
+Résultats et temps par scénario sont écrits en Parquet (ou CSV selon l'extension).
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from lpcore.backtest import batch_backtest
+from lpcore.catalog import COINGECKO_IDS, PAIRS, STRATEGIES, TOKEN_DECIMALS
+from lpcore.store import pair_history
+
+GRID_KEYS = ("range_pcts", "range_percents", "trig_lows", "trig_highs", "buffers")
+DEFAULTS = {
+    "strategies": "all",
+    "pairs": "all",
+    "range_percents": None,
+    "trig_lows": [0.0],
+    "trig_highs": [100.0],
+    "buffers": [1],
+    "capital": 1000.0,
+    "tick_spacing": None,
+    "costs": None
+}
+
+
+# --- Scénarios ---
+def _values(spec):
+    """Liste de valeurs ou plage {"start", "stop", "step"} (stop inclus)"""
+    if spec is None:
+        return [None]
+    if isinstance(spec, dict):
+        return np.arange(spec["start"], spec["stop"] + spec["step"] / 2, spec["step"]).tolist()
+    if isinstance(spec, (int, float)):
+        return [spec]
+    return list(spec)
+
+def expand_scenarios(config):
+    """Développe une grille (ou une liste de grilles) en liste de scénarios"""
+    grids = config if isinstance(config, list) else config.get("grids", [config])
+    scenarios = []
+    for grid in grids:
+        grid = {**DEFAULTS, **grid}
+        strategies = list(STRATEGIES) if grid["strategies"] == "all" else grid["strategies"]
+        pairs = [f"{a}/{b}" for a, b in PAIRS] if grid["pairs"] == "all" else grid["pairs"]
+        for strategy in strategies:
+            if strategy not in STRATEGIES:
+                raise ValueError(f"stratégie inconnue : {strategy}")
+        for pair in pairs:
+            if tuple(pair.split("/")) not in PAIRS:
+                raise ValueError(f"paire inconnue : {pair}")
+
+        for pair, strategy, rp, rf, tl, th, buf in itertools.product(
+            pairs, strategies, *(_values(grid[k]) for k in GRID_KEYS)
+        ):
+            scenarios.append({
+                "pair": pair,
+                "strategy": strategy,
+                "range_pct": float(rp),
+                "range_percent": float(rp if rf is None else rf),
+                "trig_low": float(tl),
+                "trig_high": float(th),
+                "buffer": int(buf),
+                "capital": float(grid["capital"]),
+                "tick_spacing": grid["tick_spacing"],
+                "costs": grid["costs"]
+            })
+    return scenarios
+
+
+# --- Worker ---
+_worker = {}
+
+def _init_worker(root, resolution):
+    _worker.update(root=root, resolution=resolution, prices={})
+
+def _pair_prices(pair):
+    """Historique aligné de la paire, construit une fois par worker depuis le store mappé"""
+    if pair not in _worker["prices"]:
+        a, b = pair.split("/")
+        _, prices = pair_history(COINGECKO_IDS[a], COINGECKO_IDS[b], _worker["resolution"], _worker["root"])
+        _worker["prices"][pair] = prices
+    return _worker["prices"][pair]
+
+def run_chunk(chunk):
+    """
+    Exécute une liste de scénarios d'une même paire, une ligne de résultat par
+    scénario. Les scénarios qui partagent stratégie, capital, tick spacing et coûts
+    sont simulés ensemble (batch_backtest) ; seconds est leur part du temps du lot.
+    """
+    rows = []
+    prices = _pair_prices(chunk[0]["pair"])
+    a, b = chunk[0]["pair"].split("/")
+    settings = lambda sc: (sc["strategy"], sc["capital"], sc["tick_spacing"] or 0, json.dumps(sc["costs"], sort_keys=True))
+
+    for (strategy, capital, tick_spacing, _), group in itertools.groupby(sorted(chunk, key=settings), key=settings):
+        group = list(group)
+        t = time.perf_counter()
+        if len(prices) >= 2:
+            res = batch_backtest(
+                prices,
+                [sc["range_pct"] for sc in group],
+                [sc["trig_low"] for sc in group],
+                [sc["trig_high"] for sc in group],
+                range_percent=[sc["range_percent"] for sc in group],
+                buffer=[sc["buffer"] for sc in group],
+                ratio=STRATEGIES[strategy]["ratio"],
+                capital=capital,
+                tick_spacing=tick_spacing or None,
+                decimals=(TOKEN_DECIMALS[a], TOKEN_DECIMALS[b]),
+                costs=group[0]["costs"]
+            )
+        else:
+            nan = np.full(len(group), np.nan)
+            res = {"final_value": nan, "final_hodl": nan, "vs_hodl": nan, "total_cost": nan,
+                   "n_rebalances": np.zeros(len(group), dtype=np.int64), "time_in_range": nan}
+        share = (time.perf_counter() - t) / len(group)
+
+        for i, sc in enumerate(group):
+            rows.append(dict(
+                {k: v for k, v in sc.items() if k != "costs"},
+                **{f"cost_{k}": v for k, v in (sc["costs"] or {}).items()},
+                final_value=float(res["final_value"][i]),
+                final_hodl=float(res["final_hodl"][i]),
+                vs_hodl=float(res["vs_hodl"][i]),
+                n_rebalances=int(res["n_rebalances"][i]),
+                total_cost=float(res["total_cost"][i]),
+                time_in_range=float(res["time_in_range"][i]),
+                n_points=len(prices),
+                worker=os.getpid(),
+                seconds=share
+            ))
+    return rows
+
+def _chunks(scenarios, n_chunks):
+    """Découpe par paire (un historique par bloc) puis en blocs de taille voisine"""
+    size = max(1, -(-len(scenarios) // n_chunks))
+    for _, group in itertools.groupby(sorted(scenarios, key=lambda s: s["pair"]), key=lambda s: s["pair"]):
+        group = list(group)
+        for i in range(0, len(group), size):
+            yield group[i:i + size]
+
+
+# --- Sortie ---
+def write_results(rows, path):
+    import pandas as pd
+
+    df = pd.DataFrame(rows)
+    df["tick_spacing"] = df["tick_spacing"].astype("Int64")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.lower().endswith(".csv"):
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtests en lot (sans interface)")
+    parser.add_argument("scenarios", help="fichier JSON de scénarios")
+    parser.add_argument("--out", default=os.path.join("results", time.strftime("batch-%Y%m%d-%H%M%S.parquet")))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--resolution", default="daily", help="résolution du store (daily, hourly, minute)")
+    parser.add_argument("--store", help="répertoire du store de prix (LP_PRICE_STORE par défaut)")
+    args = parser.parse_args()
+
+    with open(args.scenarios) as f:
+        scenarios = expand_scenarios(json.load(f))
+    print(f"{len(scenarios):,} scénarios, {args.workers} workers")
+
+    t = time.perf_counter()
+    rows = []
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(args.store, args.resolution)
+    ) as pool:
+        for chunk_rows in pool.map(run_chunk, _chunks(scenarios, args.workers * 4)):
+            rows.extend(chunk_rows)
+    wall = time.perf_counter() - t
+
+    df = write_results(rows, args.out)
+    busy = float(df["seconds"].sum())
+    print(f"Terminé en {wall:.2f} s (calcul cumulé {busy:.2f} s, x{busy / wall if wall else 0:.1f})")
+    print(f"Résultats : {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+Benchmarks des kernels CLMM et des simulations sur des séries synthétiques.
+
+    python benchmarks/bench.py run --label avant
+    python benchmarks/bench.py run --label apres --sizes 1000 100000
+    python benchmarks/bench.py compare benchmarks/results/avant.json benchmarks/results/apres.json
+    python benchmarks/bench.py run --replay recordings --latency 80    # API rejouée (hors ligne)
+
+Chaque mesure donne le meilleur temps sur --repeat exécutions, le débit
+(points / s) et le pic mémoire (tracemalloc, exécution séparée).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lpcore.clmm import compute_L, tokens_from_L, normalize_L, V_LP  # noqa: E402
+from lpcore.il import il_curve  # noqa: E402
+from lpcore.volatility import compute_pair_volatility  # noqa: E402
+from lpcore.backtest import run_backtest, sweep_backtest  # noqa: E402
+from lpcore.montecarlo import monte_carlo_range  # noqa: E402
+from lpcore.portfolio import portfolio_backtest  # noqa: E402
+from lpcore.breakeven import break_even_surface  # noqa: E402
+from lpcore.fees import accrue_fees  # noqa: E402
+from lpcore.decimate import lttb  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+
+# --- Données synthétiques ---
+def gbm(n, P0=3000.0, vol=0.0008, seed=0):
+    rng = np.random.default_rng(seed)
+    return P0 * np.exp(np.cumsum(rng.normal(0, vol, n)))
+
+def swaps(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "timestamp": np.arange(n) * 12.0,
+        "price": gbm(n, seed=seed),
+        "volume": rng.exponential(1000.0, n),
+        "fee_tier": np.full(n, 500.0)
+    }
+
+def portfolio(n):
+    ts = np.arange(n, dtype=np.int64) * 3_600_000
+    histories = {t: (ts, gbm(n, P0=p, seed=i)) for i, (t, p) in enumerate(
+        [("WETH", 3000.0), ("USDC", 1.0), ("CBBTC", 60000.0), ("AERO", 1.0)]
+    )}
+    positions = [
+        {"pair": pair, "capital": 1000.0, "range_pct": 10}
+        for pair in ("WETH/USDC", "CBBTC/USDC", "WETH/CBBTC", "AERO/WETH")
+    ]
+    return histories, positions
+
+def book(n, k=20, seed=0):
+    # Grille sqrt(n) x sqrt(n) ; k positions ETH/BTC, une sur cinq à quantités figées
+    rng = np.random.default_rng(seed)
+    side = max(2, int(np.sqrt(n)))
+    low = np.where(np.arange(k) % 5 == 0, np.nan, rng.uniform(0.04, 0.05, k))
+    return (
+        np.linspace(1500.0, 4500.0, side), np.linspace(30000.0, 90000.0, side),
+        rng.uniform(0.5, 2.0, k), rng.uniform(0.02, 0.05, k), 3000.0, 60000.0,
+        rng.uniform(3000.0, 6000.0, k), 50.0, low, low * 1.3
+    )
+
+
+# --- Sections de calcul de l'app (mêmes formules que backtestengine.py) ---
+def il_section(n):
+    P_deposit, P_lower, P_upper, v_deposit = 3000.0, 2800.0, 3500.0, 500.0
+    L_raw = compute_L(P_deposit, P_lower, P_upper, v_deposit)
+    x0_raw, y0_raw = tokens_from_L(L_raw, P_deposit, P_lower, P_upper)
+    L, x0, y0 = normalize_L(L_raw, x0_raw, y0_raw, P_deposit, v_deposit)
+    prices = np.linspace(P_lower * 0.8, P_upper * 1.3, n)
+    return il_curve(prices / P_deposit, P_lower / P_deposit, P_upper / P_deposit) * 100
+
+
+# --- Catalogue : nom -> (préparation(n), fonction(données), taille max) ---
+def _chunks(data, rows=500_000):
+    n = len(data["timestamp"])
+    return ({k: v[i:i + rows] for k, v in data.items()} for i in range(0, n, rows))
+
+BENCHMARKS = {
+    "clmm.compute_L": (
+        lambda n: gbm(n),
+        lambda P: compute_L(P, 2800.0, 3500.0, 1000.0),
+        None
+    ),
+    "clmm.V_LP": (
+        lambda n: gbm(n),
+        lambda P: V_LP(P, 100.0, 2800.0, 3500.0),
+        None
+    ),
+    "volatility.compute_pair_volatility": (
+        lambda n: (gbm(n, seed=1), gbm(n, P0=1.0, vol=1e-5, seed=2)),
+        lambda d: compute_pair_volatility(*d),
+        None
+    ),
+    "app.il_section": (
+        lambda n: n,
+        il_section,
+        None
+    ),
+    "backtest.run_backtest": (
+        lambda n: gbm(n),
+        lambda P: run_backtest(P, 10, (0.5, 0.5), 10, 10, 90),
+        None
+    ),
+    "backtest.sweep_backtest[100]": (
+        lambda n: gbm(n),
+        lambda P: sweep_backtest(P, np.arange(2, 22, 2), [0, 5, 10, 15, 20], [80, 100]),
+        1_000_000
+    ),
+    "portfolio.portfolio_backtest[4]": (
+        portfolio,
+        lambda d: portfolio_backtest(*d),
+        1_000_000
+    ),
+    "breakeven.break_even_surface[20]": (
+        book,
+        lambda d: break_even_surface(*d),
+        1_000_000
+    ),
+    "montecarlo.monte_carlo_range": (
+        lambda n: max(1, n // 1000),
+        lambda paths: monte_carlo_range(3000.0, 0.03, 10, n_paths=paths, n_steps=1000, seed=0),
+        10_000_000
+    ),
+    "decimate.lttb[2000]": (
+        lambda n: gbm(n),
+        lambda P: lttb(np.arange(len(P)), P, 2000),
+        None
+    ),
+    "fees.accrue_fees": (
+        lambda n: swaps(n),
+        lambda d: accrue_fees(_chunks(d), 2800.0, 3500.0, 100.0, pool_liquidity=1e5),
+        None
+    ),
+}
+
+
+def app_rerun(repeat):
+    """Temps d'un rerun complet du script Streamlit (AppTest, sans navigateur)"""
+    from streamlit.testing.v1 import AppTest
+
+    times = []
+    for _ in range(repeat + 1):
+        at = AppTest.from_file(os.path.join(ROOT, "backtestengine.py"), default_timeout=120)
+        at.secrets["Secret_Code"] = "bench"
+        at.session_state["authenticated"] = True
+        at.session_state["checklist_validee"] = True
+        t = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - t)
+    return min(times[1:])
+
+
+def _store_snapshot(root):
+    """(taille, date de modification) de chaque fichier du store"""
+    snapshot = {}
+    for folder, _, files in os.walk(root):
+        for name in files:
+            st = os.stat(os.path.join(folder, name))
+            snapshot[os.path.relpath(os.path.join(folder, name), root)] = (st.st_size, st.st_mtime_ns)
+    return snapshot
+
+def http_replay(directory, latency, repeat):
+    """
+    Appels CoinGecko contre le serveur de rejeu (replay_server.py) : synchro
+    d'historique à froid, puis prix à froid et depuis le cache disque.
+
+    Le store, le cache HTTP et l'URL de l'API sont lus à l'import de lpcore /
+    market_data, déjà importés ici : la mesure tourne dans un sous-processus
+    lancé avec un store et un cache vides. Le store du dépôt doit en sortir intact.
+    """
+    import shutil
+    import tempfile
+
+    from lpcore.store import STORE_DIR
+
+    before = _store_snapshot(STORE_DIR)
+    tmp = tempfile.mkdtemp(prefix="lp-bench-")
+    env = dict(
+        os.environ,
+        LP_HTTP_CACHE=os.path.join(tmp, "http_cache"),
+        LP_PRICE_STORE=os.path.join(tmp, "price_store")
+    )
+    try:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "replay", directory,
+             "--latency", str(latency), "--repeat", str(repeat)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    if _store_snapshot(STORE_DIR) != before:
+        raise RuntimeError(f"le rejeu a modifié le store {STORE_DIR}")
+    return json.loads(out.splitlines()[-1])
+
+def replay(args):
+    """Mesures de http_replay, dans le sous-processus (store et cache vides, env fixé avant l'import)"""
+    from replay_server import ReplayState, load_recordings, start_server
+
+    state = ReplayState(load_recordings(args.dir, shift_to_now=True), latency=args.latency)
+    _, api = start_server(state)
+    os.environ["LP_COINGECKO_API"] = api
+    import market_data
+    from lpcore import store
+
+    if os.path.isdir(store.STORE_DIR) and os.listdir(store.STORE_DIR):
+        raise RuntimeError(f"store non vide pour une mesure à froid : {store.STORE_DIR}")
+
+    ids = sorted(state.recordings)
+    timings = {}
+    t = time.perf_counter()
+    for asset_id in ids:
+        market_data.refresh_history(asset_id, "daily")
+    timings["http.refresh_history[cold]"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    market_data.get_prices_usd(ids)
+    timings["http.get_prices_usd[cold]"] = time.perf_counter() - t
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        t = time.perf_counter()
+        market_data.get_prices_usd(ids)
+        best = min(best, time.perf_counter() - t)
+    timings["http.get_prices_usd[cache]"] = best
+    timings["http.upstream_requests"] = state.stats["requests"]
+    print(json.dumps(timings))
+
+
+# --- Mesure ---
+def measure(setup, fn, n, repeat):
+    data = setup(n)
+    fn(data)  # chauffe
+
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - t)
+
+    tracemalloc.start()
+    fn(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"n": n, "seconds": best, "throughput": n / best if best > 0 else None, "peak_mb": peak / 1e6}
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(args):
+    results = {
+        "label": args.label,
+        "commit": git_commit(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count()
+        },
+        "benchmarks": {}
+    }
+
+    for name, (setup, fn, max_n) in BENCHMARKS.items():
+        if args.only and not any(o in name for o in args.only):
+            continue
+        rows = []
+        for n in args.sizes:
+            if max_n is not None and n > max_n:
+                continue
+            r = measure(setup, fn, n, args.repeat)
+            rows.append(r)
+            print(f"{name:40s} n={n:>10,}  {r['seconds'] * 1e3:10.2f} ms  "
+                  f"{r['throughput']:14,.0f} pts/s  {r['peak_mb']:9.1f} Mo")
+        results["benchmarks"][name] = rows
+
+    if args.replay:
+        timings = http_replay(args.replay, args.latency, args.repeat)
+        requests_made = timings.pop("http.upstream_requests")
+        for name, t in timings.items():
+            results["benchmarks"][name] = [{"n": 1, "seconds": t, "throughput": 1 / t, "peak_mb": None}]
+            print(f"{name:40s} {t * 1e3:10.2f} ms")
+        print(f"{'http.upstream_requests':40s} {requests_made:10d}")
+
+    if not args.no_app and not args.only:
+        try:
+            t = app_rerun(args.repeat)
+            results["benchmarks"]["app.rerun"] = [{"n": 1, "seconds": t, "throughput": 1 / t, "peak_mb": None}]
+            print(f"{'app.rerun':40s} {t * 1e3:10.2f} ms")
+        except ImportError:
+            print("app.rerun ignoré : streamlit non installé")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = args.out or os.path.join(RESULTS_DIR, f"{args.label}.json")
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Résultats : {out}")
+
+def compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"{base['label']} ({base['commit']}) -> {new['label']} ({new['commit']})")
+    if base["machine"] != new["machine"]:
+        print("Attention : machines différentes, comparaison indicative")
+
+    for name, rows in new["benchmarks"].items():
+        ref = {r["n"]: r for r in base["benchmarks"].get(name, [])}
+        for r in rows:
+            if r["n"] not in ref:
+                continue
+            speedup = ref[r["n"]]["seconds"] / r["seconds"]
+            print(f"{name:40s} n={r['n']:>10,}  {ref[r['n']]['seconds'] * 1e3:10.2f} -> "
+                  f"{r['seconds'] * 1e3:10.2f} ms  x{speedup:5.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks LP backtest engine")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="mesurer et enregistrer")
+    p_run.add_argument("--label", default=time.strftime("%Y%m%d-%H%M%S"))
+    p_run.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    p_run.add_argument("--repeat", type=int, default=3)
+    p_run.add_argument("--only", nargs="+", help="filtre sur le nom des benchmarks")
+    p_run.add_argument("--no-app", action="store_true", help="sans rerun complet du script")
+    p_run.add_argument("--out")
+    p_run.add_argument("--replay", help="répertoire d'enregistrements CoinGecko (replay_server.py)")
+    p_run.add_argument("--latency", type=float, default=80.0, help="latence injectée par le rejeu (ms)")
+    p_run.set_defaults(func=run)
+
+    p_replay = sub.add_parser("replay", help="mesures HTTP seules (lancé par run --replay)")
+    p_replay.add_argument("dir")
+    p_replay.add_argument("--latency", type=float, default=80.0)
+    p_replay.add_argument("--repeat", type=int, default=3)
+    p_replay.set_defaults(func=replay)
+
+    p_cmp = sub.add_parser("compare", help="comparer deux fichiers de résultats")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
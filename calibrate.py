@@ -0,0 +1,45 @@
+"""
+Calibration des ranges suggérés, à lancer une fois par jour après la mise à jour du store :
+
+    python calibrate.py
+    python calibrate.py --pairs WETH/USDC --target 0.9 --horizon 30
+
+Pour chaque paire, chaque départ de l'historique daily est backtesté sur toutes
+les largeurs de range, pour chaque ratio de stratégie (et son inverse). La
+largeur qui tient le temps dans le range cible est retenue par niveau de
+volatilité 30 j. Un fichier JSON par paire et par date (dernière bougie) est
+écrit dans le dossier de calibration, où l'app le lit sans recalcul.
+"""
+import argparse
+import time
+
+from lpcore.calibration import calibrate_pair, save_calibration
+from lpcore.catalog import COINGECKO_IDS, PAIRS
+from lpcore.store import pair_history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibration des ranges suggérés par paire")
+    parser.add_argument("--pairs", nargs="*", help="paires A/B (toutes par défaut)")
+    parser.add_argument("--target", type=float, default=0.8, help="temps dans le range visé (fraction)")
+    parser.add_argument("--horizon", type=int, default=30, help="durée tenue, en bougies daily")
+    parser.add_argument("--store", help="répertoire du store de prix (LP_PRICE_STORE par défaut)")
+    parser.add_argument("--out", help="dossier de calibration (LP_CALIBRATION_DIR par défaut)")
+    args = parser.parse_args()
+
+    pairs = args.pairs or [f"{a}/{b}" for a, b in PAIRS]
+    for pair in pairs:
+        a, b = pair.split("/")
+        t = time.perf_counter()
+        ts, prices = pair_history(COINGECKO_IDS[a], COINGECKO_IDS[b], "daily", args.store)
+        try:
+            calibration = calibrate_pair(ts, prices, target=args.target, horizon=args.horizon)
+        except ValueError as e:
+            print(f"{pair} : {e}")
+            continue
+        path = save_calibration(pair, calibration, args.out)
+        print(f"{pair} : {len(prices)} bougies, {time.perf_counter() - t:.2f} s -> {path}")
+
+
+if __name__ == "__main__":
+    main()
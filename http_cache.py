@@ -0,0 +1,192 @@
+"""
+Cache HTTP sur disque partagé par toutes les sessions et tous les processus.
+
+Une entrée par requête (url + paramètres) : corps JSON et métadonnées de la
+réponse (statut, ETag, Last-Modified, date de téléchargement). Une entrée
+fraîche est servie directement. Une entrée périmée mais encore dans la
+fenêtre stale est servie tout de suite et rafraîchie en arrière-plan. Au-delà,
+l'appel attend le téléchargement. Un verrou fichier par entrée garantit qu'un
+seul appel amont est en cours : les autres attendent puis relisent l'entrée.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+import profiling
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou, des appels amont peuvent se doubler
+    fcntl = None
+
+CACHE_DIR = os.environ.get(
+    "LP_HTTP_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache")
+)
+
+
+class DiskCache:
+    def __init__(self, session, root=None):
+        self.session = session
+        self.root = root or CACHE_DIR
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.stats = {"fresh": 0, "stale": 0, "miss": 0, "revalidated": 0, "errors": 0}
+
+    def _count(self, kind):
+        self.stats[kind] += 1
+        profiling.count(f"http_cache.{kind}")
+
+    # --- Fichiers ---
+    def _path(self, url, params, ext):
+        key = json.dumps([url, sorted((params or {}).items())], default=str)
+        return os.path.join(self.root, hashlib.sha256(key.encode()).hexdigest()[:32] + ext)
+
+    def _read(self, url, params):
+        try:
+            with open(self._path(url, params, ".json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, url, params, entry):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(url, params, ".json")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    @contextmanager
+    def _inflight(self, url, params, blocking=True):
+        """Verrou exclusif de l'entrée (entre threads et entre processus) ; None si pris et non bloquant"""
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._path(url, params, ".lock"), "a") as f:
+            if fcntl is None:
+                yield f
+                return
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield None
+                return
+            try:
+                yield f
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # --- Téléchargement ---
+    def _fetch(self, url, params, entry, timeout):
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        res = self.session.get(url, params=params, headers=headers, timeout=timeout)
+        if res.status_code == 304 and entry:
+            entry = {**entry, "fetched_at": time.time()}
+            self._count("revalidated")
+        else:
+            res.raise_for_status()
+            entry = {
+                "url": url,
+                "params": params,
+                "status": res.status_code,
+                "etag": res.headers.get("ETag"),
+                "last_modified": res.headers.get("Last-Modified"),
+                "date": res.headers.get("Date"),
+                "fetched_at": time.time(),
+                "elapsed": res.elapsed.total_seconds(),
+                "body": res.json()
+            }
+        self._write(url, params, entry)
+        try:
+            os.remove(self._path(url, params, ".fail"))
+        except OSError:
+            pass
+        return entry
+
+    def _fail(self, url, params):
+        """Mémorise l'échec : pas de nouvel appel amont avant la fin du ttl"""
+        self._count("errors")
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._path(url, params, ".fail"), "w"):
+            pass
+
+    def _recent_failure(self, url, params, ttl):
+        try:
+            return time.time() - os.path.getmtime(self._path(url, params, ".fail")) < ttl
+        except OSError:
+            return False
+
+    def _revalidate(self, url, params, ttl, timeout):
+        key = self._path(url, params, "")
+        try:
+            with self._inflight(url, params, blocking=False) as lock:
+                if lock is None:
+                    return
+                entry = self._read(url, params)
+                if entry and time.time() - entry["fetched_at"] < ttl:
+                    return
+                try:
+                    self._fetch(url, params, entry, timeout)
+                except (requests.RequestException, ValueError):
+                    self._fail(url, params)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    # --- API ---
+    def get_json(self, url, params=None, ttl=60, stale=600, timeout=None):
+        """
+        Corps JSON de la réponse, servi depuis le disque tant qu'il a moins de
+        ttl secondes, puis pendant stale secondes de plus en le rafraîchissant en
+        arrière-plan. Si l'API échoue, la dernière réponse connue est renvoyée ;
+        sans réponse connue, l'erreur est levée et l'API n'est pas rappelée avant ttl.
+        """
+        entry = self._read(url, params)
+        age = time.time() - entry["fetched_at"] if entry else None
+
+        if entry and age < ttl:
+            self._count("fresh")
+            return entry["body"]
+
+        if entry and age < ttl + stale:
+            self._count("stale")
+            key = self._path(url, params, "")
+            with self._lock:
+                start = key not in self._refreshing
+                self._refreshing.add(key)
+            if start and not self._recent_failure(url, params, ttl):
+                threading.Thread(
+                    target=self._revalidate, args=(url, params, ttl, timeout), daemon=True
+                ).start()
+            elif start:
+                with self._lock:
+                    self._refreshing.discard(key)
+            return entry["body"]
+
+        if self._recent_failure(url, params, ttl):
+            if entry:
+                return entry["body"]
+            raise requests.ConnectionError(f"échec récent de {url}, nouvel essai dans {ttl} s")
+
+        self._count("miss")
+        with self._inflight(url, params):
+            # Un autre appel a pu télécharger pendant l'attente du verrou
+            latest = self._read(url, params)
+            if latest and time.time() - latest["fetched_at"] < ttl:
+                return latest["body"]
+            try:
+                return self._fetch(url, params, latest, timeout)["body"]
+            except (requests.RequestException, ValueError):
+                self._fail(url, params)
+                if latest:
+                    return latest["body"]
+                raise
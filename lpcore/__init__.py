@@ -0,0 +1,37 @@
+"""
+Noyau de calcul LP sans interface : n'importe que NumPy (pas de Streamlit,
+Plotly ni réseau), utilisable depuis des scripts, des workers ou des tests.
+"""
+from .clmm import (
+    compute_L,
+    tokens_from_L,
+    normalize_L,
+    x_of_P,
+    y_of_P,
+    V_LP,
+    V_LP_bounded,
+    V_HODL
+)
+from .il import il_ratio, il_curve
+from .volatility import compute_volatility, compute_pair_volatility
+from .apr import calculate_clmm_apr
+from .atr import calculate_pair_atr
+from .ticks import (
+    get_sqrt_ratio_at_tick, get_tick_at_sqrt_ratio, get_amounts_for_liquidity,
+    get_liquidity_for_amounts, price_to_tick, tick_to_price, snap_range, TickBitmap
+)
+from .costs import rebalance_cost, swap_impact
+from .passage import PassageIndex
+from .backtest import (
+    run_backtest, sweep_backtest, batch_backtest, position_range, trigger_prices
+)
+from .montecarlo import monte_carlo_range, simulate_paths
+from .portfolio import portfolio_backtest
+from .breakeven import break_even_surface, break_even_price, lp_liquidity
+from .calibration import calibrate_range, calibrate_pair, suggest_range, load_calibration, save_calibration
+from .decimate import lttb
+from .rolling import RollingStats, ohlc_from_closes, rolling_std, true_range, wilder_atr
+from .liquidity import LiquidityIndex, load_positions
+from .fees import accrue_fees, apr_from_fees, iter_swap_file
+from .covariance import align_histories, covariance_matrix, pair_volatility, pair_volatilities, correlation
+from .store import load_history, append_history, last_timestamp, pair_history
@@ -0,0 +1,23 @@
+# ======================
+# APR
+# ======================
+
+
+def calculate_clmm_apr(
+    fees_usd_period: float,
+    active_liquidity_usd_avg: float,
+    period_days: int
+) -> float:
+    """
+    Calcule un APR annualisé basé uniquement sur la liquidité active.
+    """
+
+    if active_liquidity_usd_avg <= 0 or period_days <= 0:
+        return 0.0
+
+    return (
+        fees_usd_period
+        / active_liquidity_usd_avg
+        * (365 / period_days)
+        * 100
+    )
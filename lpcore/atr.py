@@ -0,0 +1,27 @@
+import math
+
+
+# ----------------- Définition de la fonction ATR Expert -----------------
+def calculate_pair_atr(price_x, atr_x, price_y, atr_y, multiplier=1, rho=0.0):
+    """
+    Calcule le range ATR d'une paire X/Y avec multiplicateur.
+    rho : corrélation des mouvements de X et Y (0 = indépendants)
+    """
+    pair_price = price_x / price_y
+    delta_x = atr_x / price_y
+    delta_y = (price_x / (price_y ** 2)) * atr_y
+
+    atr_pair_raw = math.sqrt(max(delta_x ** 2 + delta_y ** 2 - 2 * rho * delta_x * delta_y, 0.0))
+    atr_pair = atr_pair_raw * multiplier
+
+    low = pair_price - atr_pair
+    high = pair_price + atr_pair
+    range_pct = (atr_pair / pair_price) * 100
+
+    return {
+        "pair_price": pair_price,
+        "atr_pair": atr_pair,
+        "low": low,
+        "high": high,
+        "range_pct": range_pct
+    }
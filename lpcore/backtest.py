@@ -0,0 +1,488 @@
+import numpy as np
+
+from .clmm import compute_L, tokens_from_L, V_LP_bounded, V_HODL
+from .costs import rebalance_cost
+from .ticks import snap_range
+
+
+# --- Ranges et triggers (mêmes formules que l'interface) ---
+def position_range(P, ratio_low, ratio_high, range_pct, tick_spacing=None, decimals=(0, 0)):
+    """
+    Range autour de P : ratio_low x range sous le prix, ratio_high x range au-dessus.
+    Avec un tick_spacing, les bornes sont élargies jusqu'aux ticks utilisables
+    du pool (decimals = décimales des tokens A et B), comme on-chain.
+    """
+    low = np.maximum(P * (1 - ratio_low * range_pct / 100), 0.0)
+    high = P * (1 + ratio_high * range_pct / 100)
+    if tick_spacing:
+        low, high = snap_range(low, high, tick_spacing, *decimals)
+    return low, high
+
+def trigger_prices(low, high, trig_low, trig_high):
+    """Prix des triggers Low/High exprimés en % de la largeur du range"""
+    width = high - low
+    return low + (trig_low / 100) * width, low + (trig_high / 100) * width
+
+def entry_triggers(P, low, high, trig_low, trig_high):
+    """
+    Triggers effectifs d'une position ouverte au prix P : un trigger situé du
+    mauvais côté du prix d'entrée est ramené à la borne du range correspondante
+    (sinon la position serait rebalancée à chaque bougie).
+    """
+    t_low, t_high = trigger_prices(low, high, trig_low, trig_high)
+    return np.where(t_low < P, t_low, low), np.where(t_high > P, t_high, high)
+
+def _batch_range(P, ratio_low, ratio_high, range_pct, spacing, d0, d1):
+    """position_range par ligne : ratio, tick spacing (0 = continu) et décimales propres à chaque ligne"""
+    low, high = (np.array(v, dtype=float) for v in position_range(P, ratio_low, ratio_high, range_pct))
+    snap = spacing > 0
+    if snap.any():
+        low[snap], high[snap] = snap_range(low[snap], high[snap], spacing[snap], d0[snap], d1[snap])
+    return low, high
+
+def _first_breach(prices, start, low, high, buffer=1, chunk=1024):
+    """
+    Premier index après start où le prix est sous low ou au-dessus de high depuis
+    buffer bougies consécutives (len(prices) sinon). Les séquences de dépassement
+    sont lues par run-length encoding du masque, bloc par bloc ; une séquence
+    ouverte en fin de bloc est reportée sur le suivant.
+    """
+    n = len(prices)
+    i = start + 1
+    carry = 0
+    while i < n:
+        j = min(i + chunk, n)
+        seg = prices[i:j]
+        mask = (seg < low) | (seg > high)
+        if buffer <= 1:
+            hit = np.flatnonzero(mask)
+            if hit.size:
+                return i + int(hit[0])
+        else:
+            edges = np.flatnonzero(np.diff(np.r_[0, mask.view(np.int8), 0]))
+            run_start, run_end = edges[::2], edges[1::2]
+            if carry and run_start.size and run_start[0] == 0:
+                run_start[0] -= carry
+            ok = np.flatnonzero(run_end - run_start >= buffer)
+            if ok.size:
+                return i + int(run_start[ok[0]]) + buffer - 1
+            carry = int(run_end[-1] - run_start[-1]) if run_end.size and run_end[-1] == mask.size else 0
+        i = j
+        chunk *= 2
+    return n
+
+
+# --- Backtest ---
+def run_backtest(
+    prices,
+    range_pct,
+    ratio=(0.5, 0.5),
+    range_percent=None,
+    trig_low=0.0,
+    trig_high=100.0,
+    capital=1000.0,
+    tick_spacing=None,
+    decimals=(0, 0),
+    costs=None,
+    buffer=1,
+    index=None
+):
+    """
+    Backtest d'une position CLMM sur un historique de prix (token A exprimé en token B).
+
+    Le range initial suit "Range (%)" et le ratio de la stratégie. Quand le prix franchit
+    le Trigger Low ou High (voir entry_triggers), la position est recentrée sur le range future
+    (range_percent) : range baissier après un trigger Low, haussier après un trigger High.
+
+    Seuls les rebalances sont parcourus en Python ; la valeur, l'IL et le temps dans
+    le range sont calculés en une passe NumPy sur tout l'historique.
+    Les valeurs sont exprimées en token B. tick_spacing aligne chaque range sur
+    les ticks du pool (voir position_range). costs ({"fee_tier", "pool_liquidity",
+    "gas"}, voir rebalance_cost) retire de la position le coût du swap de chaque rebalance.
+    buffer (time-buffer) : un trigger ne déclenche qu'après buffer bougies consécutives
+    au-delà de son prix ; le rebalance se fait au prix de la dernière.
+    index (PassageIndex de prices) trouve chaque déclenchement en O(log n) au
+    lieu d'un balayage : utile quand le même historique est backtesté souvent (index construit une fois).
+    """
+    prices = np.asarray(prices, float)
+    n = len(prices)
+    if n == 0:
+        raise ValueError("historique de prix vide")
+
+    ratioA, ratioB = ratio
+    if range_percent is None:
+        range_percent = range_pct
+
+    starts, lows, highs, Ls, paid = [0], [], [], [], []
+    low, high = position_range(prices[0], ratioA, ratioB, range_pct, tick_spacing, decimals)
+    value = capital
+    start = 0
+
+    while True:
+        L = compute_L(prices[start], low, high, value)
+        lows.append(low)
+        highs.append(high)
+        Ls.append(L)
+
+        t_low, t_high = entry_triggers(prices[start], low, high, trig_low, trig_high)
+        if index is not None:
+            j = index.first_exit(start, t_low, t_high, buffer)
+        else:
+            j = _first_breach(prices, start, t_low, t_high, buffer)
+        if j >= n:
+            break
+
+        P = prices[j]
+        value = V_LP_bounded(P, L, low, high)
+        x, y = tokens_from_L(L, np.clip(P, low, high), low, high)
+        if P < t_low:
+            low, high = position_range(P, ratioA, ratioB, range_percent, tick_spacing, decimals)
+        else:
+            low, high = position_range(P, ratioB, ratioA, range_percent, tick_spacing, decimals)
+        if costs:
+            paid.append(float(rebalance_cost(P, x, y, low, high, **costs)["cost"]))
+            value = max(value - paid[-1], 0.0)
+        starts.append(j)
+        start = j
+
+    # --- Paramètres par bougie (un segment = une position entre deux rebalances) ---
+    starts = np.asarray(starts)
+    counts = np.diff(np.append(starts, n))
+    L_arr = np.repeat(Ls, counts)
+    low_arr = np.repeat(lows, counts)
+    high_arr = np.repeat(highs, counts)
+
+    values = V_LP_bounded(prices, L_arr, low_arr, high_arr)
+
+    x0, y0 = tokens_from_L(Ls[0], prices[0], lows[0], highs[0])
+    hodl = V_HODL(prices, x0, y0)
+
+    in_range = (prices >= low_arr) & (prices <= high_arr)
+    il = values / hodl - 1
+
+    return {
+        "value": values,
+        "hodl": hodl,
+        "il": il,
+        "low": low_arr,
+        "high": high_arr,
+        "in_range": in_range,
+        "rebalance_idx": starts[1:],
+        "n_rebalances": len(starts) - 1,
+        "rebalance_cost": np.asarray(paid if costs else np.zeros(len(starts) - 1)),
+        "total_cost": float(np.sum(paid)),
+        "time_in_range": float(in_range.mean()),
+        "out_of_range_steps": int(n - in_range.sum()),
+        "final_value": float(values[-1]),
+        "final_hodl": float(hodl[-1]),
+        "final_il": float(il[-1])
+    }
+
+
+# --- Simulation par lots ---
+SMALL_WINDOW = 6    # fenêtres de moins de 2^6 bougies scannées dans un même groupe
+
+def _simulate_batch(prices, rp, rf, tl, th, ratio, capital, max_cells, tick_spacing=None, decimals=(0, 0),
+                    segments=False, costs=None, buffer=1):
+    """
+    Simule K positions (une par ligne de paramètres) avec les règles de run_backtest.
+
+    prices est soit un historique (n,) partagé par toutes les lignes, soit une
+    matrice (K, n) avec une trajectoire par ligne. Le temps est parcouru par blocs
+    diffusés contre l'axe des lignes (au plus max_cells cases par bloc).
+    ratio, capital, tick_spacing, decimals, buffer et les paramètres de costs
+    sont communs ou donnés par ligne.
+    Avec segments, renvoie aussi chaque position ouverte (ligne, début, low, high, L).
+
+    Deux phases : les ranges et triggers ne dépendent que du prix de rebalance,
+    les rebalances sont donc d'abord détectés (toutes les lignes avancent
+    ensemble, un rebalance par ligne et par tour), puis valorisés en une fois
+    (_rebalance_values). Coût : O(K x n) comparaisons vectorisées plus un tour
+    Python par rebalance de la ligne qui en compte le plus.
+    """
+    shared = prices.ndim == 1
+    n = prices.shape[-1]
+    K = rp.size
+    rows = np.arange(K)
+    chunk = int(np.clip(max_cells // K, 64, 65536))
+    ratioA, ratioB = (np.broadcast_to(np.asarray(r, float), (K,)) for r in ratio)
+    spacing = np.broadcast_to(np.asarray(0 if tick_spacing is None else tick_spacing, dtype=np.int64), (K,))
+    d0, d1 = (np.broadcast_to(np.asarray(d), (K,)) for d in decimals)
+    buffer = np.broadcast_to(np.asarray(buffer, dtype=np.int64), (K,))
+    buffered = bool((buffer > 1).any())
+
+    def at(r, g):
+        return prices[g] if shared else prices[r, g]
+
+    # --- État initial de chaque ligne ---
+    P0 = at(rows, np.zeros(K, dtype=np.int64))
+    low, high = _batch_range(P0, ratioA, ratioB, rp, spacing, d0, d1)
+    L0 = compute_L(P0, low, high, capital)
+    x0, y0 = tokens_from_L(L0, P0, low, high)
+    t_low, t_high = entry_triggers(P0, low, high, tl, th)
+    low0, high0 = low.copy(), high.copy()
+
+    cursor = np.zeros(K, dtype=np.int64)     # début du segment courant
+    counted = np.zeros(K, dtype=np.int64)    # temps dans le range compté jusqu'ici
+    in_range = np.zeros(K, dtype=np.int64)
+    run = np.zeros(K, dtype=np.int64)        # bougies consécutives au-delà d'un trigger
+    last_len = np.full(K, 4, dtype=np.int64)  # longueur du dernier segment
+    events = []                              # (lignes, bougie, prix, low, high) par tour
+
+    def scan(grp, start, w, sub):
+        """Avance les lignes grp sur les fenêtres sub ; renvoie celles qui ont rebalancé"""
+        off = np.arange(sub.shape[1])
+        breach = (off > (cursor[grp] - start)[:, None]) & (off < w[:, None])
+        breach &= (sub < t_low[grp, None]) | (sub > t_high[grp, None])
+        if buffered:
+            # Longueur de la séquence de dépassement à chaque bougie : distance à la
+            # dernière bougie hors dépassement, la séquence ouverte avant la fenêtre
+            # comptant pour run bougies
+            last_out = np.maximum.accumulate(np.where(breach, -1 - run[grp, None], off), axis=1)
+            length = off - last_out
+            breach = length >= buffer[grp, None]
+            run[grp] = np.where(breach.any(axis=1), 0, length[np.arange(grp.size), w - 1])
+        hit = breach.any(axis=1)
+        j_loc = np.where(hit, breach.argmax(axis=1), w)
+
+        inside = (sub >= low[grp, None]) & (sub <= high[grp, None])
+        inside &= off < j_loc[:, None]
+        in_range[grp] += np.count_nonzero(inside, axis=1)
+        counted[grp] = start + j_loc
+
+        idx = grp[hit]
+        if idx.size:
+            # Nouveau range et triggers : seuls le prix et le sens du dépassement comptent
+            j = counted[idx]
+            P = at(idx, j)
+            down = P < t_low[idx]
+            r_low = np.where(down, ratioA[idx], ratioB[idx])
+            r_high = np.where(down, ratioB[idx], ratioA[idx])
+            new_low, new_high = _batch_range(P, r_low, r_high, rf[idx], spacing[idx], d0[idx], d1[idx])
+            low[idx], high[idx] = new_low, new_high
+            t_low[idx], t_high[idx] = entry_triggers(P, new_low, new_high, tl[idx], th[idx])
+            events.append((idx, j, P, new_low, new_high))
+            last_len[idx] = np.maximum(j - cursor[idx], 4)
+            cursor[idx] = j
+        return hit
+
+    for i0 in range(0, n, chunk):
+        i1 = min(i0 + chunk, n)
+
+        # Première passe : tout le bloc, diffusé contre toutes les lignes.
+        w = np.full(K, i1 - i0)
+        sub = prices[None, i0:i1] if shared else prices[:, i0:i1]
+        hit = scan(rows, counted.copy(), w, sub)
+        window = np.where(hit, last_len, 2 * w)
+        active = rows[counted < i1]
+
+        # Ensuite seules les lignes rebalancées sont suivies, sur une fenêtre qui
+        # repart courte après un rebalance et double sinon. Les lignes sont
+        # regroupées par taille de fenêtre (puissance de 2, les petites fenêtres
+        # ensemble) pour ne pas lire plus du double de ce qui est utile.
+        while active.size:
+            start = counted[active]
+            w = np.minimum(window[active], i1 - start)
+            level = np.maximum(np.frexp(w)[1], SMALL_WINDOW)
+            for lv in np.unique(level):
+                sel = level == lv
+                grp, g_start, g_w = active[sel], start[sel], w[sel]
+                cols = np.minimum(g_start[:, None] + np.arange(int(g_w.max())), n - 1)
+                hit = scan(grp, g_start, g_w, at(grp[:, None], cols))
+                window[grp] = np.where(hit, last_len[grp], 2 * g_w)
+            active = active[counted[active] < i1]
+
+    # --- Valorisation des rebalances ---
+    if events:
+        ev_rows, ev_j, ev_P, ev_low, ev_high = (np.concatenate(col) for col in zip(*events))
+        order = np.argsort(ev_rows, kind="stable")   # par ligne, dans l'ordre du temps
+        ev_rows, ev_j, ev_P, ev_low, ev_high = (v[order] for v in (ev_rows, ev_j, ev_P, ev_low, ev_high))
+    else:
+        ev_rows = ev_j = np.empty(0, dtype=np.int64)
+        ev_P = ev_low = ev_high = np.empty(0)
+    ev_L, ev_cost = _rebalance_values(ev_rows, ev_P, ev_low, ev_high, L0, low0, high0, costs)
+
+    n_reb = np.bincount(ev_rows, minlength=K)
+    last = np.flatnonzero(np.r_[ev_rows[1:] != ev_rows[:-1], True]) if ev_rows.size else ev_rows
+    L = L0.copy()
+    L[ev_rows[last]] = ev_L[last]
+    first_reb = np.full(K, n, dtype=np.int64)
+    np.minimum.at(first_reb, ev_rows, ev_j)
+
+    P_end = at(rows, np.full(K, n - 1, dtype=np.int64))
+    final_value = V_LP_bounded(P_end, L, low, high)
+    final_hodl = V_HODL(P_end, x0, y0)
+
+    res = {
+        "final_value": final_value,
+        "final_hodl": final_hodl,
+        "vs_hodl": final_value / final_hodl - 1,
+        "n_rebalances": n_reb,
+        "total_cost": np.bincount(ev_rows, weights=ev_cost, minlength=K),
+        "first_rebalance": first_reb,
+        "time_in_range": in_range / n,
+        "x0": x0,
+        "y0": y0
+    }
+    if segments:
+        res["segments"] = (
+            np.r_[rows, ev_rows], np.r_[np.zeros(K, dtype=np.int64), ev_j],
+            np.r_[low0, ev_low], np.r_[high0, ev_high], np.r_[L0, ev_L]
+        )
+    return res
+
+def _rebalance_values(rows, P, low, high, L0, low0, high0, costs):
+    """
+    Liquidité après chaque rebalance (événements triés par ligne puis dans le
+    temps, low / high = nouveau range) et coût payé, mêmes règles que run_backtest.
+
+    Sans coût, ou avec seulement un fee_tier, la valeur au rebalance et le coût
+    sont proportionnels à L : chaque rebalance multiplie L par un facteur et la
+    chaîne se calcule en une somme cumulée de logarithmes par ligne. Gas et
+    impact de prix ne sont pas proportionnels : les rebalances sont alors
+    valorisés rang par rang (le k-ième de chaque ligne ensemble).
+    """
+    E = rows.size
+    first = np.r_[True, rows[1:] != rows[:-1]] if E else np.empty(0, dtype=bool)
+    # Range en place avant chaque rebalance : le précédent de la ligne, ou l'initial
+    prev_low = np.where(first, low0[rows], np.roll(low, 1))
+    prev_high = np.where(first, high0[rows], np.roll(high, 1))
+
+    K = L0.size
+    costs = {
+        k: v if v is None or callable(v) else np.broadcast_to(np.asarray(v, float), (K,))[rows]
+        for k, v in (costs or {}).items()
+    }
+    proportional = costs.get("pool_liquidity") is None and not np.any(costs.get("gas", 0.0))
+
+    if proportional:
+        # Valeur et coût pour L = 1, puis produit cumulé des facteurs de chaque ligne
+        value = V_LP_bounded(P, 1.0, prev_low, prev_high)
+        paid = np.zeros(E)
+        if costs:
+            x, y = tokens_from_L(1.0, np.clip(P, prev_low, prev_high), prev_low, prev_high)
+            paid = rebalance_cost(P, x, y, low, high, **costs)["cost"]
+            value = np.maximum(value - paid, 0.0)
+        with np.errstate(divide="ignore"):
+            log_g = np.maximum(np.log(compute_L(P, low, high, value)), -745.0)
+        # Somme cumulée par ligne : cumul global moins le cumul avant le premier rebalance de la ligne
+        c = np.cumsum(log_g)
+        head = np.maximum.accumulate(np.where(first, np.arange(E), 0))
+        L = L0[rows] * np.exp(c - c[head] + log_g[head])
+        L_before = np.where(first, L0[rows], np.roll(L, 1))
+        return L, paid * L_before
+
+    # Coûts non proportionnels : rang par rang, toutes les lignes ensemble
+    start = np.flatnonzero(first)
+    rank = np.arange(E) - np.repeat(start, np.diff(np.r_[start, E]))
+    by_rank = np.argsort(rank, kind="stable")
+    bounds = np.searchsorted(rank[by_rank], np.arange(rank.max() + 2 if E else 1))
+    L_cur = L0.copy()
+    L = np.empty(E)
+    paid = np.empty(E)
+    for m in range(bounds.size - 1):
+        e = by_rank[bounds[m]:bounds[m + 1]]
+        r = rows[e]
+        value = V_LP_bounded(P[e], L_cur[r], prev_low[e], prev_high[e])
+        x, y = tokens_from_L(L_cur[r], np.clip(P[e], prev_low[e], prev_high[e]), prev_low[e], prev_high[e])
+        args = {k: v if v is None or callable(v) else v[e] for k, v in costs.items()}
+        paid[e] = rebalance_cost(P[e], x, y, low[e], high[e], **args)["cost"]
+        L[e] = L_cur[r] = compute_L(P[e], low[e], high[e], np.maximum(value - paid[e], 0.0))
+    return L, paid
+
+
+# --- Sweep de paramètres ---
+def sweep_backtest(
+    prices,
+    range_pcts,
+    trig_lows,
+    trig_highs,
+    range_percents=None,
+    ratio=(0.5, 0.5),
+    capital=1000.0,
+    max_cells=2_000_000,
+    tick_spacing=None,
+    decimals=(0, 0),
+    costs=None,
+    buffers=(1,)
+):
+    """
+    Évalue toutes les combinaisons (range, range future, trigger low, trigger high,
+    time-buffer) sur le même historique, avec les mêmes règles que run_backtest.
+
+    L'historique est lu une seule fois, par blocs de bougies diffusés contre l'axe
+    des combinaisons (matrice combinaisons x bougies d'au plus max_cells cases).
+    Sans range_percents, le range future de chaque combinaison est son range initial.
+    Coût : O(combinaisons x bougies) comparaisons vectorisées, plus un tour Python
+    par rebalance de la combinaison qui rebalance le plus (les plus petits ranges).
+
+    Renvoie un tableau en colonnes (dict de tableaux NumPy), une ligne par combinaison.
+    """
+    prices = np.asarray(prices, float)
+    if len(prices) == 0:
+        raise ValueError("historique de prix vide")
+
+    paired = range_percents is None
+    grids = np.meshgrid(
+        np.asarray(range_pcts, float),
+        np.asarray([np.nan] if paired else range_percents, float),
+        np.asarray(trig_lows, float),
+        np.asarray(trig_highs, float),
+        np.asarray(buffers, float),
+        indexing="ij"
+    )
+    rp, rf, tl, th, buf = (g.ravel() for g in grids)
+    return batch_backtest(
+        prices, rp, tl, th,
+        buffer=buf.astype(np.int64),
+        range_percent=rp if paired else rf,
+        ratio=ratio,
+        capital=capital,
+        max_cells=max_cells,
+        tick_spacing=tick_spacing,
+        decimals=decimals,
+        costs=costs
+    )
+
+def batch_backtest(
+    prices,
+    range_pct,
+    trig_low,
+    trig_high,
+    range_percent=None,
+    ratio=(0.5, 0.5),
+    capital=1000.0,
+    max_cells=2_000_000,
+    tick_spacing=None,
+    decimals=(0, 0),
+    costs=None,
+    buffer=1
+):
+    """
+    Comme sweep_backtest, mais pour une liste de scénarios quelconque : les
+    paramètres sont des tableaux de même longueur (un scénario par indice),
+    sans produit cartésien.
+    """
+    prices = np.asarray(prices, float)
+    if len(prices) == 0:
+        raise ValueError("historique de prix vide")
+
+    rp, tl, th = np.broadcast_arrays(
+        np.asarray(range_pct, float), np.asarray(trig_low, float), np.asarray(trig_high, float)
+    )
+    rf = rp if range_percent is None else np.broadcast_to(np.asarray(range_percent, float), rp.shape)
+    rp, rf, tl, th = (np.array(v, dtype=float).ravel() for v in (rp, rf, tl, th))
+    buf = np.broadcast_to(np.asarray(buffer, dtype=np.int64), rp.shape).copy()
+
+    res = _simulate_batch(prices, rp, rf, tl, th, ratio, capital, max_cells, tick_spacing, decimals,
+                          costs=costs, buffer=buf)
+    for key in ("first_rebalance", "x0", "y0"):
+        del res[key]
+    return {
+        "range_pct": rp,
+        "range_percent": rf,
+        "trig_low": tl,
+        "trig_high": th,
+        "buffer": buf,
+        **res
+    }
@@ -0,0 +1,83 @@
+import numpy as np
+
+from .clmm import V_LP_bounded
+
+
+# --- Positions ---
+def _columns(n, **params):
+    """Paramètres scalaires ou par position, en colonnes (K, 1, 1) pour la diffusion sur la grille"""
+    return {k: np.broadcast_to(np.asarray(v, dtype=np.float64), (n,))[:, None, None] for k, v in params.items()}
+
+def lp_liquidity(qty_a, qty_b, price_a, price_b, low, high):
+    """
+    L de positions CLMM (range [low, high] en prix A/B) qui valent aujourd'hui
+    qty_a x price_a + qty_b x price_b : la valeur en token B divisée par celle
+    d'une unité de liquidité (valable aussi hors range).
+    """
+    P = np.asarray(price_a, dtype=np.float64) / price_b
+    value_b = qty_a * P + qty_b
+    return value_b / V_LP_bounded(P, 1.0, low, high)
+
+
+# --- Surface P&L ---
+def break_even_surface(price_a, price_b, qty_a, qty_b, price_a0, price_b0, capital, fees=0.0,
+                       low=np.nan, high=np.nan):
+    """
+    P&L (valeur + fees - capital, en $) de K positions sur la grille de prix USD
+    (price_b, price_a), en une opération : tableau (K, len(price_b), len(price_a)),
+    lignes = price_b comme attendu par un contour. Le break-even est la ligne 0.
+
+    Chaque paramètre est commun ou donné par position. Avec un range [low, high]
+    (prix A/B), la composition suit la courbe CLMM (quantités figées aux bornes
+    hors range) ; low / high NaN = quantités qty_a / qty_b figées.
+    """
+    price_a = np.asarray(price_a, dtype=np.float64)[None, None, :]
+    price_b = np.asarray(price_b, dtype=np.float64)[None, :, None]
+    n = np.broadcast(qty_a, qty_b, price_a0, price_b0, capital, fees, low, high).size
+    c = _columns(n, qty_a=qty_a, qty_b=qty_b, price_a0=price_a0, price_b0=price_b0,
+                 capital=capital, fees=fees, low=low, high=high)
+    out = np.empty((n, price_b.shape[1], price_a.shape[2]))
+
+    # Quantités figées
+    fixed = np.isnan(c["low"][:, 0, 0])
+    if fixed.any():
+        out[fixed] = c["qty_a"][fixed] * price_a + c["qty_b"][fixed] * price_b
+
+    # Positions CLMM : sqrt(P) calculé une fois sur la grille, borné au range de chaque
+    # position ; valeur $ = L x ((1/s - 1/sqrt(high)) x price_a + (s - sqrt(low)) x price_b)
+    ranged = ~fixed
+    if ranged.any():
+        low, high = c["low"][ranged], c["high"][ranged]
+        L = lp_liquidity(c["qty_a"][ranged], c["qty_b"][ranged], c["price_a0"][ranged],
+                         c["price_b0"][ranged], low, high)
+        sqrt_l, sqrt_u = np.sqrt(low), np.sqrt(high)
+        s = np.clip(np.sqrt(price_a / price_b), sqrt_l, sqrt_u)
+        # Calcul en place : deux tableaux (k, nb, na) au lieu d'un par terme
+        v = np.reciprocal(s)
+        v -= 1 / sqrt_u
+        v *= price_a
+        s -= sqrt_l
+        s *= price_b
+        v += s
+        v *= L
+        out[ranged] = v
+
+    out += c["fees"] - c["capital"]
+    return out
+
+
+def break_even_price(prices, pnl):
+    """
+    Prix où pnl (croissant avec prices, comme la valeur d'une LP avec le prix
+    de chacun de ses tokens) passe à 0, interpolé entre deux points de la grille.
+    None si le P&L ne change pas de signe sur la grille.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    above = np.flatnonzero(pnl >= 0)
+    if not above.size or not (pnl < 0).any():
+        return None
+    i = int(above[0])
+    if i == 0:
+        return None
+    x0, x1, y0, y1 = prices[i - 1], prices[i], pnl[i - 1], pnl[i]
+    return float(x0 + (x1 - x0) * -y0 / (y1 - y0))
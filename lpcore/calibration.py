@@ -0,0 +1,151 @@
+import json
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .catalog import STRATEGIES
+
+
+# --- Calibration des ranges suggérés ---
+# Résultats mis en cache par paire et par date (dernière bougie de l'historique),
+# un fichier JSON par jour : le job nocturne et l'app lisent le même fichier.
+CALIBRATION_DIR = os.environ.get(
+    "LP_CALIBRATION_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "calibration")
+)
+
+VOL_LEVELS = (0.02, 0.04, 0.07, 0.10)   # bornes des niveaux de volatilité (rendements par bougie)
+MIN_SAMPLES = 20                        # départs minimum pour calibrer un niveau
+
+
+def rolling_volatility(prices, window):
+    """
+    Écart-type des window derniers rendements log à chaque bougie, comme
+    covariance_matrix(window) au même point (NaN avant window + 1 bougies).
+    """
+    r = np.diff(np.log(np.asarray(prices, dtype=np.float64)))
+    s1 = np.concatenate([[0.0], np.cumsum(r)])
+    s2 = np.concatenate([[0.0], np.cumsum(r * r)])
+    out = np.full(len(r) + 1, np.nan)
+    if len(r) >= window:
+        m1 = (s1[window:] - s1[:-window]) / window
+        m2 = (s2[window:] - s2[:-window]) / window
+        out[window:] = np.sqrt(np.maximum(m2 - m1 * m1, 0.0))
+    return out
+
+def required_widths(prices, starts, horizon, ratio=(0.5, 0.5)):
+    """
+    Range (%) minimal pour que chaque bougie des horizon suivantes soit dans le
+    range ouvert à chaque départ (mêmes bornes que position_range, sans rebalance) :
+    tableau (départs, horizon). inf si le côté concerné du range est nul.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    ra, rb = ratio
+    move = sliding_window_view(prices[1:], horizon)[starts] / prices[starts, None] - 1
+    down, up = np.maximum(-move, 0.0), np.maximum(move, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        need_low = np.where(down > 0, down / ra, 0.0)
+        need_high = np.where(up > 0, up / rb, 0.0)
+    return 100 * np.maximum(need_low, need_high)
+
+def calibrate_range(prices, target=0.8, horizon=30, vol_window=30, ratio=(0.5, 0.5),
+                    levels=VOL_LEVELS, min_samples=MIN_SAMPLES):
+    """
+    Range (%) qui tient target du temps dans le range sur horizon bougies, par
+    niveau de volatilité (vol_window dernières bougies au départ).
+
+    Chaque départ de l'historique est backtesté pour toutes les largeurs à la
+    fois : la bougie t est dans le range de largeur w si w dépasse sa largeur
+    requise. Le range d'un niveau est le quantile target des largeurs requises
+    de ses départs (temps moyen dans le range = target). Un niveau de moins de
+    min_samples départs n'est pas calibré : suggest_range y applique k x vol,
+    k étant le même quantile des largeurs requises rapportées à la volatilité.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    starts = np.arange(vol_window, len(prices) - horizon)
+    if starts.size == 0:
+        raise ValueError("historique trop court pour la calibration")
+    vol = rolling_volatility(prices, vol_window)[starts]
+    need = required_widths(prices, starts, horizon, ratio)
+
+    finite = lambda v: float(v) if np.isfinite(v) else None
+    # Plus petite largeur dont le temps moyen dans le range atteint target
+    quantile = lambda v: finite(np.quantile(v, target, method="inverted_cdf"))
+    level = np.searchsorted(levels, vol, side="right")
+    widths, samples = [], []
+    for i in range(len(levels) + 1):
+        sel = level == i
+        samples.append(int(sel.sum()))
+        widths.append(quantile(need[sel]) if sel.sum() >= min_samples else None)
+    moving = vol > 0
+    with np.errstate(invalid="ignore"):
+        k = quantile(need[moving] / vol[moving, None]) if moving.any() else None
+
+    return {
+        "target": target,
+        "horizon": horizon,
+        "vol_window": vol_window,
+        "ratio": list(ratio),
+        "levels": list(levels),
+        "widths": widths,
+        "samples": samples,
+        "k": k,
+        "vol": finite(rolling_volatility(prices[-(vol_window + 1):], vol_window)[-1])
+    }
+
+def suggest_range(calibration, vol):
+    """Range (%) suggéré pour une volatilité : celui de son niveau, sinon k x vol (None si ni l'un ni l'autre)"""
+    width = calibration["widths"][int(np.searchsorted(calibration["levels"], vol, side="right"))]
+    if width is None and calibration["k"] is not None and vol > 0:
+        width = calibration["k"] * vol
+    return width
+
+
+# --- Cache par paire et par date ---
+def ratio_key(ratio):
+    return f"{ratio[0]:g}/{ratio[1]:g}"
+
+def strategy_ratios():
+    """Ratios de toutes les stratégies, dans les deux sens (inversion marché)"""
+    ratios = [s["ratio"] for s in STRATEGIES.values()]
+    return ratios + [(b, a) for a, b in ratios]
+
+def calibration_date(ts):
+    """Date (UTC, AAAA-MM-JJ) de la dernière bougie : clé du cache"""
+    return str(np.datetime_as_string(np.datetime64(int(ts[-1]), "ms"), unit="D"))
+
+def calibrate_pair(ts, prices, ratios=None, **kwargs):
+    """
+    Calibrations d'une paire pour plusieurs ratios de range (toutes les stratégies
+    par défaut), datées de la dernière bougie :
+    {"date", "n_points", "ratios": {"0.5/0.5": calibration}}.
+    """
+    ratios = strategy_ratios() if ratios is None else ratios
+    calibrations = {ratio_key(r): calibrate_range(prices, ratio=r, **kwargs) for r in dict.fromkeys(map(tuple, ratios))}
+    return {
+        "date": calibration_date(ts),
+        "n_points": int(len(prices)),
+        "ratios": calibrations
+    }
+
+def _path(pair, date, root):
+    return os.path.join(root or CALIBRATION_DIR, pair.replace("/", "_"), f"{date}.json")
+
+def load_calibration(pair, date, root=None):
+    """Calibration de la paire à cette date (AAAA-MM-JJ), None si le job ne l'a pas encore produite"""
+    try:
+        with open(_path(pair, date, root)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_calibration(pair, calibration, root=None):
+    """Écrit le fichier de la date de la calibration (remplacement atomique)"""
+    path = _path(pair, calibration["date"], root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(calibration, f)
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,45 @@
+"""
+Catalogue partagé par l'interface et les scripts : stratégies, tokens et paires.
+"""
+
+# --- Stratégies (ratio = part du range sous / au-dessus du prix) ---
+STRATEGIES = {
+    "Neutre": {"ratio": (0.5, 0.5), "objectif": "Rester dans le range", "contexte": "Incertitude (attention à l'impermanent loss vente à perte ou rachat trop cher)"},
+    "Coup de pouce": {"ratio": (0.2, 0.8), "objectif": "Range efficace", "contexte": "Faible volatilité (attention à inverser en fonction du marché)"},
+    "Mini-doux": {"ratio": (0.1, 0.9), "objectif": "Nouveau régime prix", "contexte": "Changement de tendance (attention à inverser en fonction du marché)"},
+    "Side-line Up": {"ratio": (0.95, 0.05), "objectif": "Accumulation", "contexte": "Dump"},
+    "Side-line Below": {"ratio": (0.05, 0.95), "objectif": "Attente avant pump", "contexte": "Marché haussier"},
+    "DCA-in": {"ratio": (1.0, 0.0), "objectif": "Entrée progressive", "contexte": "Accumulation de l'actif le plus volatile (Token A)"},
+    "DCA-out": {"ratio": (0.0, 1.0), "objectif": "Sortie progressive", "contexte": "Tendance haussière revente de l'actif le plus volatile (token A contre le token B)"},
+}
+
+# --- Tokens ---
+COINGECKO_IDS = {
+    "WETH": "weth",
+    "USDC": "usd-coin",
+    "CBBTC": "coinbase-wrapped-btc",
+    "VIRTUAL": "virtual-protocol",
+    "AERO": "aerodrome-finance"
+}
+
+TOKEN_DECIMALS = {
+    "WETH": 18,
+    "USDC": 6,
+    "CBBTC": 8,
+    "VIRTUAL": 18,
+    "AERO": 18
+}
+
+TICK_SPACINGS = [None, 1, 10, 50, 60, 100, 200]
+
+# Fee tiers des pools, en centièmes de bip (3000 = 0.3%)
+FEE_TIERS = [100, 500, 3000, 10000]
+
+# --- Paires (token A / token B) ---
+PAIRS = [
+    ("WETH", "USDC"),
+    ("CBBTC", "USDC"),
+    ("WETH", "CBBTC"),
+    ("VIRTUAL", "WETH"),
+    ("AERO", "WETH")
+]
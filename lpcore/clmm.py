@@ -0,0 +1,52 @@
+import numpy as np
+
+
+# --- Fonctions de calcul CLMM ---
+def compute_L(P, P_l, P_u, V):
+    sqrtP = np.sqrt(P)
+    sqrtPl = np.sqrt(P_l)
+    sqrtPu = np.sqrt(P_u)
+    A = (1 / sqrtP - 1 / sqrtPu)
+    B = (sqrtP - sqrtPl)
+    return V / (P * A + B)
+
+def tokens_from_L(L, P, P_l, P_u):
+    sqrtP = np.sqrt(P)
+    sqrtPl = np.sqrt(P_l)
+    sqrtPu = np.sqrt(P_u)
+    x = L * (1 / sqrtP - 1 / sqrtPu)
+    y = L * (sqrtP - sqrtPl)
+    return x, y
+
+def normalize_L(L, x0, y0, P, V):
+    factor = V / (x0 * P + y0)
+    return L * factor, x0 * factor, y0 * factor
+
+def x_of_P(P, L, P_upper):
+    P_arr = np.asarray(P, float)
+    sqrtP = np.sqrt(P_arr)
+    x = L * (1 / sqrtP - 1 / np.sqrt(P_upper))
+    if isinstance(x, np.ndarray):
+        return np.where(x < 0, 0, x)
+    return max(x, 0.0)
+
+def y_of_P(P, L, P_lower):
+    P_arr = np.asarray(P, float)
+    sqrtP = np.sqrt(P_arr)
+    y = L * (sqrtP - np.sqrt(P_lower))
+    if isinstance(y, np.ndarray):
+        return np.where(y < 0, 0, y)
+    return max(y, 0.0)
+
+def V_LP(P, L, P_lower, P_upper):
+    P_arr = np.asarray(P, float)
+    return x_of_P(P_arr, L, P_upper) * P_arr + y_of_P(P_arr, L, P_lower)
+
+def V_LP_bounded(P, L, P_lower, P_upper):
+    """Valeur LP valable aussi hors range : les quantités sont figées aux bornes"""
+    P_arr = np.asarray(P, float)
+    P_in = np.clip(P_arr, P_lower, P_upper)
+    return x_of_P(P_in, L, P_upper) * P_arr + y_of_P(P_in, L, P_lower)
+
+def V_HODL(P, x0, y0):
+    return x0 * P + y0
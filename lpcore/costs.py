@@ -0,0 +1,55 @@
+import numpy as np
+
+from .clmm import tokens_from_L
+
+
+# --- Impact de prix ---
+def swap_impact(amount_a, P, pool_liquidity):
+    """
+    Coût d'impact (en token B) d'un swap de amount_a token A (> 0 : achat de A,
+    < 0 : vente) dans une pool de liquidité active constante pool_liquidity,
+    au prix P. Avec u = |amount_a| x sqrt(P) / L, l'acheteur paie notionnel / (1 - u)
+    et le vendeur reçoit notionnel / (1 + u). u est plafonné à 0.5 à l'achat :
+    le coût ne dépasse pas le notionnel quand la liquidité est épuisée (ou nulle).
+    """
+    amount_a = np.asarray(amount_a, dtype=np.float64)
+    notional = np.abs(amount_a) * P
+    with np.errstate(divide="ignore"):
+        u = np.abs(amount_a) * np.sqrt(P) / pool_liquidity
+    buy = np.minimum(u, 0.5)
+    return np.where(amount_a > 0, notional * buy / (1 - buy), notional * (1 - 1 / (1 + u)))
+
+
+# --- Coût d'un rebalance ---
+def rebalance_cost(P, x_held, y_held, low, high, fee_tier=0.0, pool_liquidity=None, gas=0.0):
+    """
+    Swap nécessaire pour passer des tokens détenus (x_held, y_held) à la
+    composition d'une position (low, high) au prix P, et son coût en token B :
+    fee_tier x notionnel (fraction, ou centièmes de bip comme Uniswap : 3000 = 0.3%),
+    impact de prix (pool_liquidity = L actif de la pool, valeur ou fonction du prix,
+    dans les unités de compute_L ; None = pas d'impact) et gas fixe (token B).
+    Vectorisé sur tous les rebalances : chaque argument peut être un tableau.
+    """
+    P = np.asarray(P, dtype=np.float64)
+    value = x_held * P + y_held
+    x1, y1 = tokens_from_L(1.0, np.clip(P, low, high), low, high)
+    share_a = x1 * P / (x1 * P + y1)
+    swap = share_a * value / P - x_held
+
+    tier = np.asarray(fee_tier, dtype=np.float64)
+    tier = np.where(tier >= 1, tier / 1e6, tier)
+    fee = tier * np.abs(swap) * P
+
+    if callable(pool_liquidity):
+        pool_liquidity = pool_liquidity(P)
+    impact = np.zeros_like(fee) if pool_liquidity is None else swap_impact(swap, P, pool_liquidity)
+
+    gas = np.broadcast_to(np.asarray(gas, dtype=np.float64), fee.shape)
+    return {
+        "swap": swap,
+        "notional": np.abs(swap) * P,
+        "fee": fee,
+        "impact": impact,
+        "gas": gas,
+        "cost": fee + impact + gas
+    }
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+# --- Alignement des historiques ---
+def align_histories(histories):
+    """
+    Aligne plusieurs historiques {nom: (timestamps, prix)} sur leurs timestamps
+    communs. Renvoie (noms, timestamps, matrice de prix T x N). Les historiques
+    de moins de 2 points sont écartés.
+
+    Les timestamps sont triés sans doublon (comme dans le store) : l'intersection
+    se fait par recherche dichotomique, sans retrier les séries.
+    """
+    names = [k for k, (ts, _) in histories.items() if len(ts) >= 2]
+    if not names:
+        return [], np.empty(0, dtype=np.int64), np.empty((0, 0))
+    common = np.asarray(histories[names[0]][0])
+    for k in names[1:]:
+        ts = np.asarray(histories[k][0])
+        found = ts[np.minimum(np.searchsorted(ts, common), ts.size - 1)]
+        common = common[found == common]
+    matrix = np.empty((common.size, len(names)))
+    for j, k in enumerate(names):
+        ts, prices = histories[k]
+        matrix[:, j] = np.asarray(prices)[np.searchsorted(ts, common)]
+    return names, common, matrix
+
+
+# --- Matrice de covariance des rendements ---
+def covariance_matrix(histories, window=None):
+    """
+    Covariance et corrélation des rendements logarithmiques de tous les actifs,
+    en une passe sur la matrice alignée (window dernières bougies si précisé).
+    Le rendement log d'une paire A/B est r_A - r_B : toutes les paires en découlent.
+    """
+    names, _, prices = align_histories(histories)
+    if window is not None:
+        prices = prices[-(window + 1):]
+    if prices.shape[0] < 3:
+        k = len(names)
+        return {"names": names, "cov": np.zeros((k, k)), "corr": np.eye(k), "n": 0}
+
+    returns = np.diff(np.log(prices), axis=0)
+    returns -= returns.mean(axis=0)
+    cov = returns.T @ returns / returns.shape[0]
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / np.outer(std, std)
+    corr = np.where(np.isfinite(corr), corr, 0.0)
+    np.fill_diagonal(corr, 1.0)
+    return {"names": names, "cov": cov, "corr": corr, "n": returns.shape[0]}
+
+def pair_volatility(market, a, b):
+    """Volatilité des rendements de la paire a/b : sqrt(var_a + var_b - 2 cov_ab)"""
+    names = market["names"]
+    if a not in names or b not in names:
+        return 0.0
+    i, j = names.index(a), names.index(b)
+    cov = market["cov"]
+    return float(np.sqrt(max(cov[i, i] + cov[j, j] - 2 * cov[i, j], 0.0)))
+
+def pair_volatilities(market, pairs):
+    """Volatilité de chaque paire (a, b), toutes tirées de la même matrice"""
+    return {f"{a}/{b}": pair_volatility(market, a, b) for a, b in pairs}
+
+def correlation(market, a, b):
+    names = market["names"]
+    if a not in names or b not in names:
+        return 0.0
+    return float(market["corr"][names.index(a), names.index(b)])
@@ -0,0 +1,36 @@
+import numpy as np
+
+
+# --- Décimation des séries pour l'affichage ---
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets : indices des n_out points à garder pour que
+    la courbe réduite garde la forme de l'originale (pics et creux conservés).
+    Le premier et le dernier point sont toujours gardés. La boucle Python ne
+    parcourt que les n_out seaux, chaque seau est traité en NumPy.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 seaux entre le premier et le dernier point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    x_mean = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    y_mean = np.add.reduceat(np.nan_to_num(y[:-1]), edges[:-1]) / counts
+    # Moyenne du seau suivant ; pour le dernier seau, le dernier point
+    x_next = np.append(x_mean[1:], x[-1])
+    y_next = np.append(y_mean[1:], y[-1])
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        xb, yb = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - x_next[i]) * (yb - y[a]) - (x[a] - xb) * (y_next[i] - y[a]))
+        a = lo + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        keep[i + 1] = a
+    return keep
@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+
+from .apr import calculate_clmm_apr
+from .clmm import V_LP_bounded
+
+SWAP_COLUMNS = ("timestamp", "price", "volume", "fee_tier")
+DAY_S = 86_400
+
+
+# --- Lecture des swaps par blocs ---
+def iter_swap_file(path, chunk_rows=500_000):
+    """
+    Lit un fichier de swaps CSV ou Parquet par blocs de chunk_rows lignes.
+    Colonnes : timestamp (s), price (token A en token B), volume (token B),
+    fee_tier (fraction, ou centièmes de bip comme Uniswap : 3000 = 0.3%),
+    liquidity (optionnelle, liquidité active de la pool au moment du swap).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        names = set(pf.schema_arrow.names)
+        columns = list(SWAP_COLUMNS) + (["liquidity"] if "liquidity" in names else [])
+        for batch in pf.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield {c: batch.column(c).to_numpy(zero_copy_only=False) for c in columns}
+    else:
+        import pandas as pd
+
+        for df in pd.read_csv(path, chunksize=chunk_rows):
+            yield {c: df[c].to_numpy() for c in df.columns if c in SWAP_COLUMNS + ("liquidity",)}
+
+
+# --- Accrual des fees ---
+def accrue_fees(chunks, P_lower, P_upper, L, pool_liquidity=None):
+    """
+    Fait passer les swaps dans la position (P_lower, P_upper, L) et cumule ses fees.
+
+    Un swap rapporte volume x fee_tier x part de la position, uniquement si son
+    prix est dans le range. Part = L / (L + liquidité de la pool), la liquidité
+    venant de la colonne liquidity, sinon de pool_liquidity (valeur ou fonction
+    du prix). L et la liquidité de la pool doivent être dans les mêmes unités.
+    pool_liquidity_avg est la liquidité active de la pool moyenne sur la période,
+    chaque swap comptant jusqu'au suivant.
+
+    Les blocs sont traités un par un : la mémoire ne dépend pas de la taille du fichier.
+    """
+    fees = 0.0
+    volume_in_range = 0.0
+    n_swaps = 0
+    n_in_range = 0
+    value_time = 0.0          # somme valeur position x durée, quand dans le range
+    time_in_range = 0.0
+    pool_time = 0.0           # somme liquidité active de la pool x durée
+    first_ts = None
+    last = None               # (timestamp, prix, liquidité de la pool) du dernier swap du bloc précédent
+
+    for chunk in chunks:
+        ts = np.asarray(chunk["timestamp"], dtype=np.float64)
+        if ts.size == 0:
+            continue
+        price = np.asarray(chunk["price"], dtype=np.float64)
+        volume = np.asarray(chunk["volume"], dtype=np.float64)
+        tier = np.asarray(chunk["fee_tier"], dtype=np.float64)
+        tier = np.where(tier >= 1, tier / 1e6, tier)
+
+        if "liquidity" in chunk:
+            pool_L = np.asarray(chunk["liquidity"], dtype=np.float64)
+        elif callable(pool_liquidity):
+            pool_L = np.asarray(pool_liquidity(price), dtype=np.float64)
+        elif pool_liquidity is not None:
+            pool_L = pool_liquidity
+        else:
+            raise ValueError("liquidité de la pool absente du fichier : passer pool_liquidity")
+        pool_L = np.broadcast_to(np.asarray(pool_L, dtype=np.float64), ts.shape)
+
+        in_range = (price >= P_lower) & (price <= P_upper)
+        share = L / (L + pool_L)
+        fees += float(np.sum(volume * tier * share * in_range))
+        volume_in_range += float(np.sum(volume * in_range))
+        n_swaps += ts.size
+        n_in_range += int(np.count_nonzero(in_range))
+
+        # Moyennes pondérées par le temps : le prix (et la liquidité) d'un swap valent jusqu'au suivant
+        if last is not None:
+            ts = np.r_[last[0], ts]
+            price = np.r_[last[1], price]
+            pool_L = np.r_[last[2], pool_L]
+        dt = np.diff(ts)
+        p_held = price[:-1]
+        held_in = (p_held >= P_lower) & (p_held <= P_upper)
+        value_time += float(np.sum(V_LP_bounded(p_held, L, P_lower, P_upper) * dt * held_in))
+        time_in_range += float(np.sum(dt * held_in))
+        pool_time += float(np.dot(pool_L[:-1], dt))
+
+        if first_ts is None:
+            first_ts = ts[0]
+        last = (ts[-1], price[-1], pool_L[-1])
+
+    period_days = float(last[0] - first_ts) / DAY_S if last is not None else 0.0
+    if period_days > 0:
+        pool_avg = pool_time / (period_days * DAY_S)
+    else:
+        pool_avg = float(last[2]) if last is not None else 0.0
+    return {
+        "fees": fees,
+        "volume_in_range": volume_in_range,
+        "n_swaps": n_swaps,
+        "n_in_range": n_in_range,
+        "period_days": period_days,
+        "time_in_range": time_in_range / (period_days * DAY_S) if period_days > 0 else 0.0,
+        "active_value_avg": value_time / time_in_range if time_in_range > 0 else 0.0,
+        "pool_liquidity_avg": pool_avg
+    }
+
+def apr_from_fees(result):
+    """APR de la position à partir du résultat de accrue_fees (calculate_clmm_apr)"""
+    return calculate_clmm_apr(result["fees"], result["active_value_avg"], result["period_days"])
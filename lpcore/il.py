@@ -0,0 +1,21 @@
+import numpy as np
+
+from .clmm import compute_L, tokens_from_L, V_LP, V_HODL
+
+
+# --- IL normalisé ---
+def il_ratio(p, a, b):
+    """
+    IL exact (fraction) d'une position déposée au prix 1 sur le range [a, b],
+    au prix normalisé p = P / P_deposit. L'IL ne dépend que de p, a et b.
+    """
+    L = compute_L(1.0, a, b, 1.0)
+    x0, y0 = tokens_from_L(L, 1.0, a, b)
+    return V_LP(p, L, a, b) / V_HODL(p, x0, y0) - 1
+
+
+# --- Courbe ---
+def il_curve(p, a, b):
+    """IL exact (fraction) aux prix normalisés p pour le range [a, b] : float pour un scalaire"""
+    out = il_ratio(np.asarray(p, dtype=np.float64), a, b)
+    return float(out) if out.ndim == 0 else out
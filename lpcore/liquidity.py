@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+
+from .ticks import tick_to_price
+
+POSITION_COLUMNS = ("tick_lower", "tick_upper", "liquidity")
+
+
+# --- Lecture d'un snapshot de positions ---
+def load_positions(path):
+    """
+    Lit un snapshot de positions LP (CSV ou Parquet).
+    Colonnes : tick_lower, tick_upper, liquidity (liquidité brute du contrat).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path, columns=list(POSITION_COLUMNS))
+        return {c: table.column(c).to_numpy() for c in POSITION_COLUMNS}
+
+    import pandas as pd
+
+    df = pd.read_csv(path, usecols=list(POSITION_COLUMNS))
+    return {c: df[c].to_numpy() for c in POSITION_COLUMNS}
+
+
+# --- Index de liquidité ---
+class LiquidityIndex:
+    """
+    Distribution de la liquidité d'une pool : bornes de prix triées et somme
+    cumulée des liquidités nettes (+L à la borne basse, -L à la borne haute).
+
+    La liquidité active à un prix est une recherche dichotomique dans les bornes
+    (O(log n)), et tout un chemin de prix se traite en un seul searchsorted.
+    Une position est active pour lower <= P < upper, comme on-chain.
+    L'index est appelable : il se passe tel quel en pool_liquidity à accrue_fees.
+    """
+
+    def __init__(self, lower, upper, liquidity):
+        lower = np.asarray(lower, dtype=np.float64).ravel()
+        upper = np.asarray(upper, dtype=np.float64).ravel()
+        liquidity = np.asarray(liquidity, dtype=np.float64).ravel()
+        keep = (liquidity > 0) & (upper > lower)
+
+        bounds = np.concatenate([lower[keep], upper[keep]])
+        net = np.concatenate([liquidity[keep], -liquidity[keep]])
+        order = np.argsort(bounds, kind="stable")
+        bounds, net = bounds[order], net[order]
+
+        # Une entrée par borne distincte, nets cumulés
+        self.bounds, first = np.unique(bounds, return_index=True)
+        net = np.add.reduceat(net, first) if net.size else net
+        self.active = np.maximum(np.cumsum(net), 0.0)
+        self.n_positions = int(np.count_nonzero(keep))
+
+    @classmethod
+    def from_ticks(cls, tick_lower, tick_upper, liquidity, decimals=(0, 0)):
+        """
+        Index depuis des ticks et des liquidités brutes du contrat. Les prix sont
+        convertis en unités humaines (token A en token B) et les liquidités dans
+        l'unité de compute_L.
+        """
+        d0, d1 = decimals
+        scale = 10.0 ** (-(d0 + d1) / 2)
+        return cls(
+            tick_to_price(tick_lower, d0, d1),
+            tick_to_price(tick_upper, d0, d1),
+            np.asarray(liquidity, dtype=np.float64) * scale
+        )
+
+    @classmethod
+    def from_file(cls, path, decimals=(0, 0)):
+        pos = load_positions(path)
+        return cls.from_ticks(pos["tick_lower"], pos["tick_upper"], pos["liquidity"], decimals)
+
+    def active_liquidity(self, prices):
+        """Liquidité active de la pool à chaque prix"""
+        if self.active.size == 0:
+            out = np.zeros(np.shape(prices))
+            return float(out) if out.ndim == 0 else out
+        idx = np.searchsorted(self.bounds, prices, side="right") - 1
+        out = np.where(idx >= 0, self.active[np.maximum(idx, 0)], 0.0)
+        return float(out) if out.ndim == 0 else out
+
+    __call__ = active_liquidity
+
+    def time_weighted(self, prices, timestamps=None):
+        """
+        Liquidité active moyenne sur un chemin de prix. Avec des timestamps, chaque
+        prix vaut jusqu'au suivant (pondération par la durée), sinon moyenne simple.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        if prices.size == 0:
+            return 0.0
+        active = self.active_liquidity(prices)
+        if timestamps is None or prices.size < 2:
+            return float(np.mean(active))
+        dt = np.diff(np.asarray(timestamps, dtype=np.float64))
+        total = float(dt.sum())
+        return float(np.dot(active[:-1], dt) / total) if total > 0 else float(np.mean(active))
+
+    def distribution(self):
+        """(bornes, liquidité active sur [bornes[i], bornes[i + 1])) pour l'affichage"""
+        return self.bounds, self.active
@@ -0,0 +1,110 @@
+import numpy as np
+
+from .backtest import _simulate_batch
+
+QUANTILES = (5, 25, 50, 75, 95)
+
+
+# --- Trajectoires simulées ---
+def simulate_paths(rng, P0, vol, n_paths, n_steps, steps_per_day=1440, drift=0.0, model="gbm", df=4.0):
+    """
+    Trajectoires de prix (n_paths, n_steps) partant de P0, à partir de la volatilité
+    journalière vol (écart-type des rendements, comme vol_30d).
+    model="gbm" : rendements gaussiens ; model="student" : queues épaisses
+    (Student à df degrés de liberté, ramenée à variance 1).
+    """
+    sigma = vol / np.sqrt(steps_per_day)
+    mu = drift / steps_per_day
+
+    if model == "gbm":
+        z = rng.standard_normal((n_paths, n_steps))
+    elif model == "student":
+        if df <= 2:
+            raise ValueError("df doit être > 2 pour une variance finie")
+        z = rng.standard_t(df, (n_paths, n_steps)) * np.sqrt((df - 2) / df)
+    else:
+        raise ValueError(f"modèle inconnu : {model}")
+
+    z *= sigma
+    z += mu - 0.5 * sigma ** 2
+    z[:, 0] = 0.0
+    np.cumsum(z, axis=1, out=z)
+    np.exp(z, out=z)
+    z *= P0
+    return z
+
+
+# --- Monte Carlo du range ---
+def monte_carlo_range(
+    P0,
+    vol,
+    range_pct,
+    ratio=(0.5, 0.5),
+    range_percent=None,
+    trig_low=0.0,
+    trig_high=100.0,
+    n_paths=10_000,
+    n_steps=1440,
+    steps_per_day=1440,
+    drift=0.0,
+    model="gbm",
+    df=4.0,
+    capital=1000.0,
+    max_cells=4_000_000,
+    seed=None
+):
+    """
+    Simule n_paths trajectoires et applique la stratégie de run_backtest à chacune.
+
+    Les trajectoires sont générées et simulées par paquets d'au plus max_cells
+    points : seuls les résultats par trajectoire sont conservés, la mémoire ne
+    dépend donc pas de n_paths x n_steps.
+
+    time_to_exit : pas de la première sortie du range initial (trigger ou borne),
+    n_steps si la trajectoire n'est jamais sortie.
+    """
+    rng = np.random.default_rng(seed)
+    if range_percent is None:
+        range_percent = range_pct
+    chunk_paths = max(1, max_cells // n_steps)
+
+    time_to_exit = np.empty(n_paths, dtype=np.int64)
+    n_rebalances = np.empty(n_paths, dtype=np.int64)
+    vs_hodl = np.empty(n_paths)
+    time_in_range = np.empty(n_paths)
+
+    for p0 in range(0, n_paths, chunk_paths):
+        p1 = min(p0 + chunk_paths, n_paths)
+        paths = simulate_paths(rng, P0, vol, p1 - p0, n_steps, steps_per_day, drift, model, df)
+        ones = np.ones(p1 - p0)
+        res = _simulate_batch(
+            paths,
+            ones * range_pct,
+            ones * range_percent,
+            ones * trig_low,
+            ones * trig_high,
+            ratio,
+            capital,
+            max_cells
+        )
+        time_to_exit[p0:p1] = res["first_rebalance"]
+        n_rebalances[p0:p1] = res["n_rebalances"]
+        vs_hodl[p0:p1] = res["vs_hodl"]
+        time_in_range[p0:p1] = res["time_in_range"]
+
+    exited = time_to_exit < n_steps
+    exit_days = time_to_exit[exited] / steps_per_day
+
+    return {
+        "time_to_exit": time_to_exit,
+        "n_rebalances": n_rebalances,
+        "vs_hodl": vs_hodl,
+        "time_in_range": time_in_range,
+        "p_exit": float(exited.mean()),
+        "exit_days_quantiles": dict(zip(
+            QUANTILES,
+            np.percentile(exit_days, QUANTILES) if exit_days.size else [np.nan] * len(QUANTILES)
+        )),
+        "mean_rebalances": float(n_rebalances.mean()),
+        "vs_hodl_quantiles": dict(zip(QUANTILES, np.percentile(vs_hodl, QUANTILES)))
+    }
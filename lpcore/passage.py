@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class PassageIndex:
+    """
+    Index de premier passage d'une série de prix : pyramide des min / max par
+    blocs alignés de 2^k bougies, tous niveaux concaténés (~2n valeurs par tableau).
+
+    « Premier index après t hors de [low, high] » se lit en O(log n) : on saute
+    les plus grands blocs alignés entièrement dans l'intervalle en montant dans
+    la pyramide, puis on descend dans le premier bloc qui en sort.
+    """
+
+    def __init__(self, prices):
+        prices = np.asarray(prices, dtype=np.float64)
+        self.n = prices.size
+        mins, maxs = [prices], [prices]
+        while mins[-1].size > 1:
+            mn, mx = mins[-1], maxs[-1]
+            if mn.size % 2:
+                # Bloc final incomplet : complété par sa dernière valeur
+                mn, mx = np.r_[mn, mn[-1]], np.r_[mx, mx[-1]]
+            mins.append(np.minimum(mn[0::2], mn[1::2]))
+            maxs.append(np.maximum(mx[0::2], mx[1::2]))
+        self.top = len(mins) - 1
+        self._offsets = np.cumsum([0] + [m.size for m in mins[:-1]]).tolist()
+        self.mins = np.concatenate(mins)
+        self.maxs = np.concatenate(maxs)
+
+    @property
+    def nbytes(self):
+        return self.mins.nbytes + self.maxs.nbytes
+
+    # --- Requête ---
+    def first_exit(self, start, low, high, buffer=1):
+        """
+        Premier index i > start où le prix est < low ou > high (n si aucun).
+        Avec buffer > 1, index où le prix est hors de [low, high] depuis buffer
+        bougies consécutives : chaque séquence trop courte est relancée par l'index.
+        """
+        j = self._first_exit(start, low, high)
+        prices = self.mins[:self.n]
+        while buffer > 1 and j < self.n:
+            run = prices[j:j + buffer]
+            back = np.flatnonzero((run >= low) & (run <= high))
+            if not back.size:
+                return j + buffer - 1 if run.size == buffer else self.n
+            j = self._first_exit(j + int(back[0]), low, high)
+        return j
+
+    def _first_exit(self, start, low, high):
+        n, top, offsets = self.n, self.top, self._offsets
+        mins, maxs = self.mins, self.maxs
+        i, k = start + 1, 0
+        while True:
+            if i >= n:
+                return n
+            b = i >> k
+            if b & 1 == 0 and k < top:
+                k += 1
+            elif mins[offsets[k] + b] < low or maxs[offsets[k] + b] > high:
+                break
+            else:
+                i = (b + 1) << k
+        while k > 0:
+            k -= 1
+            b <<= 1
+            if not (mins[offsets[k] + b] < low or maxs[offsets[k] + b] > high):
+                b += 1
+        return b
@@ -0,0 +1,100 @@
+import numpy as np
+
+from .backtest import _simulate_batch
+from .clmm import V_LP_bounded, V_HODL
+from .covariance import align_histories
+
+
+def _segment_paths(n, segments):
+    """Paramètres (low, high, L) par ligne et par bougie, depuis les positions ouvertes (ligne, début, ...)"""
+    rows, starts, lows, highs, Ls = segments
+    K = int(rows.max()) + 1
+    order = np.lexsort((starts, rows))
+    marker = np.full((K, n), -1, dtype=np.int64)
+    marker[rows[order], starts[order]] = order
+    # Chaque bougie prend la dernière position ouverte de sa ligne
+    seg = np.maximum.accumulate(marker, axis=1)
+    return lows[seg], highs[seg], Ls[seg]
+
+
+def portfolio_backtest(histories, positions, costs=None, max_cells=2_000_000):
+    """
+    Backtest de plusieurs positions LP simultanées sur un même axe de temps.
+
+    histories : {token: (timestamps, prix USD)}, alignés sur leurs timestamps communs.
+    positions : une entrée par LP, {"pair": "WETH/USDC", "capital": capital USD,
+    "range_pct", "range_percent", "trig_low", "trig_high", "ratio",
+    "tick_spacing", "decimals"} (seuls pair, capital et range_pct sont requis).
+
+    Toutes les positions sont simulées en une passe (une trajectoire A/B par
+    ligne, mêmes règles que run_backtest) ; les valeurs sont converties en USD
+    bougie par bougie puis agrégées. capital_use est la part de la valeur du
+    portefeuille dans une position en range (qui touche des fees).
+    costs : coûts de swap des rebalances (voir rebalance_cost), chaque paramètre
+    commun ou donné par position, en token B de la paire.
+    """
+    if not positions:
+        raise ValueError("aucune position")
+    pairs = [p["pair"].split("/") for p in positions]
+    tokens = sorted({t for pair in pairs for t in pair})
+    missing = [t for t in tokens if t not in histories]
+    if missing:
+        raise ValueError(f"historique manquant : {', '.join(missing)}")
+
+    names, timestamps, usd = align_histories({t: histories[t] for t in tokens})
+    if len(names) < len(tokens) or len(timestamps) < 2:
+        raise ValueError("historiques communs insuffisants")
+    col = {t: i for i, t in enumerate(names)}
+    ia = np.array([col[a] for a, _ in pairs])
+    ib = np.array([col[b] for _, b in pairs])
+    usd_b = np.ascontiguousarray(usd[:, ib].T)                    # (K, n) prix USD du token B
+    prices = np.ascontiguousarray(usd[:, ia].T) / usd_b           # (K, n) prix A en B
+
+    get = lambda key, default: np.array([p.get(key, default) for p in positions], dtype=float)
+    rp = get("range_pct", np.nan)
+    rf = np.array([p.get("range_percent") or p["range_pct"] for p in positions], dtype=float)
+    ratio = np.array([p.get("ratio", (0.5, 0.5)) for p in positions], dtype=float)
+    decimals = np.array([p.get("decimals", (0, 0)) for p in positions], dtype=np.int64)
+    spacing = np.array([p.get("tick_spacing") or 0 for p in positions], dtype=np.int64)
+    capital = get("capital", np.nan) / usd_b[:, 0]
+
+    res = _simulate_batch(
+        prices, rp, rf, get("trig_low", 0.0), get("trig_high", 100.0),
+        (ratio[:, 0], ratio[:, 1]), capital, max_cells, spacing, (decimals[:, 0], decimals[:, 1]),
+        segments=True, costs=costs
+    )
+
+    # --- Trajectoires par position, en USD ---
+    low, high, L = _segment_paths(prices.shape[1], res["segments"])
+    value = V_LP_bounded(prices, L, low, high) * usd_b
+    hodl = V_HODL(prices, res["x0"][:, None], res["y0"][:, None]) * usd_b
+    in_range = (prices >= low) & (prices <= high)
+
+    # --- Agrégats ---
+    total = value.sum(axis=0)
+    total_hodl = hodl.sum(axis=0)
+    drawdown = total / np.maximum.accumulate(total) - 1
+    capital_use = (value * in_range).sum(axis=0) / total
+
+    return {
+        "timestamps": timestamps,
+        "value": total,
+        "hodl": total_hodl,
+        "drawdown": drawdown,
+        "capital_use": capital_use,
+        "max_drawdown": float(drawdown.min()),
+        "avg_capital_use": float(capital_use.mean()),
+        "final_value": float(total[-1]),
+        "final_hodl": float(total_hodl[-1]),
+        "vs_hodl": float(total[-1] / total_hodl[-1] - 1),
+        "positions": {
+            "pair": [p["pair"] for p in positions],
+            "value": value,
+            "hodl": hodl,
+            "in_range": in_range,
+            "final_value": value[:, -1],
+            "n_rebalances": res["n_rebalances"],
+            "total_cost": res["total_cost"] * usd_b[:, -1],     # USD au dernier prix du token B
+            "time_in_range": res["time_in_range"]
+        }
+    }
@@ -0,0 +1,141 @@
+from collections import deque
+
+import numpy as np
+
+
+# --- Bougies OHLC ---
+def ohlc_from_closes(ts, prices, step):
+    """Bougies (ts, open, high, low, close) de durée step (ms) à partir de clôtures plus fines"""
+    ts = np.asarray(ts, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    if ts.size == 0:
+        e = np.empty(0)
+        return ts, e, e, e, e
+    bucket = ts // step * step
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], ts.size] - 1
+    return (
+        bucket[starts],
+        prices[starts],
+        np.maximum.reduceat(prices, starts),
+        np.minimum.reduceat(prices, starts),
+        prices[ends]
+    )
+
+
+# --- Calculs vectorisés sur un historique ---
+def true_range(high, low, close):
+    """True range : max(H - L, |H - C précédent|, |L - C précédent|), H - L pour la 1re bougie"""
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    tr = high - low
+    prev = close[:-1]
+    tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(high[1:] - prev), np.abs(low[1:] - prev)))
+    return tr
+
+def _wilder_smooth(x, period, seed, block=256):
+    """y_t = y_(t-1) + (x_t - y_(t-1)) / period, par blocs (forme fermée stable)"""
+    a = (period - 1) / period
+    y = np.empty_like(x)
+    prev = seed
+    for i in range(0, x.size, block):
+        xb = x[i:i + block]
+        k = np.arange(1, xb.size + 1)
+        powers = a ** k
+        # y_k = a^k * prev + (1 - a) * sum_{j<=k} a^(k-j) x_j
+        y[i:i + xb.size] = powers * (prev + (1 - a) * np.cumsum(xb / powers))
+        prev = y[i + xb.size - 1]
+    return y
+
+def wilder_atr(high, low, close, period=14):
+    """ATR de Wilder (NaN tant que moins de period bougies)"""
+    tr = true_range(high, low, close)
+    atr = np.full(tr.size, np.nan)
+    if tr.size < period:
+        return atr
+    atr[period - 1] = tr[:period].mean()
+    atr[period:] = _wilder_smooth(tr[period:], period, atr[period - 1])
+    return atr
+
+def rolling_std(x, window):
+    """Écart-type glissant (ddof=0, comme np.std) : NaN tant que la fenêtre est incomplète"""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.size, np.nan)
+    if x.size < window:
+        return out
+    c1 = np.cumsum(np.r_[0.0, x])
+    c2 = np.cumsum(np.r_[0.0, x * x])
+    s1 = c1[window:] - c1[:-window]
+    s2 = c2[window:] - c2[:-window]
+    out[window - 1:] = np.sqrt(np.maximum(s2 / window - (s1 / window) ** 2, 0.0))
+    return out
+
+
+# --- Moteur incrémental ---
+class RollingStats:
+    """
+    Volatilité glissante des rendements et ATR de Wilder, mis à jour en O(1)
+    par nouvelle bougie. extend() rejoue un historique, update() ajoute une bougie ;
+    les bougies déjà vues (timestamp <= last_ts) sont ignorées.
+    """
+
+    def __init__(self, window=30, atr_period=14):
+        self.window = window
+        self.atr_period = atr_period
+        self.last_ts = None
+        self.last_close = None
+        self.true_range = np.nan
+        self.atr = np.nan
+        self._tr_seed = []
+        self._returns = deque(maxlen=window)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._n_updates = 0
+
+    @property
+    def volatility(self):
+        n = len(self._returns)
+        if n < 2:
+            return 0.0
+        mean = self._sum / n
+        return float(np.sqrt(max(self._sum_sq / n - mean * mean, 0.0)))
+
+    def update(self, ts, high, low, close):
+        if self.last_ts is not None and ts <= self.last_ts:
+            return self
+
+        tr = high - low
+        if self.last_close is not None:
+            tr = max(tr, abs(high - self.last_close), abs(low - self.last_close))
+            r = close / self.last_close - 1
+            if len(self._returns) == self.window:
+                old = self._returns[0]
+                self._sum -= old
+                self._sum_sq -= old * old
+            self._returns.append(r)
+            self._sum += r
+            self._sum_sq += r * r
+        self.true_range = tr
+
+        if np.isnan(self.atr):
+            self._tr_seed.append(tr)
+            if len(self._tr_seed) == self.atr_period:
+                self.atr = float(np.mean(self._tr_seed))
+                self._tr_seed = []
+        else:
+            self.atr += (tr - self.atr) / self.atr_period
+
+        # Recalcul périodique des sommes glissantes (dérive d'arrondi)
+        self._n_updates += 1
+        if self._n_updates % 10_000 == 0:
+            self._sum = float(np.sum(self._returns))
+            self._sum_sq = float(np.sum(np.square(self._returns)))
+
+        self.last_ts = ts
+        self.last_close = close
+        return self
+
+    def extend(self, ts, high, low, close):
+        for row in zip(np.asarray(ts).tolist(), np.asarray(high).tolist(),
+                       np.asarray(low).tolist(), np.asarray(close).tolist()):
+            self.update(*row)
+        return self
@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-process
+    fcntl = None
+
+
+# --- Stockage local des historiques de prix ---
+# Un dossier par actif et résolution, deux fichiers binaires bruts en colonnes
+# (timestamps ms int64 et prix float64) : l'ajout se fait en fin de fichier et
+# la lecture passe par np.memmap, sans copie ni parsing.
+STORE_DIR = os.environ.get(
+    "LP_PRICE_STORE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "price_store")
+)
+
+RESOLUTIONS = {
+    "minute": 60_000,
+    "hourly": 3_600_000,
+    "daily": 86_400_000
+}
+
+_EMPTY_TS = np.empty(0, dtype=np.int64)
+_EMPTY_PX = np.empty(0, dtype=np.float64)
+
+
+def _paths(asset_id, resolution, root):
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"résolution inconnue : {resolution}")
+    folder = os.path.join(root or STORE_DIR, asset_id, resolution)
+    return folder, os.path.join(folder, "ts.i8"), os.path.join(folder, "price.f8")
+
+def _length(ts_path, px_path):
+    if not (os.path.exists(ts_path) and os.path.exists(px_path)):
+        return 0
+    return min(os.path.getsize(ts_path), os.path.getsize(px_path)) // 8
+
+def load_history(asset_id, resolution="daily", root=None):
+    """Historique (timestamps ms, prix) en lecture seule, mappé en mémoire sans copie"""
+    _, ts_path, px_path = _paths(asset_id, resolution, root)
+    n = _length(ts_path, px_path)
+    if n == 0:
+        return _EMPTY_TS, _EMPTY_PX
+    ts = np.memmap(ts_path, dtype="<i8", mode="r", shape=(n,))
+    prices = np.memmap(px_path, dtype="<f8", mode="r", shape=(n,))
+    return ts, prices
+
+def last_timestamp(asset_id, resolution="daily", root=None):
+    """Dernier timestamp stocké (ms), None si l'historique est vide"""
+    _, ts_path, px_path = _paths(asset_id, resolution, root)
+    n = _length(ts_path, px_path)
+    if n == 0:
+        return None
+    with open(ts_path, "rb") as f:
+        f.seek((n - 1) * 8)
+        return int(np.frombuffer(f.read(8), dtype="<i8")[0])
+
+def append_history(asset_id, resolution, ts, prices, root=None):
+    """
+    Ajoute les bougies postérieures au dernier timestamp stocké.
+    Les prix nuls, négatifs ou NaN sont ignorés. Renvoie le nombre de bougies ajoutées.
+    """
+    folder, ts_path, px_path = _paths(asset_id, resolution, root)
+    os.makedirs(folder, exist_ok=True)
+
+    ts = np.asarray(ts, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    keep = np.isfinite(prices) & (prices > 0)
+    ts, prices = ts[keep], prices[keep]
+    order = np.argsort(ts, kind="stable")
+    ts, prices = ts[order], prices[order]
+
+    with open(os.path.join(folder, ".lock"), "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+        # Écriture interrompue : on retombe sur le dernier enregistrement complet
+        n = _length(ts_path, px_path)
+        for path in (ts_path, px_path):
+            with open(path, "ab") as f:
+                f.truncate(n * 8)
+
+        last = last_timestamp(asset_id, resolution, root)
+        if last is not None:
+            new = ts > last
+            ts, prices = ts[new], prices[new]
+        if len(ts):
+            uniq = np.r_[ts[1:] != ts[:-1], True]
+            ts, prices = ts[uniq], prices[uniq]
+        if len(ts) == 0:
+            return 0
+
+        with open(px_path, "ab") as f:
+            f.write(prices.astype("<f8").tobytes())
+        with open(ts_path, "ab") as f:
+            f.write(ts.astype("<i8").tobytes())
+        return len(ts)
+
+def pair_history(asset_a, asset_b, resolution="daily", root=None):
+    """Historique du prix A/B sur les timestamps communs aux deux actifs"""
+    ts_a, px_a = load_history(asset_a, resolution, root)
+    ts_b, px_b = load_history(asset_b, resolution, root)
+    ts, ia, ib = np.intersect1d(ts_a, ts_b, assume_unique=True, return_indices=True)
+    return ts, px_a[ia] / px_b[ib]
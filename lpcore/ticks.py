@@ -0,0 +1,243 @@
+import math
+
+import numpy as np
+
+# --- Constantes Uniswap v3 (TickMath) ---
+MIN_TICK = -887272
+MAX_TICK = 887272
+MIN_SQRT_RATIO = 4295128739
+MAX_SQRT_RATIO = 1461446703485210103287273052203988822378723970342
+Q96 = 1 << 96
+Q128 = 1 << 128
+UINT256_MAX = (1 << 256) - 1
+
+# Facteurs sqrt(1.0001)^-(2^i) en Q128, comme dans TickMath.getSqrtRatioAtTick
+_TICK_FACTORS = (
+    (0x2, 0xfff97272373d413259a46990580e213a),
+    (0x4, 0xfff2e50f5f656932ef12357cf3c7fdcc),
+    (0x8, 0xffe5caca7e10e4e61c3624eaa0941cd0),
+    (0x10, 0xffcb9843d60f6159c9db58835c926644),
+    (0x20, 0xff973b41fa98c081472e6896dfb254c0),
+    (0x40, 0xff2ea16466c96a3843ec78b326b52861),
+    (0x80, 0xfe5dee046a99a2a811c461f1969c3053),
+    (0x100, 0xfcbe86c7900a88aedcffc83b479aa3a4),
+    (0x200, 0xf987a7253ac413176f2b074cf7815e54),
+    (0x400, 0xf3392b0822b70005940c7a398e4b70f3),
+    (0x800, 0xe7159475a2c29b7443b29c7fa6e889d9),
+    (0x1000, 0xd097f3bdfd2022b8845ad8f792aa5825),
+    (0x2000, 0xa9f746462d870fdf8a65dc1f90e061e5),
+    (0x4000, 0x70d869a156d2a1b890bb3df62baf32f7),
+    (0x8000, 0x31be135f97d08fd981231505542fcfa6),
+    (0x10000, 0x9aa508b5b7a84e1c677de54f3e99bc9),
+    (0x20000, 0x5d6af8dedb81196699c329225ee604),
+    (0x40000, 0x2216e584f5fa1ea926041bedfe98),
+    (0x80000, 0x48a170391f7dc42444e8fa2),
+)
+
+
+# --- TickMath ---
+def get_sqrt_ratio_at_tick(tick):
+    """sqrtPriceX96 exact d'un tick (mêmes arrondis que le contrat)"""
+    tick = int(tick)
+    if not MIN_TICK <= tick <= MAX_TICK:
+        raise ValueError(f"tick hors limites : {tick}")
+    abs_tick = abs(tick)
+    ratio = 0xfffcb933bd6fad37aa2d162d1a594001 if abs_tick & 0x1 else Q128
+    for bit, factor in _TICK_FACTORS:
+        if abs_tick & bit:
+            ratio = (ratio * factor) >> 128
+    if tick > 0:
+        ratio = UINT256_MAX // ratio
+    # Q128.128 -> Q64.96, arrondi supérieur
+    return (ratio >> 32) + (1 if ratio % (1 << 32) else 0)
+
+def get_tick_at_sqrt_ratio(sqrt_price_x96):
+    """Plus grand tick dont le sqrtPriceX96 est <= sqrt_price_x96"""
+    s = int(sqrt_price_x96)
+    if not MIN_SQRT_RATIO <= s < MAX_SQRT_RATIO:
+        raise ValueError("sqrtPriceX96 hors limites")
+    # Estimation flottante puis correction exacte
+    tick = math.floor(2 * math.log(s / Q96) / math.log(1.0001))
+    tick = min(max(tick, MIN_TICK), MAX_TICK)
+    while tick > MIN_TICK and get_sqrt_ratio_at_tick(tick) > s:
+        tick -= 1
+    while tick < MAX_TICK and get_sqrt_ratio_at_tick(tick + 1) <= s:
+        tick += 1
+    return tick
+
+
+# --- SqrtPriceMath ---
+def _mul_div(a, b, denominator, round_up=False):
+    q, r = divmod(a * b, denominator)
+    return q + 1 if round_up and r else q
+
+def get_amount0_delta(sqrt_a, sqrt_b, liquidity, round_up=False):
+    """Quantité de token0 entre deux sqrtPriceX96 pour une liquidité donnée"""
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    numerator1 = liquidity << 96
+    numerator2 = sqrt_b - sqrt_a
+    if round_up:
+        inner = _mul_div(numerator1, numerator2, sqrt_b, True)
+        return inner // sqrt_a + (1 if inner % sqrt_a else 0)
+    return _mul_div(numerator1, numerator2, sqrt_b) // sqrt_a
+
+def get_amount1_delta(sqrt_a, sqrt_b, liquidity, round_up=False):
+    """Quantité de token1 entre deux sqrtPriceX96 pour une liquidité donnée"""
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    return _mul_div(liquidity, sqrt_b - sqrt_a, Q96, round_up)
+
+
+# --- LiquidityAmounts ---
+def get_liquidity_for_amount0(sqrt_a, sqrt_b, amount0):
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    intermediate = _mul_div(sqrt_a, sqrt_b, Q96)
+    return _mul_div(amount0, intermediate, sqrt_b - sqrt_a)
+
+def get_liquidity_for_amount1(sqrt_a, sqrt_b, amount1):
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    return _mul_div(amount1, Q96, sqrt_b - sqrt_a)
+
+def get_liquidity_for_amounts(sqrt_price, sqrt_a, sqrt_b, amount0, amount1):
+    """Liquidité maximale apportée par (amount0, amount1) sur le range [sqrt_a, sqrt_b]"""
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    if sqrt_price <= sqrt_a:
+        return get_liquidity_for_amount0(sqrt_a, sqrt_b, amount0)
+    if sqrt_price < sqrt_b:
+        return min(
+            get_liquidity_for_amount0(sqrt_price, sqrt_b, amount0),
+            get_liquidity_for_amount1(sqrt_a, sqrt_price, amount1)
+        )
+    return get_liquidity_for_amount1(sqrt_a, sqrt_b, amount1)
+
+def get_amounts_for_liquidity(sqrt_price, sqrt_a, sqrt_b, liquidity):
+    """(amount0, amount1) d'une liquidité sur [sqrt_a, sqrt_b] au prix sqrt_price"""
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    if sqrt_price <= sqrt_a:
+        return get_amount0_delta(sqrt_a, sqrt_b, liquidity), 0
+    if sqrt_price < sqrt_b:
+        return (
+            get_amount0_delta(sqrt_price, sqrt_b, liquidity),
+            get_amount1_delta(sqrt_a, sqrt_price, liquidity)
+        )
+    return 0, get_amount1_delta(sqrt_a, sqrt_b, liquidity)
+
+
+# --- Versions vectorisées (tableaux d'entiers exacts, dtype object) ---
+def sqrt_ratios_at_ticks(ticks):
+    """sqrtPriceX96 exacts d'un tableau de ticks : un calcul par tick distinct"""
+    ticks = np.asarray(ticks, dtype=np.int64)
+    uniq, inverse = np.unique(ticks, return_inverse=True)
+    table = np.array([get_sqrt_ratio_at_tick(t) for t in uniq.tolist()] + [None], dtype=object)[:-1]
+    return table[inverse].reshape(ticks.shape)
+
+def ticks_at_sqrt_ratios(sqrt_prices):
+    """Ticks d'un tableau de sqrtPriceX96"""
+    return np.vectorize(get_tick_at_sqrt_ratio, otypes=[np.int64])(sqrt_prices)
+
+liquidity_for_amounts = np.frompyfunc(get_liquidity_for_amounts, 5, 1)
+amounts_for_liquidity = np.frompyfunc(get_amounts_for_liquidity, 4, 2)
+
+
+# --- Prix <-> ticks (flottants, pour les backtests) ---
+def price_to_tick(price, decimals0=0, decimals1=0):
+    """Tick (arrondi inférieur) d'un prix token0 en token1 exprimé en unités humaines"""
+    price = np.asarray(price, dtype=np.float64)
+    raw = price * 10.0 ** (decimals1 - decimals0)
+    tick = np.floor(np.log(raw) / math.log(1.0001)).astype(np.int64)
+    # Estimation flottante puis correction : tick_to_price(tick) <= price < tick_to_price(tick + 1)
+    tick = tick + (tick_to_price(tick + 1, decimals0, decimals1) <= price)
+    return tick - (tick_to_price(tick, decimals0, decimals1) > price)
+
+def tick_to_price(tick, decimals0=0, decimals1=0):
+    return 1.0001 ** np.asarray(tick, dtype=np.float64) * 10.0 ** (decimals0 - decimals1)
+
+def snap_range(low, high, tick_spacing, decimals0=0, decimals1=0):
+    """Bornes alignées sur les ticks utilisables : low arrondi en dessous, high au-dessus"""
+    t_low = price_to_tick(np.maximum(low, 1e-300), decimals0, decimals1) // tick_spacing * tick_spacing
+    # Plus petit tick dont le prix est >= high, puis multiple du spacing au-dessus
+    t_high = price_to_tick(high, decimals0, decimals1)
+    t_high = t_high + (tick_to_price(t_high, decimals0, decimals1) < high)
+    t_high = -(-t_high // tick_spacing) * tick_spacing
+    t_low = np.maximum(t_low, MIN_TICK // tick_spacing * tick_spacing)
+    t_high = np.minimum(np.maximum(t_high, t_low + tick_spacing), MAX_TICK // tick_spacing * tick_spacing)
+    return tick_to_price(t_low, decimals0, decimals1), tick_to_price(t_high, decimals0, decimals1)
+
+
+# --- Tick bitmap ---
+class TickBitmap:
+    """
+    Bitmap des ticks initialisés, en mots de 64 bits couvrant toute la plage de
+    ticks utilisables (dense : ~28k mots pour un tick spacing de 1).
+    Les ticks traversés entre deux prix se lisent par balayage des mots non
+    nuls, sans boucle tick par tick.
+
+    Outil autonome pour rejouer l'état d'une pool : les backtests n'en ont pas
+    besoin, l'alignement des ranges (snap_range) ne dépend que du tick spacing.
+    """
+
+    def __init__(self, tick_spacing):
+        self.tick_spacing = tick_spacing
+        self._min = MIN_TICK // tick_spacing
+        n_words = (MAX_TICK // tick_spacing - self._min) // 64 + 1
+        self.words = np.zeros(n_words, dtype=np.uint64)
+
+    def _position(self, ticks):
+        ticks = np.asarray(ticks, dtype=np.int64)
+        if np.any(ticks % self.tick_spacing):
+            raise ValueError("tick non aligné sur le tick spacing")
+        compressed = ticks // self.tick_spacing - self._min
+        return compressed >> 6, (compressed & 63).astype(np.uint64)
+
+    def flip_ticks(self, ticks):
+        """Inverse l'état des ticks (initialisé <-> non initialisé)"""
+        word, bit = self._position(np.ravel(ticks))
+        np.bitwise_xor.at(self.words, word, np.left_shift(np.uint64(1), bit))
+
+    def is_initialized(self, ticks):
+        word, bit = self._position(ticks)
+        return (np.right_shift(self.words[word], bit) & np.uint64(1)).astype(bool)
+
+    def _ticks_in_words(self, w0, w1):
+        """Ticks initialisés des mots [w0, w1), triés"""
+        chunk = self.words[w0:w1]
+        nz = np.flatnonzero(chunk)
+        if nz.size == 0:
+            return np.empty(0, dtype=np.int64)
+        bits = np.unpackbits(chunk[nz].view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+        rows, cols = np.nonzero(bits)
+        compressed = (w0 + nz[rows]) * 64 + cols + self._min
+        return compressed.astype(np.int64) * self.tick_spacing
+
+    def initialized_between(self, tick_a, tick_b):
+        """Ticks initialisés dans [min(a, b), max(a, b)], triés"""
+        lo, hi = sorted((int(tick_a), int(tick_b)))
+        lo = max(lo, self._min * self.tick_spacing)
+        hi = min(hi, MAX_TICK)
+        w0 = (lo // self.tick_spacing - self._min) >> 6
+        w1 = ((hi // self.tick_spacing - self._min) >> 6) + 1
+        ticks = self._ticks_in_words(w0, w1)
+        return ticks[(ticks >= lo) & (ticks <= hi)]
+
+    def ticks_crossed(self, tick_from, tick_to):
+        """
+        Ticks traversés quand le tick courant passe de tick_from à tick_to, dans
+        l'ordre de traversée (convention Uniswap : en montant on traverse les
+        ticks de ]from, to], en descendant ceux de ]to, from]).
+        """
+        if tick_to >= tick_from:
+            return self.initialized_between(tick_from + 1, tick_to)
+        return self.initialized_between(tick_to + 1, tick_from)[::-1]
+
+    def next_initialized_tick(self, tick, lte):
+        """Prochain tick initialisé (<= tick si lte, > tick sinon), None s'il n'y en a pas"""
+        if lte:
+            ticks = self.initialized_between(MIN_TICK, tick)
+            return int(ticks[-1]) if ticks.size else None
+        ticks = self.initialized_between(tick + 1, MAX_TICK)
+        return int(ticks[0]) if ticks.size else None
@@ -0,0 +1,23 @@
+import numpy as np
+
+
+# --- Volatilité (écart-type des rendements) ---
+def compute_volatility(prices):
+    if len(prices) < 2:
+        return 0.0
+    prices = np.array(prices)
+    returns = np.diff(prices) / prices[:-1]
+    returns = returns[~np.isnan(returns)]
+    return float(np.std(returns))
+
+def compute_pair_volatility(pricesA, pricesB):
+    min_len = min(len(pricesA), len(pricesB))
+    pricesA, pricesB = pricesA[:min_len], pricesB[:min_len]
+    mask = (pricesA > 1e-8) & (pricesB > 1e-8)
+    pricesA, pricesB = pricesA[mask], pricesB[mask]
+    if len(pricesA) < 2:
+        return 0.0
+    pair_prices = pricesA / pricesB
+    returns = np.diff(pair_prices) / pair_prices[:-1]
+    returns = returns[~np.isnan(returns)]
+    return float(np.std(returns)) if len(returns) > 0 else 0.0
@@ -0,0 +1,129 @@
+import os
+import time
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+import profiling
+from http_cache import DiskCache
+from lpcore.store import RESOLUTIONS, append_history, last_timestamp
+
+# Base de l'API : surchargée par LP_COINGECKO_API pour rejouer des réponses
+# enregistrées (voir replay_server.py)
+COINGECKO_API = os.environ.get("LP_COINGECKO_API", "https://api.coingecko.com/api/v3").rstrip("/")
+
+# Profondeur du premier téléchargement et taille max d'une requête /range
+# (CoinGecko renvoie de l'horaire jusqu'à 90 jours, du journalier au-delà)
+HISTORY_DAYS = {"hourly": 90, "daily": 365}
+MAX_SPAN_DAYS = {"hourly": 90, "daily": 365}
+
+DAY_MS = 86_400_000
+
+# (connexion, lecture) en secondes : une API lente ne bloque jamais la page longtemps
+TIMEOUT = (3.05, 5)
+
+# Cache disque : prix frais 60 s puis servis 10 min de plus pendant le
+# rafraîchissement ; une plage historique close ne change plus
+PRICE_TTL = 60
+PRICE_STALE = 600
+RANGE_TTL = 86_400
+
+# Session partagée : connexions HTTPS réutilisées entre appels et entre sessions
+_session = requests.Session()
+_session.headers.update({"Accept": "application/json"})
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+if profiling.ENABLED:
+    _session.hooks["response"].append(profiling.http_hook)
+
+# Cache HTTP partagé par toutes les sessions et tous les processus
+_cache = DiskCache(_session)
+
+
+def _parse_prices(data, ids):
+    return {i: float(data[i]["usd"]) for i in ids if "usd" in data.get(i, {})}
+
+def fetch_prices_usd(ids, timeout=TIMEOUT):
+    """Prix USD de tous les ids CoinGecko en un seul appel simple/price (sans cache)"""
+    res = _session.get(
+        f"{COINGECKO_API}/simple/price",
+        params={"ids": ",".join(sorted(ids)), "vs_currencies": "usd"},
+        timeout=timeout
+    )
+    res.raise_for_status()
+    return _parse_prices(res.json(), ids)
+
+def get_prices_usd(ids, ttl=PRICE_TTL, stale=PRICE_STALE):
+    """
+    Prix USD via le cache disque partagé (tous les ids en une requête).
+    Au-delà de ttl, les prix sont encore servis pendant stale secondes et
+    rafraîchis en arrière-plan. En cas d'échec, les derniers prix connus sont
+    renvoyés et l'API n'est pas rappelée avant la fin du ttl : {} si aucun
+    prix n'a encore été obtenu.
+    """
+    ids = sorted(set(ids))
+    try:
+        data = _cache.get_json(
+            f"{COINGECKO_API}/simple/price",
+            {"ids": ",".join(ids), "vs_currencies": "usd"},
+            ttl=ttl,
+            stale=stale,
+            timeout=TIMEOUT
+        )
+    except (requests.RequestException, ValueError):
+        return {}
+    return _parse_prices(data, ids)
+
+def fetch_market_chart_range(asset_id, start_ms, end_ms, timeout=TIMEOUT, ttl=RANGE_TTL):
+    """
+    Points (timestamp ms, prix USD) de CoinGecko entre deux dates, via le cache
+    disque : des sessions qui synchronisent la même plage ne font qu'un appel.
+    """
+    data = _cache.get_json(
+        f"{COINGECKO_API}/coins/{asset_id}/market_chart/range",
+        {"vs_currency": "usd", "from": start_ms // 1000, "to": end_ms // 1000},
+        ttl=ttl,
+        stale=0,
+        timeout=timeout
+    )
+    data = np.asarray(data.get("prices", []), dtype=float).reshape(-1, 2)
+    return data[:, 0].astype(np.int64), data[:, 1]
+
+def to_candles(ts, prices, step, now_ms):
+    """Prix de clôture de chaque bougie complète (dernier point de la bougie)"""
+    order = np.argsort(ts, kind="stable")
+    ts, prices = ts[order], prices[order]
+    bucket = ts // step * step
+    complete = bucket < now_ms // step * step
+    bucket, prices = bucket[complete], prices[complete]
+    if len(bucket) == 0:
+        return bucket, prices
+    last = np.r_[bucket[1:] != bucket[:-1], True]
+    return bucket[last], prices[last]
+
+def refresh_history(asset_id, resolution="daily", root=None):
+    """
+    Met à jour l'historique local : seules les bougies postérieures au dernier
+    timestamp stocké sont téléchargées. Renvoie le nombre de bougies ajoutées.
+    Les erreurs réseau sont propagées, l'historique déjà stocké reste intact.
+    """
+    if resolution not in HISTORY_DAYS:
+        raise ValueError(f"résolution non disponible sur CoinGecko : {resolution}")
+
+    step = RESOLUTIONS[resolution]
+    now = int(time.time() * 1000)
+    # Plages calées sur les bougies : mêmes paramètres (donc même entrée de
+    # cache) pour tous les appels pendant une bougie
+    closed = now // step * step
+    last = last_timestamp(asset_id, resolution, root)
+    start = last + step if last is not None else closed - HISTORY_DAYS[resolution] * DAY_MS
+
+    added = 0
+    while start < closed:
+        end = min(start + MAX_SPAN_DAYS[resolution] * DAY_MS, closed)
+        ts, prices = fetch_market_chart_range(asset_id, start, end)
+        ts, prices = to_candles(ts, prices, step, now)
+        added += append_history(asset_id, resolution, ts, prices, root)
+        start = end
+    return added
@@ -0,0 +1,149 @@
+"""
+Instrumentation optionnelle : temps par section du script, temps des appels
+HTTP sortants et compteurs (hits / misses de cache).
+
+Activée par LP_PROFILE=1 ; sans elle, chaque point de mesure ne coûte qu'un test.
+Chaque événement est ajouté à un fichier JSON lines (LP_METRICS_FILE) et gardé
+dans un tampon mémoire pour le panneau de diagnostic de l'app (?diag=1). Les
+compteurs y sont écrits une fois par exécution du script (flush_counters).
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from urllib.parse import urlparse
+
+import numpy as np
+
+ENABLED = os.environ.get("LP_PROFILE", "").lower() in ("1", "true", "yes")
+METRICS_FILE = os.environ.get(
+    "LP_METRICS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics", "metrics.jsonl")
+)
+
+_lock = threading.Lock()
+_events = deque(maxlen=5000)
+_counters = defaultdict(int)
+_flushed = defaultdict(int)
+
+
+def _emit(event):
+    event["ts"] = time.time()
+    event["pid"] = os.getpid()
+    line = json.dumps(event)
+    with _lock:
+        _events.append(event)
+        os.makedirs(os.path.dirname(METRICS_FILE), exist_ok=True)
+        with open(METRICS_FILE, "a") as f:
+            f.write(line + "\n")
+
+
+# --- Points de mesure ---
+@contextmanager
+def _timer(name):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        _emit({"kind": "section", "name": name, "seconds": time.perf_counter() - t})
+
+def section(name):
+    """Chronomètre un bloc : with section("il.plot"): ..."""
+    return _timer(name) if ENABLED else nullcontext()
+
+def record(name, seconds):
+    """Durée mesurée ailleurs (ex. exécution complète du script)"""
+    if ENABLED:
+        _emit({"kind": "section", "name": name, "seconds": seconds})
+
+def profiled(name):
+    """Décorateur : chronomètre chaque appel de la fonction (sections de page, fragments)"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with section(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, n=1):
+    if ENABLED:
+        with _lock:
+            _counters[name] += n
+
+def cache_calls(name):
+    """
+    Décorateur posé au-dessus de st.cache_data / st.cache_resource : compte les
+    appels (st_cache.call.<name>), la fonction compte ses misses
+    (st_cache.miss.<name>) ; hits = appels - misses.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            count(f"st_cache.call.{name}")
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def flush_counters():
+    """Écrit dans le fichier les compteurs incrémentés depuis le dernier appel (un événement par compteur)"""
+    if not ENABLED:
+        return
+    with _lock:
+        delta = {k: v - _flushed[k] for k, v in _counters.items() if v != _flushed[k]}
+        _flushed.update(_counters)
+    for name, n in sorted(delta.items()):
+        _emit({"kind": "counter", "name": name, "count": n})
+
+def http_hook(response, *args, **kwargs):
+    """Hook requests : durée (jusqu'aux en-têtes), statut et taille de chaque réponse"""
+    if ENABLED:
+        url = urlparse(response.url)
+        _emit({
+            "kind": "http",
+            "name": f"{url.netloc}{url.path}",
+            "status": response.status_code,
+            "seconds": response.elapsed.total_seconds(),
+            "bytes": len(response.content)
+        })
+    return response
+
+
+# --- Lecture ---
+def counters():
+    with _lock:
+        return dict(_counters)
+
+def cache_hit_rates():
+    """Par cache Streamlit : appels, misses et taux de hit depuis le démarrage du processus"""
+    c = counters()
+    rows = []
+    for key in sorted(c):
+        if key.startswith("st_cache.call."):
+            name = key[len("st_cache.call."):]
+            calls, misses = c[key], c.get(f"st_cache.miss.{name}", 0)
+            rows.append({"name": name, "calls": calls, "misses": misses, "hit_rate": 1 - misses / calls})
+    return rows
+
+def summary(kind=None):
+    """Par nom : nombre d'appels, p50, p95, max et total (s) sur le tampon mémoire"""
+    with _lock:
+        events = [e for e in _events if kind is None or e["kind"] == kind]
+    by_name = defaultdict(list)
+    for e in events:
+        by_name[e["name"]].append(e["seconds"])
+    rows = []
+    for name, secs in sorted(by_name.items()):
+        s = np.asarray(secs)
+        rows.append({
+            "name": name,
+            "calls": s.size,
+            "p50_ms": float(np.percentile(s, 50)) * 1e3,
+            "p95_ms": float(np.percentile(s, 95)) * 1e3,
+            "max_ms": float(s.max()) * 1e3,
+            "total_s": float(s.sum())
+        })
+    return sorted(rows, key=lambda r: r["total_s"], reverse=True)
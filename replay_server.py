@@ -0,0 +1,248 @@
+"""
+Remplaçant local de l'API CoinGecko : rejoue des réponses enregistrées, avec
+latence et erreurs injectées, pour tester l'app hors ligne et de façon déterministe.
+
+    python replay_server.py record --out recordings --days 90             # depuis l'API réelle
+    python replay_server.py record --out recordings --from-store --resolution hourly
+    python replay_server.py serve --dir recordings --port 8765 --latency 80 --jitter 40 --error-rate 0.05
+    LP_COINGECKO_API=http://127.0.0.1:8765/api/v3 streamlit run backtestengine.py
+
+Un enregistrement = un fichier <asset_id>.json au format market_chart
+({"prices": [[timestamp ms, prix], ...]}). Le serveur répond à :
+    /api/v3/simple/price?ids=...&vs_currencies=usd    dernier prix enregistré
+    /api/v3/coins/<id>/market_chart/range?from=&to=   points de la plage (journaliers au-delà de 90 j)
+    /__stats                                          compteurs de requêtes et d'erreurs injectées
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from lpcore.catalog import COINGECKO_IDS
+
+DAY_MS = 86_400_000
+HOURLY_MAX_DAYS = 90
+
+
+# --- Enregistrements ---
+def load_recordings(directory, shift_to_now=False):
+    """{asset_id: (timestamps ms, prix)} ; avec shift_to_now, le dernier point est daté de maintenant"""
+    recordings = {}
+    now = int(time.time() * 1000)
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, name)) as f:
+            data = np.asarray(json.load(f).get("prices", []), dtype=float).reshape(-1, 2)
+        order = np.argsort(data[:, 0], kind="stable")
+        ts, prices = data[order, 0].astype(np.int64), data[order, 1]
+        if shift_to_now and len(ts):
+            ts = ts + (now - ts[-1]) // DAY_MS * DAY_MS
+        recordings[name[:-5]] = (ts, prices)
+    return recordings
+
+def _write_recording(directory, asset_id, ts, prices):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{asset_id}.json"), "w") as f:
+        json.dump({"prices": np.column_stack([ts, prices]).tolist()}, f)
+
+def record(args):
+    ids = args.ids or list(COINGECKO_IDS.values())
+    if args.from_store:
+        from lpcore.store import load_history
+
+        for asset_id in ids:
+            ts, prices = load_history(asset_id, args.resolution, args.store)
+            _write_recording(args.out, asset_id, np.asarray(ts), np.asarray(prices))
+            print(f"{asset_id:25s} {len(ts):>8,} points (store)")
+        return
+
+    import requests
+
+    api = os.environ.get("LP_COINGECKO_API", "https://api.coingecko.com/api/v3").rstrip("/")
+    end = int(time.time() * 1000)
+    for asset_id in ids:
+        chunks = []
+        # Fenêtres de 90 j : CoinGecko garde alors la granularité horaire
+        start = end - args.days * DAY_MS
+        while start < end:
+            stop = min(start + HOURLY_MAX_DAYS * DAY_MS, end)
+            res = requests.get(
+                f"{api}/coins/{asset_id}/market_chart/range",
+                params={"vs_currency": "usd", "from": start // 1000, "to": stop // 1000},
+                timeout=(3.05, 30)
+            )
+            res.raise_for_status()
+            chunks.extend(res.json().get("prices", []))
+            start = stop
+            time.sleep(args.pause)
+        data = np.asarray(chunks, dtype=float).reshape(-1, 2)
+        ts, idx = np.unique(data[:, 0].astype(np.int64), return_index=True)
+        _write_recording(args.out, asset_id, ts, data[idx, 1])
+        print(f"{asset_id:25s} {len(ts):>8,} points")
+
+
+# --- Serveur ---
+class ReplayState:
+    """Enregistrements, injection de fautes (graine fixe) et compteurs partagés par les threads"""
+
+    def __init__(self, recordings, latency=0.0, jitter=0.0, error_rate=0.0, error_status=429,
+                 hang_rate=0.0, hang=10.0, seed=0):
+        self.recordings = recordings
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self.hang = hang
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "hangs": 0, "by_path": {}}
+
+    def draw(self, path):
+        """Tirage de la requête : (délai en s, statut d'erreur ou None)"""
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["by_path"][path] = self.stats["by_path"].get(path, 0) + 1
+            delay = max(self.latency + self.jitter * self.rng.standard_normal(), 0.0)
+            u = self.rng.random()
+            if u < self.hang_rate:
+                self.stats["hangs"] += 1
+                return self.hang, None
+            if u < self.hang_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return delay, self.error_status
+            return delay, None
+
+    def simple_price(self, query):
+        ids = query.get("ids", [""])[0].split(",")
+        return {
+            i: {"usd": float(self.recordings[i][1][-1])}
+            for i in ids if i in self.recordings and len(self.recordings[i][1])
+        }
+
+    def market_chart_range(self, asset_id, query):
+        if asset_id not in self.recordings:
+            return None
+        ts, prices = self.recordings[asset_id]
+        start = int(float(query["from"][0]) * 1000)
+        end = int(float(query["to"][0]) * 1000)
+        lo = np.searchsorted(ts, start, side="left")
+        hi = np.searchsorted(ts, end, side="right")
+        ts, prices = ts[lo:hi], prices[lo:hi]
+        if end - start > HOURLY_MAX_DAYS * DAY_MS and len(ts):
+            # Comme CoinGecko : un point par jour au-delà de 90 jours
+            day = ts // DAY_MS
+            last = np.r_[day[1:] != day[:-1], True]
+            ts, prices = ts[last], prices[last]
+        return {"prices": np.column_stack([ts, prices]).tolist()}
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            parts = url.path.strip("/").split("/")
+
+            if url.path == "/__stats":
+                with state.lock:
+                    return self._send(200, state.stats)
+
+            route = "/".join(parts[2:3] + parts[4:]) if parts[2:3] == ["coins"] else "/".join(parts[2:])
+            delay, error = state.draw(route)
+            time.sleep(delay)
+            if error is not None:
+                return self._send(error, {"status": {"error_code": error, "error_message": "injected"}},
+                                  {"Retry-After": "60"} if error == 429 else None)
+
+            if parts[:3] == ["api", "v3", "simple"] and parts[3:] == ["price"]:
+                return self._send(200, state.simple_price(query))
+            if parts[:3] == ["api", "v3", "coins"] and parts[4:] == ["market_chart", "range"]:
+                body = state.market_chart_range(parts[3], query)
+                if body is None:
+                    return self._send(404, {"error": "coin not found"})
+                return self._send(200, body)
+            return self._send(404, {"error": "not found"})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def start_server(state, host="127.0.0.1", port=0):
+    """Démarre le serveur dans un thread ; renvoie (serveur, base de l'API)"""
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/api/v3"
+
+def serve(args):
+    state = ReplayState(
+        load_recordings(args.dir, args.shift_to_now),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        hang_rate=args.hang_rate,
+        hang=args.hang,
+        seed=args.seed
+    )
+    server, api = start_server(state, args.host, args.port)
+    print(f"{len(state.recordings)} actifs rejoués sur {api}")
+    print(f"LP_COINGECKO_API={api}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remplaçant local de l'API CoinGecko")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_rec = sub.add_parser("record", help="enregistrer des historiques")
+    p_rec.add_argument("--out", default="recordings")
+    p_rec.add_argument("--ids", nargs="+", help="ids CoinGecko (tous les tokens de l'app par défaut)")
+    p_rec.add_argument("--days", type=int, default=HOURLY_MAX_DAYS)
+    p_rec.add_argument("--pause", type=float, default=2.0, help="pause entre appels (limite de débit)")
+    p_rec.add_argument("--from-store", action="store_true", help="exporter le store local au lieu de l'API")
+    p_rec.add_argument("--resolution", default="hourly")
+    p_rec.add_argument("--store")
+    p_rec.set_defaults(func=record)
+
+    p_srv = sub.add_parser("serve", help="rejouer les enregistrements")
+    p_srv.add_argument("--dir", default="recordings")
+    p_srv.add_argument("--host", default="127.0.0.1")
+    p_srv.add_argument("--port", type=int, default=8765)
+    p_srv.add_argument("--latency", type=float, default=0.0, help="latence moyenne (ms)")
+    p_srv.add_argument("--jitter", type=float, default=0.0, help="écart-type de la latence (ms)")
+    p_srv.add_argument("--error-rate", type=float, default=0.0)
+    p_srv.add_argument("--error-status", type=int, default=429)
+    p_srv.add_argument("--hang-rate", type=float, default=0.0, help="part de requêtes sans réponse avant --hang s")
+    p_srv.add_argument("--hang", type=float, default=10.0)
+    p_srv.add_argument("--shift-to-now", action="store_true", help="décaler les dates pour finir aujourd'hui")
+    p_srv.add_argument("--seed", type=int, default=0)
+    p_srv.set_defaults(func=serve)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Racine du dépôt importable (lpcore, modules de l'app), comme dans benchmarks/bench.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
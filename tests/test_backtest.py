@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from lpcore.backtest import batch_backtest, run_backtest
+from lpcore.passage import PassageIndex
+
+COSTS = {
+    "none": None,
+    "fee_tier": {"fee_tier": 3000},
+    "gas": {"fee_tier": 500, "gas": 0.3},
+    "pool_liquidity": {"fee_tier": 500, "pool_liquidity": lambda P: 5e3 / np.sqrt(P)},
+}
+
+
+def _scenarios(seed, k=8):
+    """Historique aléatoire et k scénarios (triggers parfois hors du range, buffers > 1)"""
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(200, 3000))
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, rng.uniform(0.002, 0.02), n)))
+    params = {
+        "range_pct": rng.uniform(1, 20, k),
+        "range_percent": rng.uniform(1, 20, k),
+        "trig_low": rng.uniform(-10, 45, k),
+        "trig_high": rng.uniform(55, 110, k),
+        "buffer": rng.integers(1, 5, k),
+    }
+    return prices, params
+
+def _single(params, i):
+    return {key: (int(v[i]) if key == "buffer" else float(v[i])) for key, v in params.items()}
+
+def _assert_same(ref, res, i=None):
+    pick = (lambda v: v) if i is None else (lambda v: v[i])
+    assert ref["n_rebalances"] == pick(res["n_rebalances"])
+    assert ref["time_in_range"] == pytest.approx(pick(res["time_in_range"]), abs=1e-12)
+    assert ref["final_value"] == pytest.approx(pick(res["final_value"]), rel=1e-9)
+    assert ref["total_cost"] == pytest.approx(pick(res["total_cost"]), rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("costs", list(COSTS))
+@pytest.mark.parametrize("tick_spacing", [None, 60])
+@pytest.mark.parametrize("seed", range(3))
+def test_batch_matches_run_backtest(seed, tick_spacing, costs):
+    prices, params = _scenarios(seed)
+    decimals = (18, 6) if tick_spacing else (0, 0)
+    res = batch_backtest(prices, **params, tick_spacing=tick_spacing, decimals=decimals, costs=COSTS[costs])
+    for i in range(len(params["range_pct"])):
+        ref = run_backtest(prices, ratio=(0.5, 0.5), tick_spacing=tick_spacing, decimals=decimals,
+                           costs=COSTS[costs], **_single(params, i))
+        _assert_same(ref, res, i)
+
+@pytest.mark.parametrize("costs", list(COSTS))
+@pytest.mark.parametrize("seed", range(3))
+def test_passage_index_matches_scan(seed, costs):
+    prices, params = _scenarios(seed)
+    index = PassageIndex(prices)
+    for i in range(len(params["range_pct"])):
+        kwargs = dict(ratio=(0.5, 0.5), costs=COSTS[costs], **_single(params, i))
+        ref = run_backtest(prices, **kwargs)
+        res = run_backtest(prices, index=index, **kwargs)
+        _assert_same(ref, res)
+        assert np.array_equal(ref["rebalance_idx"], res["rebalance_idx"])
+        assert np.array_equal(ref["value"], res["value"])
+
+def test_batch_chunking_does_not_change_results():
+    prices, params = _scenarios(7, k=20)
+    full = batch_backtest(prices, **params)
+    small = batch_backtest(prices, **params, max_cells=500)
+    for key in ("n_rebalances", "time_in_range", "final_value"):
+        assert np.allclose(full[key], small[key], rtol=1e-12, atol=0)
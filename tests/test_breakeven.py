@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from lpcore.breakeven import break_even_price, break_even_surface, lp_liquidity
+from lpcore.clmm import tokens_from_L
+from lpcore.il import il_ratio
+
+PA0, PB0, CAPITAL = 3000.0, 1.0, 1000.0
+
+
+def _position(low, high):
+    """Quantités d'une LP de CAPITAL $ déposée à PA0 / PB0 sur [low, high] (prix A/B)"""
+    P0 = PA0 / PB0
+    L = lp_liquidity(CAPITAL / 2 / PA0, CAPITAL / 2 / PB0, PA0, PB0, low, high)
+    return tokens_from_L(L, P0, low, high)
+
+
+@pytest.mark.parametrize("low, high", [(2900.0, 3100.0), (2000.0, 4500.0)])
+def test_break_even_fee_equals_il_in_range(low, high):
+    qty_a, qty_b = _position(low, high)
+    price_a = np.linspace(low, high, 41)          # prix du token A dans le range (B à 1 $)
+    price_b = np.array([1.0])
+    lp = break_even_surface(price_a, price_b, qty_a, qty_b, PA0, PB0, CAPITAL, low=low, high=high)[0, 0]
+    hodl = break_even_surface(price_a, price_b, qty_a, qty_b, PA0, PB0, CAPITAL)[0, 0]
+
+    # Fee de break-even face au HODL = IL (valeur HODL x il_ratio au prix normalisé)
+    fee = hodl - lp
+    hodl_value = qty_a * price_a + qty_b * price_b
+    il = il_ratio(price_a / PA0, low / PA0, high / PA0)
+    assert np.allclose(fee, -hodl_value * il, rtol=1e-9, atol=1e-9)
+    assert np.all(fee >= -1e-9)
+    assert fee[np.argmin(np.abs(price_a - PA0))] == pytest.approx(0.0, abs=1e-6)
+
+    # Ces fees rendent la LP équivalente au HODL en chaque point de la grille
+    paid = break_even_surface(price_a, price_b, qty_a, qty_b, PA0, PB0, CAPITAL, fees=fee, low=low, high=high)
+    assert np.allclose(paid[np.arange(price_a.size), 0, np.arange(price_a.size)], hodl, rtol=1e-12, atol=1e-9)
+
+def test_quantities_frozen_out_of_range():
+    low, high = 2900.0, 3100.0
+    qty_a, qty_b = _position(low, high)
+    L = lp_liquidity(qty_a, qty_b, PA0, PB0, low, high)
+    below, above = tokens_from_L(L, low, low, high), tokens_from_L(L, high, low, high)
+    price_a, price_b = np.array([1000.0, 2000.0, 4000.0, 9000.0]), np.array([0.5, 1.0, 2.0])
+    pnl = break_even_surface(price_a, price_b, qty_a, qty_b, PA0, PB0, CAPITAL, low=low, high=high)[0]
+    for i, pb in enumerate(price_b):
+        for j, pa in enumerate(price_a):
+            x, y = below if pa / pb < low else above if pa / pb > high else (np.nan, np.nan)
+            if np.isfinite(x):
+                assert pnl[i, j] == pytest.approx(x * pa + y * pb - CAPITAL, rel=1e-12)
+
+def test_positions_broadcast():
+    price_a, price_b = np.linspace(2000, 4000, 5), np.linspace(0.9, 1.1, 3)
+    lows, highs = np.array([2500.0, np.nan]), np.array([3500.0, np.nan])
+    both = break_even_surface(price_a, price_b, 0.2, 400.0, PA0, PB0, CAPITAL, fees=[5.0, 0.0], low=lows, high=highs)
+    assert both.shape == (2, 3, 5)
+    one = break_even_surface(price_a, price_b, 0.2, 400.0, PA0, PB0, CAPITAL, fees=5.0, low=2500.0, high=3500.0)
+    assert np.array_equal(both[0], one[0])
+    assert np.allclose(both[1], 0.2 * price_a + 400.0 * price_b[:, None] - CAPITAL)
+
+def test_break_even_price():
+    prices = np.linspace(0.0, 10.0, 11)
+    assert break_even_price(prices, 2 * prices - 7) == pytest.approx(3.5)
+    assert break_even_price(prices, prices + 1) is None
+    assert break_even_price(prices, -prices - 1) is None
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from lpcore.calibration import (
+    calibrate_pair, calibrate_range, load_calibration, required_widths, rolling_volatility,
+    save_calibration, suggest_range
+)
+
+DAY = 86_400_000
+
+
+def _prices(n=800, seed=0):
+    rng = np.random.default_rng(seed)
+    # Volatilité qui change de régime pour remplir plusieurs niveaux
+    vol = np.repeat([0.01, 0.03, 0.06, 0.12], n // 4)
+    return 100 * np.exp(np.cumsum(rng.normal(0, vol)))
+
+
+def test_required_widths_closed_form():
+    prices = np.array([100.0, 90.0, 110.0, 100.0, 130.0])
+    need = required_widths(prices, np.array([0, 1]), 3, ratio=(0.5, 0.5))
+    # Départ 100 : -10 %, +10 %, 0 % ; départ 90 : +22.2 %, +11.1 %, +44.4 %
+    assert np.allclose(need[0], [20.0, 20.0, 0.0])
+    assert np.allclose(need[1], [200 * 20 / 90, 200 * 10 / 90, 200 * 40 / 90])
+
+def test_required_widths_infinite_for_one_sided_ratio():
+    prices = np.array([100.0, 90.0, 110.0, 100.0, 130.0])
+    need = required_widths(prices, np.array([0, 1]), 3, ratio=(1.0, 0.0))
+    # Pas de côté haut : toute hausse est hors range quelle que soit la largeur
+    assert np.isinf(need[0, 1]) and np.isinf(need[1]).all()
+    assert need[0, 0] == pytest.approx(10.0) and need[0, 2] == 0.0
+
+def test_calibrated_widths_monotone_in_target():
+    prices = _prices()
+    calibrations = [calibrate_range(prices, target=t) for t in (0.5, 0.7, 0.8, 0.9, 0.99)]
+    widths = np.array([[np.nan if w is None else w for w in c["widths"]] for c in calibrations])
+    assert np.isfinite(widths).sum(axis=1).min() >= 2
+    assert np.all(np.diff(widths, axis=0)[np.isfinite(np.diff(widths, axis=0))] >= 0)
+    ks = [c["k"] for c in calibrations]
+    assert np.all(np.diff(ks) >= 0)
+    # Temps dans le range atteint par la largeur de chaque niveau calibré
+    cal = calibrations[2]
+    starts = np.arange(30, len(prices) - 30)
+    need = required_widths(prices, starts, 30)
+    level = np.searchsorted(cal["levels"], rolling_volatility(prices, 30)[starts], side="right")
+    for i, w in enumerate(cal["widths"]):
+        if w is not None:
+            assert np.mean(need[level == i] <= w) >= 0.8
+
+def test_one_sided_ratio_on_rising_prices_is_not_calibrated():
+    prices = 100 * np.exp(np.linspace(0, 1, 300))
+    cal = calibrate_range(prices, ratio=(1.0, 0.0))
+    assert all(w is None for w in cal["widths"])
+    assert cal["k"] is None
+    assert suggest_range(cal, 0.05) is None
+
+def test_rolling_volatility_matches_np_std():
+    prices = _prices(200)
+    r = np.diff(np.log(prices))
+    vol = rolling_volatility(prices, 30)
+    assert np.isnan(vol[:30]).all()
+    assert np.allclose(vol[30:], [np.std(r[i - 30:i]) for i in range(30, 200)], rtol=1e-8)
+
+def test_calibration_cache_round_trip(tmp_path):
+    prices = _prices(400)
+    ts = np.arange(len(prices)) * DAY
+    cal = calibrate_pair(ts, prices, ratios=[(0.5, 0.5), (0.2, 0.8)])
+    assert set(cal["ratios"]) == {"0.5/0.5", "0.2/0.8"}
+    save_calibration("WETH/USDC", cal, root=str(tmp_path))
+    assert load_calibration("WETH/USDC", cal["date"], root=str(tmp_path)) == cal
+    assert load_calibration("WETH/USDC", "1999-01-01", root=str(tmp_path)) is None
+    with pytest.raises(ValueError):
+        calibrate_pair(ts[:10], prices[:10])
@@ -0,0 +1,31 @@
+import numpy as np
+
+from lpcore.covariance import align_histories, covariance_matrix
+
+
+def test_align_keeps_only_common_timestamps():
+    histories = {
+        "A": (np.array([1, 2, 3, 5, 8, 9]), np.array([10.0, 20.0, 30.0, 50.0, 80.0, 90.0])),
+        "B": (np.array([0, 2, 3, 4, 8, 9, 12]), np.arange(7.0)),
+        "C": (np.array([2, 3, 6, 8, 9]), np.array([-2.0, -3.0, -6.0, -8.0, -9.0])),
+        "short": (np.array([3]), np.array([1.0])),
+    }
+    names, ts, matrix = align_histories(histories)
+    assert names == ["A", "B", "C"]
+    assert np.array_equal(ts, [2, 3, 8, 9])
+    assert np.array_equal(matrix, [[20.0, 1.0, -2.0], [30.0, 2.0, -3.0], [80.0, 4.0, -8.0], [90.0, 5.0, -9.0]])
+
+def test_align_disjoint_and_empty():
+    names, ts, matrix = align_histories({"A": (np.array([1, 2]), np.ones(2)), "B": (np.array([3, 4]), np.ones(2))})
+    assert names == ["A", "B"] and ts.size == 0 and matrix.shape == (0, 2)
+    names, ts, matrix = align_histories({})
+    assert names == [] and ts.size == 0
+
+def test_covariance_matches_np_cov():
+    rng = np.random.default_rng(0)
+    ts = np.arange(300)
+    prices = np.exp(np.cumsum(rng.normal(0, 0.02, (300, 3)), axis=0))
+    res = covariance_matrix({k: (ts, prices[:, i]) for i, k in enumerate("XYZ")}, window=100)
+    returns = np.diff(np.log(prices[-101:]), axis=0)
+    assert np.allclose(res["cov"], np.cov(returns.T, bias=True))
+    assert np.allclose(res["corr"], np.corrcoef(returns.T))
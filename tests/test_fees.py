@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from lpcore.fees import accrue_fees
+from lpcore.liquidity import LiquidityIndex
+
+
+def _swaps(n=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "timestamp": 1.7e9 + np.cumsum(rng.exponential(30.0, n)),
+        "price": 3000 * np.exp(np.cumsum(rng.normal(0, 0.001, n))),
+        "volume": rng.lognormal(8, 1, n),
+        "fee_tier": rng.choice([500, 3000, 0.0005], n),
+        "liquidity": rng.uniform(1e5, 1e6, n),
+    }
+
+def _chunks(data, rows):
+    n = len(data["timestamp"])
+    return [{k: v[i:i + rows] for k, v in data.items()} for i in range(0, n, rows)]
+
+
+@pytest.mark.parametrize("source", ["column", "index", "constant"])
+def test_chunk_size_does_not_change_results(source):
+    data = _swaps()
+    pool_liquidity = None
+    if source != "column":
+        del data["liquidity"]
+        rng = np.random.default_rng(1)
+        lower = rng.uniform(2500, 3000, 200)
+        pool_liquidity = (LiquidityIndex(lower, lower + rng.uniform(50, 800, 200), rng.uniform(1e3, 1e5, 200))
+                          if source == "index" else 2e5)
+
+    run = lambda chunks: accrue_fees(chunks, 2900.0, 3100.0, 1e4, pool_liquidity)
+    ref = run([data])
+    for rows in (1, 7, 999, 5_000):
+        # Blocs vides intercalés : ignorés
+        chunks = _chunks(data, rows)
+        chunks.insert(1, {k: v[:0] for k, v in data.items()})
+        res = run(chunks)
+        assert res.keys() == ref.keys()
+        for key in ref:
+            assert res[key] == pytest.approx(ref[key], rel=1e-9), key
+
+def test_pool_liquidity_avg_is_time_weighted():
+    data = {
+        "timestamp": np.array([0.0, 10.0, 40.0]),
+        "price": np.array([1.0, 1.0, 1.0]),
+        "volume": np.ones(3),
+        "fee_tier": np.full(3, 3000),
+        "liquidity": np.array([100.0, 400.0, 9e9]),
+    }
+    res = accrue_fees(_chunks(data, 1), 0.5, 2.0, 1.0)
+    # 100 pendant 10 s puis 400 pendant 30 s ; la liquidité du dernier swap ne compte pas
+    assert res["pool_liquidity_avg"] == pytest.approx((100 * 10 + 400 * 30) / 40)
+    assert res["n_swaps"] == 3 and res["n_in_range"] == 3
@@ -0,0 +1,143 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+import requests
+
+import http_cache
+from http_cache import DiskCache
+
+URL = "https://api.example.test/simple/price"
+PARAMS = {"ids": "weth"}
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body
+        self.headers = headers or {}
+        self.elapsed = timedelta(milliseconds=5)
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    """Session requests factice : corps numérotés par appel, blocage optionnel sur gate"""
+
+    def __init__(self, gate=None, status=200, first=1):
+        self.calls = []
+        self.first = first
+        self.gate = gate
+        self.status = status
+        self.started = threading.Event()
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        with self._lock:
+            self.calls.append(dict(headers or {}))
+            n = self.first + len(self.calls) - 1
+        self.started.set()
+        if self.gate is not None:
+            assert self.gate.wait(5)
+        if self.status == 304:
+            return FakeResponse(304)
+        return FakeResponse(self.status, {"weth": {"usd": n}}, {"ETag": f'"v{n}"'})
+
+
+def _age(cache, seconds):
+    """Vieillit l'entrée en cache de seconds"""
+    entry = cache._read(URL, PARAMS)
+    cache._write(URL, PARAMS, {**entry, "fetched_at": entry["fetched_at"] - seconds})
+
+def _wait(predicate, timeout=5):
+    end = time.time() + timeout
+    while not predicate():
+        assert time.time() < end, "délai dépassé"
+        time.sleep(0.01)
+
+
+def test_fresh_entry_served_from_disk(tmp_path):
+    session = FakeSession()
+    cache = DiskCache(session, root=str(tmp_path))
+    assert cache.get_json(URL, PARAMS, ttl=60) == {"weth": {"usd": 1}}
+    assert cache.get_json(URL, PARAMS, ttl=60) == {"weth": {"usd": 1}}
+    # Nouvelle instance (autre processus) : même fichier
+    assert DiskCache(session, root=str(tmp_path)).get_json(URL, PARAMS, ttl=60) == {"weth": {"usd": 1}}
+    assert len(session.calls) == 1
+    assert cache.stats["miss"] == 1 and cache.stats["fresh"] == 1
+
+def test_stale_entry_served_while_refreshing(tmp_path):
+    cache = DiskCache(FakeSession(), root=str(tmp_path))
+    cache.get_json(URL, PARAMS, ttl=60, stale=600)
+    _age(cache, 120)
+
+    gate = threading.Event()
+    cache.session = session = FakeSession(gate=gate, first=2)
+    t = time.time()
+    # Servie tout de suite pendant que le rafraîchissement attend l'API
+    assert cache.get_json(URL, PARAMS, ttl=60, stale=600) == {"weth": {"usd": 1}}
+    assert time.time() - t < 1
+    assert session.started.wait(5)
+    # Un seul rafraîchissement en arrière-plan par entrée
+    assert cache.get_json(URL, PARAMS, ttl=60, stale=600) == {"weth": {"usd": 1}}
+    gate.set()
+    _wait(lambda: not cache._refreshing)
+
+    assert len(session.calls) == 1
+    assert session.calls[0]["If-None-Match"] == '"v1"'
+    assert cache.stats["stale"] == 2
+    # Entrée rafraîchie, de nouveau fraîche
+    assert cache.get_json(URL, PARAMS, ttl=60, stale=600) == {"weth": {"usd": 2}}
+    assert cache.stats["fresh"] == 1
+
+def test_expired_entry_revalidated_synchronously(tmp_path):
+    cache = DiskCache(FakeSession(), root=str(tmp_path))
+    cache.get_json(URL, PARAMS, ttl=60, stale=600)
+    _age(cache, 1000)
+
+    cache.session = session = FakeSession(status=304)
+    assert cache.get_json(URL, PARAMS, ttl=60, stale=600) == {"weth": {"usd": 1}}
+    assert session.calls[0]["If-None-Match"] == '"v1"'
+    assert cache.stats["revalidated"] == 1
+    # 304 : l'entrée est de nouveau fraîche
+    assert cache.get_json(URL, PARAMS, ttl=60, stale=600) == {"weth": {"usd": 1}}
+    assert len(session.calls) == 1
+
+@pytest.mark.skipif(http_cache.fcntl is None, reason="verrou fichier indisponible")
+def test_concurrent_misses_make_one_upstream_call(tmp_path):
+    gate = threading.Event()
+    session = FakeSession(gate=gate)
+    caches = [DiskCache(session, root=str(tmp_path)) for _ in range(2)]
+    results = [None, None]
+
+    def call(i):
+        results[i] = caches[i].get_json(URL, PARAMS, ttl=60)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(2)]
+    threads[0].start()
+    assert session.started.wait(5)
+    threads[1].start()
+    _wait(lambda: caches[1].stats["miss"] == 1)
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(session.calls) == 1
+    assert results[0] == results[1] == {"weth": {"usd": 1}}
+
+def test_failure_not_retried_before_ttl(tmp_path):
+    session = FakeSession(status=500)
+    cache = DiskCache(session, root=str(tmp_path))
+    with pytest.raises(requests.HTTPError):
+        cache.get_json(URL, PARAMS, ttl=60)
+    with pytest.raises(requests.ConnectionError):
+        cache.get_json(URL, PARAMS, ttl=60)
+    assert len(session.calls) == 1
+    assert cache.stats["errors"] == 1
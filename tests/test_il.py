@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from lpcore.clmm import V_HODL, V_LP, compute_L, normalize_L, tokens_from_L
+from lpcore.il import il_curve
+
+
+@pytest.mark.parametrize("P_lower, P_upper", [(2999.0, 3001.0), (2970.0, 3030.0), (2800.0, 3500.0), (300.0, 30000.0)])
+def test_il_curve_matches_position_values(P_lower, P_upper):
+    # Même calcul que la section IL : position normalisée, valeurs LP et HODL
+    P_deposit, v_deposit = 3000.0, 500.0
+    L_raw = compute_L(P_deposit, P_lower, P_upper, v_deposit)
+    x0_raw, y0_raw = tokens_from_L(L_raw, P_deposit, P_lower, P_upper)
+    L, x0, y0 = normalize_L(L_raw, x0_raw, y0_raw, P_deposit, v_deposit)
+    prices = np.linspace(P_lower * 0.8, P_upper * 1.3, 400)
+
+    expected = V_LP(prices, L, P_lower, P_upper) / V_HODL(prices, x0, y0) - 1
+    il = il_curve(prices / P_deposit, P_lower / P_deposit, P_upper / P_deposit)
+    assert np.allclose(il, expected, rtol=1e-12, atol=1e-12)
+
+def test_il_curve_scalar():
+    il = il_curve(1.0, 0.9, 1.1)
+    assert isinstance(il, float)
+    assert il == pytest.approx(0.0, abs=1e-15)
+    assert il_curve(1.05, 0.9, 1.1) < 0
@@ -0,0 +1,31 @@
+import numpy as np
+
+from lpcore.montecarlo import QUANTILES, monte_carlo_range
+
+
+def test_no_path_exits():
+    # Volatilité négligeable, range de ±50 % : aucune sortie sur l'horizon
+    mc = monte_carlo_range(100.0, 1e-4, 100, n_paths=200, n_steps=500, steps_per_day=100, seed=0)
+    assert mc["p_exit"] == 0.0
+    assert np.all(mc["time_to_exit"] == 500)
+    assert np.all(mc["n_rebalances"] == 0)
+    assert all(np.isnan(mc["exit_days_quantiles"][q]) for q in QUANTILES)
+
+def test_every_path_exits():
+    # Range de ±0.05 % et forte volatilité : toutes les trajectoires sortent
+    mc = monte_carlo_range(100.0, 1.0, 0.1, n_paths=200, n_steps=500, steps_per_day=100,
+                           max_cells=10_000, seed=0)
+    assert mc["p_exit"] == 1.0
+    assert np.all(mc["time_to_exit"] < 500)
+    assert np.all(mc["n_rebalances"] >= 1)
+    q = [mc["exit_days_quantiles"][k] for k in QUANTILES]
+    assert np.all(np.isfinite(q))
+    assert np.all(np.diff(q) >= 0)
+    assert 0 < q[0] and q[-1] < 5.0
+
+def test_seed_is_reproducible():
+    kwargs = dict(n_paths=300, n_steps=400, steps_per_day=100, seed=3)
+    a = monte_carlo_range(100.0, 0.5, 5, **kwargs)
+    b = monte_carlo_range(100.0, 0.5, 5, **kwargs)
+    assert np.array_equal(a["time_to_exit"], b["time_to_exit"])
+    assert np.array_equal(a["vs_hodl"], b["vs_hodl"])
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+from lpcore.backtest import _first_breach
+from lpcore.passage import PassageIndex
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 17, 1000, 4097])
+def test_first_exit_matches_scan(n):
+    rng = np.random.default_rng(n)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = PassageIndex(prices)
+    for _ in range(300):
+        start = int(rng.integers(0, n))
+        half = rng.uniform(0, 0.2)
+        low, high = prices[start] * (1 - half), prices[start] * (1 + rng.uniform(0, 0.2))
+        buffer = int(rng.choice([1, 1, 2, 3, 7]))
+        assert index.first_exit(start, low, high, buffer) == _first_breach(prices, start, low, high, buffer)
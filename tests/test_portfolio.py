@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from lpcore.backtest import run_backtest
+from lpcore.covariance import align_histories
+from lpcore.portfolio import portfolio_backtest
+
+DAY = 86_400_000
+
+
+def _history(days, usd, seed):
+    rng = np.random.default_rng(seed)
+    ts = np.asarray(days, dtype=np.int64) * DAY
+    return ts, usd * np.exp(np.cumsum(rng.normal(0, 0.03, len(ts))))
+
+def _histories():
+    # Trous différents par token : l'axe commun est leur intersection
+    days = np.arange(400)
+    return {
+        "WETH": _history(np.delete(days, [5, 50, 51, 300]), 3000.0, 0),
+        "USDC": _history(np.delete(days, [7, 200]), 1.0, 1),
+        "WBTC": _history(np.delete(days, [8, 9, 399]), 60000.0, 2),
+    }
+
+
+@pytest.mark.parametrize("costs", [None, {"fee_tier": 3000, "gas": 0.5}])
+def test_single_pair_matches_run_backtest(costs):
+    histories = _histories()
+    position = {"pair": "WETH/USDC", "capital": 2000.0, "range_pct": 8, "range_percent": 12,
+                "trig_low": 10, "trig_high": 85, "ratio": (0.4, 0.6)}
+    res = portfolio_backtest(histories, [position], costs=costs)
+
+    names, ts, usd = align_histories({k: histories[k] for k in ("USDC", "WETH")})
+    usd_b = usd[:, names.index("USDC")]
+    prices = usd[:, names.index("WETH")] / usd_b
+    ref = run_backtest(prices, 8, (0.4, 0.6), 12, 10, 85, capital=2000.0 / usd_b[0], costs=costs)
+
+    assert np.array_equal(res["timestamps"], ts)
+    assert res["positions"]["n_rebalances"][0] == ref["n_rebalances"] > 0
+    assert res["positions"]["time_in_range"][0] == pytest.approx(ref["time_in_range"], abs=1e-12)
+    assert np.allclose(res["value"], ref["value"] * usd_b, rtol=1e-9)
+    assert np.allclose(res["hodl"], ref["hodl"] * usd_b, rtol=1e-9)
+    assert res["value"][0] == pytest.approx(2000.0)
+
+def test_positions_add_up():
+    # Historiques déjà alignés : chaque position seule voit le même axe de temps
+    names, ts, usd = align_histories(_histories())
+    histories = {k: (ts, usd[:, i]) for i, k in enumerate(names)}
+    positions = [
+        {"pair": "WETH/USDC", "capital": 1000.0, "range_pct": 10},
+        {"pair": "WBTC/WETH", "capital": 500.0, "range_pct": 5, "trig_low": 20, "trig_high": 80},
+    ]
+    res = portfolio_backtest(histories, positions)
+    for i, p in enumerate(positions):
+        alone = portfolio_backtest(histories, [p])
+        assert np.allclose(res["positions"]["value"][i], alone["value"], rtol=1e-12)
+    assert np.allclose(res["value"], res["positions"]["value"].sum(axis=0))
+    assert res["max_drawdown"] <= 0
+
+def test_missing_history():
+    with pytest.raises(ValueError):
+        portfolio_backtest(_histories(), [{"pair": "WETH/DAI", "capital": 1.0, "range_pct": 5}])
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from lpcore.rolling import RollingStats, rolling_std, wilder_atr
+
+
+def _ohlc(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 3000 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    high = close * (1 + rng.uniform(0, 0.03, n))
+    low = close * (1 - rng.uniform(0, 0.03, n))
+    return high, low, close
+
+def _reference_atr(high, low, close, period):
+    """Définition de Wilder, bougie par bougie"""
+    atr = [np.nan] * len(close)
+    trs = []
+    for t in range(len(close)):
+        tr = high[t] - low[t]
+        if t:
+            tr = max(tr, abs(high[t] - close[t - 1]), abs(low[t] - close[t - 1]))
+        trs.append(tr)
+        if t == period - 1:
+            atr[t] = sum(trs) / period
+        elif t >= period:
+            atr[t] = atr[t - 1] + (tr - atr[t - 1]) / period
+    return np.array(atr)
+
+
+# Séries de plusieurs blocs du lissage, période courte : pas de dérive de la forme fermée
+@pytest.mark.parametrize("n, period", [(5, 14), (14, 14), (300, 14), (1000, 14), (1000, 3), (20_000, 2)])
+def test_wilder_atr_matches_reference_loop(n, period):
+    high, low, close = _ohlc(n)
+    ref = _reference_atr(high, low, close, period)
+    atr = wilder_atr(high, low, close, period)
+    assert np.array_equal(np.isnan(atr), np.isnan(ref))
+    assert np.allclose(atr, ref, rtol=1e-10, equal_nan=True)
+
+def test_incremental_atr_matches_vectorized():
+    high, low, close = _ohlc(500, seed=1)
+    engine = RollingStats(atr_period=14).extend(np.arange(500), high, low, close)
+    assert engine.atr == pytest.approx(wilder_atr(high, low, close, 14)[-1], rel=1e-10)
+
+def test_rolling_std_matches_np_std():
+    x = np.random.default_rng(2).normal(0, 1, 200)
+    out = rolling_std(x, 30)
+    assert np.isnan(out[:29]).all()
+    assert np.allclose(out[29:], [np.std(x[i - 29:i + 1]) for i in range(29, 200)], rtol=1e-9)
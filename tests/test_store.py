@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from lpcore.store import RESOLUTIONS, append_history, last_timestamp, load_history, pair_history
+
+DAY = RESOLUTIONS["daily"]
+
+
+def test_append_and_load_round_trip(tmp_path):
+    root = str(tmp_path)
+    ts = np.arange(10, dtype=np.int64) * DAY
+    prices = np.linspace(100.0, 110.0, 10)
+    order = np.random.default_rng(0).permutation(10)
+    assert append_history("weth", "daily", ts[order], prices[order], root) == 10
+
+    got_ts, got_px = load_history("weth", "daily", root)
+    assert isinstance(got_ts, np.memmap) and not got_ts.flags.writeable
+    assert np.array_equal(got_ts, ts)
+    assert np.array_equal(got_px, prices)
+    assert last_timestamp("weth", "daily", root) == 9 * DAY
+
+def test_append_skips_known_duplicate_and_invalid_candles(tmp_path):
+    root = str(tmp_path)
+    append_history("weth", "daily", np.arange(5) * DAY, np.arange(1.0, 6.0), root)
+
+    # Recouvrement avec l'existant, doublon dans le lot (le dernier gagne), prix invalides
+    ts = np.array([3, 4, 5, 6, 6, 7, 8]) * DAY
+    prices = np.array([30.0, 40.0, 6.0, 7.0, 7.5, np.nan, -1.0])
+    assert append_history("weth", "daily", ts, prices, root) == 2
+    assert append_history("weth", "daily", ts, prices, root) == 0
+
+    got_ts, got_px = load_history("weth", "daily", root)
+    assert np.array_equal(got_ts, np.arange(7) * DAY)
+    assert np.array_equal(got_px, [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.5])
+
+def test_reopen_after_interrupted_write(tmp_path):
+    root = str(tmp_path)
+    append_history("weth", "hourly", np.arange(4) * 3_600_000, np.ones(4), root)
+    # Écriture interrompue : prix écrit sans son timestamp
+    px_path = tmp_path / "weth" / "hourly" / "price.f8"
+    with open(px_path, "ab") as f:
+        f.write(np.array([9.0]).tobytes())
+
+    ts, prices = load_history("weth", "hourly", root)
+    assert len(ts) == len(prices) == 4
+    assert append_history("weth", "hourly", [4 * 3_600_000], [2.0], root) == 1
+    ts, prices = load_history("weth", "hourly", root)
+    assert np.array_equal(prices, [1.0, 1.0, 1.0, 1.0, 2.0])
+    assert px_path.stat().st_size == 5 * 8
+
+def test_empty_and_unknown_resolution(tmp_path):
+    ts, prices = load_history("nothing", "daily", str(tmp_path))
+    assert ts.size == prices.size == 0
+    assert last_timestamp("nothing", "daily", str(tmp_path)) is None
+    with pytest.raises(ValueError):
+        load_history("weth", "weekly", str(tmp_path))
+
+def test_pair_history_aligns_series_with_gaps(tmp_path):
+    root = str(tmp_path)
+    ts_a = np.array([0, 1, 2, 4, 5, 7]) * DAY
+    ts_b = np.array([1, 2, 3, 5, 6, 7, 8]) * DAY
+    append_history("weth", "daily", ts_a, 1000.0 + ts_a / DAY, root)
+    append_history("usd-coin", "daily", ts_b, 1.0 + ts_b / DAY / 100, root)
+
+    ts, ratio = pair_history("weth", "usd-coin", "daily", root)
+    days = np.array([1, 2, 5, 7])
+    assert np.array_equal(ts, days * DAY)
+    assert np.allclose(ratio, (1000.0 + days) / (1.0 + days / 100))
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from lpcore.ticks import (
+    MAX_SQRT_RATIO, MAX_TICK, MIN_SQRT_RATIO, MIN_TICK,
+    get_sqrt_ratio_at_tick, get_tick_at_sqrt_ratio, price_to_tick, snap_range,
+    sqrt_ratios_at_ticks, tick_to_price, ticks_at_sqrt_ratios
+)
+
+# Ticks aux deux extrémités de la plage et autour de 0
+EDGE_TICKS = np.r_[
+    np.arange(MIN_TICK, MIN_TICK + 64),
+    np.arange(-32, 32),
+    np.arange(MAX_TICK - 64, MAX_TICK + 1)
+]
+
+
+def test_sqrt_ratio_bounds():
+    assert get_sqrt_ratio_at_tick(MIN_TICK) == MIN_SQRT_RATIO
+    assert get_sqrt_ratio_at_tick(MAX_TICK) == MAX_SQRT_RATIO
+    assert get_tick_at_sqrt_ratio(MIN_SQRT_RATIO) == MIN_TICK
+    assert get_tick_at_sqrt_ratio(MAX_SQRT_RATIO - 1) == MAX_TICK - 1
+
+def test_sqrt_ratio_out_of_bounds():
+    with pytest.raises(ValueError):
+        get_sqrt_ratio_at_tick(MAX_TICK + 1)
+    with pytest.raises(ValueError):
+        get_tick_at_sqrt_ratio(MAX_SQRT_RATIO)
+
+def test_tick_sqrt_ratio_round_trip():
+    ticks = EDGE_TICKS[EDGE_TICKS < MAX_TICK]
+    sqrt_prices = sqrt_ratios_at_ticks(ticks)
+    assert np.array_equal(ticks_at_sqrt_ratios(sqrt_prices), ticks)
+    # Juste sous le sqrtPriceX96 d'un tick : tick précédent
+    below = np.array([s - 1 for s in sqrt_prices[1:]], dtype=object)
+    assert np.array_equal(ticks_at_sqrt_ratios(below), ticks[1:] - 1)
+
+@pytest.mark.parametrize("decimals", [(0, 0), (18, 6), (6, 18)])
+def test_tick_price_round_trip(decimals):
+    assert np.array_equal(price_to_tick(tick_to_price(EDGE_TICKS, *decimals), *decimals), EDGE_TICKS)
+
+def test_price_to_tick_rounds_down():
+    prices = np.exp(np.random.default_rng(0).uniform(-40, 40, 10_000))
+    ticks = price_to_tick(prices)
+    assert np.all(tick_to_price(ticks) <= prices)
+    assert np.all(tick_to_price(ticks + 1) > prices)
+
+def test_snap_range_clamped_to_usable_ticks():
+    low, high = snap_range(1e-300, 1e300, 60)
+    assert price_to_tick(low) == MIN_TICK // 60 * 60
+    assert price_to_tick(high) == MAX_TICK // 60 * 60
+
+@pytest.mark.parametrize("decimals", [(0, 0), (18, 6)])
+@pytest.mark.parametrize("spacing", [1, 10, 60, 200])
+def test_snap_range_keeps_aligned_bounds(spacing, decimals):
+    t_low = np.array([-120, -600, 0, 120]) // spacing * spacing
+    t_high = t_low + np.array([1, 2, 5, 40]) * spacing
+    low, high = snap_range(tick_to_price(t_low, *decimals), tick_to_price(t_high, *decimals), spacing, *decimals)
+    assert np.array_equal(price_to_tick(low, *decimals), t_low)
+    assert np.array_equal(price_to_tick(high, *decimals), t_high)
+
+def test_snap_range_widens_to_enclosing_ticks():
+    low, high = snap_range(tick_to_price(-119.5), tick_to_price(120.5), 60)
+    assert (price_to_tick(low), price_to_tick(high)) == (-120, 180)